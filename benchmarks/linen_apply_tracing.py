@@ -0,0 +1,100 @@
+# Copyright 2024 The Flax Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time it takes to trace `Module.apply` of a deep transformer,
+# which is dominated by the Python overhead of Module method calls.
+#
+# Example command:
+#   python benchmarks/linen_apply_tracing.py --depth=48 --total_steps=10
+
+from time import time
+
+import jax
+import jax.numpy as jnp
+
+import flax.linen as nn
+from flax.linen import module as module_lib
+
+from absl import flags
+from absl import app
+
+FLAGS = flags.FLAGS
+flags.DEFINE_enum(
+  'mode', 'all', ['all', 'fast', 'slow'], 'Method dispatch mode to benchmark'
+)
+flags.DEFINE_integer('total_steps', 10, 'Number of traces to average over')
+flags.DEFINE_integer('depth', 48, 'Number of transformer blocks')
+flags.DEFINE_integer('width', 64, 'Model width')
+
+
+class Block(nn.Module):
+  width: int
+
+  @nn.compact
+  def __call__(self, x):
+    y = nn.LayerNorm()(x)
+    y = nn.MultiHeadDotProductAttention(num_heads=4)(y)
+    x = x + y
+    y = nn.LayerNorm()(x)
+    y = nn.Dense(4 * self.width)(y)
+    y = nn.gelu(y)
+    y = nn.Dense(self.width)(y)
+    return x + y
+
+
+class Transformer(nn.Module):
+  width: int
+  depth: int
+
+  @nn.compact
+  def __call__(self, x):
+    for _ in range(self.depth):
+      x = Block(self.width)(x)
+    return nn.LayerNorm()(x)
+
+
+def trace_time(fast: bool, model, params, x, total_steps: int) -> float:
+  module_lib._use_fast_dispatch = fast
+  try:
+    # warmup
+    jax.make_jaxpr(model.apply)(params, x)
+    t0 = time()
+    for _ in range(total_steps):
+      jax.make_jaxpr(model.apply)(params, x)
+    return (time() - t0) / total_steps
+  finally:
+    module_lib._use_fast_dispatch = True
+
+
+def main(argv):
+  del argv
+  model = Transformer(FLAGS.width, FLAGS.depth)
+  x = jnp.ones((1, 16, FLAGS.width))
+  params = jax.eval_shape(model.init, jax.random.key(0), x)
+
+  print(f'depth={FLAGS.depth}, width={FLAGS.width}')
+  modes = ['slow', 'fast'] if FLAGS.mode == 'all' else [FLAGS.mode]
+  times = {}
+  for mode in modes:
+    times[mode] = trace_time(
+      mode == 'fast', model, params, x, FLAGS.total_steps
+    )
+    print(f'### {mode} dispatch ###')
+    print(f'time per trace: {times[mode] * 1e3:.2f} ms')
+  if len(times) == 2:
+    print(f'speedup: {times["slow"] / times["fast"]:.2f}x')
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,418 @@
+# Copyright 2024 The Flax Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark suite for the Python overhead of Flax operations.
+
+Runs on CPU, writes the results as JSON and compares them against a stored
+baseline. Exits with a non-zero status if a benchmark regressed by more than
+``--threshold``.
+
+Example commands:
+  # record a baseline
+  python benchmarks/suite.py --output=/tmp/baseline.json
+  # compare against it, fail on regressions larger than 10%
+  python benchmarks/suite.py --baseline=/tmp/baseline.json --threshold=0.1
+  # only run the nnx benchmarks
+  python benchmarks/suite.py --benchmark_filter='^nnx_'
+"""
+
+import json
+import platform
+import re
+import statistics
+import sys
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import flax
+import flax.linen as nn
+import jax
+import jax.numpy as jnp
+import numpy as np
+import optax
+from flax import nnx, serialization, traverse_util
+
+from absl import app
+from absl import flags
+from absl import logging
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string(
+  'benchmark_filter', '', 'Regex selecting the benchmarks to run'
+)
+flags.DEFINE_string('output', '', 'Path of the JSON file to write results to')
+flags.DEFINE_string(
+  'baseline', '', 'Path of a JSON results file to compare against'
+)
+flags.DEFINE_float(
+  'threshold',
+  0.1,
+  'Relative slowdown above which a benchmark counts as a regression',
+)
+flags.DEFINE_enum(
+  'compare_stat',
+  'min_us',
+  ['min_us', 'median_us'],
+  'Statistic compared against the baseline, the minimum is the least'
+  ' sensitive to noise from other processes',
+)
+flags.DEFINE_float(
+  'min_time', 0.05, 'Minimum time in seconds of each measured repeat'
+)
+flags.DEFINE_integer('repeats', 7, 'Number of measured repeats')
+
+SCHEMA_VERSION = 1
+
+# name -> setup function returning the zero argument function to time,
+# benchmarks that dispatch device computations should block on their outputs
+_BENCHMARKS: dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+  """Registers a benchmark setup function under ``name``."""
+
+  def decorator(setup: Callable[[], Callable[[], Any]]):
+    if name in _BENCHMARKS:
+      raise ValueError(f'Benchmark {name!r} is already registered.')
+    _BENCHMARKS[name] = setup
+    return setup
+
+  return decorator
+
+
+def measure(
+  fn: Callable[[], Any], *, min_time: float, repeats: int
+) -> dict[str, Any]:
+  """Times ``fn``, returns per call statistics in microseconds."""
+  # warmup, e.g. compilation and graph caches
+  fn()
+  timer = timeit.Timer(fn)
+  number, _ = timer.autorange()
+  # scale so each repeat takes at least min_time
+  per_call = timer.timeit(number) / number
+  number = max(number, int(min_time / max(per_call, 1e-9)))
+  times = [t / number * 1e6 for t in timer.repeat(repeats, number)]
+  quartiles = statistics.quantiles(times, n=4) if len(times) > 1 else times * 3
+  return {
+    'median_us': round(statistics.median(times), 3),
+    'min_us': round(min(times), 3),
+    'iqr_us': round(quartiles[2] - quartiles[0], 3),
+    'number': number,
+    'repeats': repeats,
+  }
+
+
+def compare(
+  results: dict[str, dict[str, Any]],
+  baseline: dict[str, dict[str, Any]],
+  threshold: float,
+  stat: str = 'min_us',
+) -> dict[str, dict[str, Any]]:
+  """Compares ``stat`` times, returns the relative change of each benchmark."""
+  comparison = {}
+  for name, result in sorted(results.items()):
+    if name not in baseline:
+      continue
+    before = baseline[name][stat]
+    after = result[stat]
+    change = (after - before) / before if before > 0 else 0.0
+    comparison[name] = {
+      'baseline_' + stat: before,
+      stat: after,
+      'change': round(change, 4),
+      'regression': change > threshold,
+    }
+  return comparison
+
+
+def metadata() -> dict[str, Any]:
+  return {
+    'schema_version': SCHEMA_VERSION,
+    'flax_version': flax.__version__,
+    'jax_version': jax.__version__,
+    'python_version': platform.python_version(),
+    'backend': jax.default_backend(),
+    'device_kind': jax.devices()[0].device_kind,
+    'machine': platform.machine(),
+  }
+
+
+# -----------------------------------------------------------------------------
+# NNX graph
+# -----------------------------------------------------------------------------
+
+
+class Block(nnx.Module):
+  def __init__(self, din: int, dout: int, *, rngs: nnx.Rngs):
+    self.linear = nnx.Linear(din, dout, rngs=rngs)
+    self.bn = nnx.BatchNorm(dout, rngs=rngs)
+
+  def __call__(self, x):
+    return nnx.relu(self.bn(self.linear(x)))
+
+
+class MLP(nnx.Module):
+  def __init__(self, width: int, depth: int, *, rngs: nnx.Rngs):
+    self.blocks = [Block(width, width, rngs=rngs) for _ in range(depth)]
+
+  def __call__(self, x):
+    for block in self.blocks:
+      x = block(x)
+    return x
+
+
+def _mlp(depth: int = 8) -> MLP:
+  return MLP(4, depth, rngs=nnx.Rngs(0))
+
+
+@benchmark('nnx_split')
+def nnx_split():
+  model = _mlp()
+  return lambda: nnx.split(model)
+
+
+@benchmark('nnx_merge')
+def nnx_merge():
+  graphdef, state = nnx.split(_mlp())
+  return lambda: nnx.merge(graphdef, state)
+
+
+@benchmark('nnx_update')
+def nnx_update():
+  model = _mlp()
+  state = nnx.state(model)
+  return lambda: nnx.update(model, state)
+
+
+@benchmark('nnx_optimizer_update_trace')
+def nnx_optimizer_update_trace():
+  model = _mlp()
+  optimizer = nnx.Optimizer(model, optax.adam(1e-3), wrt=nnx.Param)
+  graphdef, state = nnx.split((model, optimizer))
+  grads = nnx.state(model, nnx.Param)
+
+  def train_step(state, grads):
+    model, optimizer = nnx.merge(graphdef, state)
+    optimizer.update(model, grads)
+    return nnx.state((model, optimizer))
+
+  return lambda: jax.make_jaxpr(train_step)(state, grads)
+
+
+# -----------------------------------------------------------------------------
+# NNX transforms dispatch
+# -----------------------------------------------------------------------------
+
+
+@benchmark('nnx_jit_dispatch')
+def nnx_jit_dispatch():
+  model = _mlp()
+  x = jnp.ones((1, 4))
+  f = nnx.jit(lambda model, x: model(x))
+  return lambda: jax.block_until_ready(f(model, x))
+
+
+@benchmark('nnx_vmap_dispatch')
+def nnx_vmap_dispatch():
+  model = nnx.Linear(4, 4, rngs=nnx.Rngs(0))
+  xs = jnp.ones((8, 1, 4))
+  f = nnx.vmap(lambda model, x: model(x), in_axes=(None, 0))
+  return lambda: jax.block_until_ready(f(model, xs))
+
+
+@benchmark('nnx_scan_dispatch')
+def nnx_scan_dispatch():
+  model = nnx.Linear(4, 4, rngs=nnx.Rngs(0))
+  xs = jnp.ones((8, 1, 4))
+
+  @nnx.scan(in_axes=(None, nnx.Carry, 0), out_axes=nnx.Carry)
+  def f(model, carry, x):
+    return carry + model(x)
+
+  return lambda: jax.block_until_ready(f(model, jnp.zeros((1, 4)), xs))
+
+
+# -----------------------------------------------------------------------------
+# Linen tracing
+# -----------------------------------------------------------------------------
+
+
+class LinenMLP(nn.Module):
+  depth: int = 8
+
+  @nn.compact
+  def __call__(self, x):
+    for _ in range(self.depth):
+      x = nn.relu(nn.LayerNorm()(nn.Dense(4)(x)))
+    return x
+
+
+@benchmark('linen_init_trace')
+def linen_init_trace():
+  model = LinenMLP()
+  x = jnp.ones((1, 4))
+  key = jax.random.key(0)
+  return lambda: jax.make_jaxpr(model.init)(key, x)
+
+
+@benchmark('linen_apply_trace')
+def linen_apply_trace():
+  model = LinenMLP()
+  x = jnp.ones((1, 4))
+  variables = model.init(jax.random.key(0), x)
+  return lambda: jax.make_jaxpr(model.apply)(variables, x)
+
+
+# -----------------------------------------------------------------------------
+# Serialization and traversal
+# -----------------------------------------------------------------------------
+
+
+def _nested_dict(width: int = 8, depth: int = 3, leaf_size: int = 16):
+  if depth == 0:
+    return {
+      'kernel': np.ones((leaf_size, leaf_size), np.float32),
+      'bias': np.zeros((leaf_size,), np.float32),
+    }
+  return {
+    f'layer_{i}': _nested_dict(width, depth - 1, leaf_size)
+    for i in range(width)
+  }
+
+
+@benchmark('serialization_to_bytes')
+def serialization_to_bytes():
+  tree = _nested_dict()
+  return lambda: serialization.to_bytes(tree)
+
+
+@benchmark('serialization_from_bytes')
+def serialization_from_bytes():
+  tree = _nested_dict()
+  encoded = serialization.to_bytes(tree)
+  return lambda: serialization.from_bytes(tree, encoded)
+
+
+@benchmark('frozen_dict_copy')
+def frozen_dict_copy():
+  variables = flax.core.freeze(
+    {'params': _nested_dict(), 'batch_stats': {'mean': np.zeros(4)}}
+  )
+  update = {'batch_stats': {'mean': np.ones(4)}}
+  return lambda: variables.copy(update)
+
+
+@benchmark('frozen_dict_pop')
+def frozen_dict_pop():
+  variables = flax.core.freeze(
+    {'params': _nested_dict(), 'batch_stats': {'mean': np.zeros(4)}}
+  )
+  return lambda: variables.pop('batch_stats')
+
+
+@benchmark('frozen_dict_hash')
+def frozen_dict_hash():
+  # hashing requires hashable leaves
+  params = jax.tree.map(lambda x: x.size, _nested_dict())
+  variables = flax.core.freeze({'params': params, 'batch_stats': {'mean': 0}})
+  update = {'batch_stats': {'mean': 1}}
+  return lambda: hash(variables.copy(update))
+
+
+@benchmark('traverse_util_flatten_dict')
+def traverse_util_flatten_dict():
+  tree = _nested_dict()
+  return lambda: traverse_util.flatten_dict(tree)
+
+
+@benchmark('traverse_util_unflatten_dict')
+def traverse_util_unflatten_dict():
+  flat = traverse_util.flatten_dict(_nested_dict())
+  return lambda: traverse_util.unflatten_dict(flat)
+
+
+# -----------------------------------------------------------------------------
+# Runner
+# -----------------------------------------------------------------------------
+
+
+def run(
+  pattern: str = '', *, min_time: float, repeats: int
+) -> dict[str, dict[str, Any]]:
+  results = {}
+  for name in sorted(_BENCHMARKS):
+    if pattern and not re.search(pattern, name):
+      continue
+    fn = _BENCHMARKS[name]()
+    results[name] = measure(fn, min_time=min_time, repeats=repeats)
+    logging.info('%s: %s', name, results[name])
+  return results
+
+
+def main(argv):
+  del argv
+  results = run(
+    FLAGS.benchmark_filter, min_time=FLAGS.min_time, repeats=FLAGS.repeats
+  )
+  report: dict[str, Any] = {'metadata': metadata(), 'benchmarks': results}
+
+  comparison = None
+  if FLAGS.baseline:
+    with open(FLAGS.baseline) as f:
+      baseline = json.load(f)
+    if baseline['metadata'].get('schema_version') != SCHEMA_VERSION:
+      raise ValueError(f'Unsupported baseline schema in {FLAGS.baseline}.')
+    comparison = compare(
+      results, baseline['benchmarks'], FLAGS.threshold, FLAGS.compare_stat
+    )
+    report['comparison'] = {
+      'baseline': FLAGS.baseline,
+      'stat': FLAGS.compare_stat,
+      'threshold': FLAGS.threshold,
+      'benchmarks': comparison,
+    }
+
+  print(
+    f'{"benchmark":<32} {"min (us)":>12} {"median (us)":>12}'
+    f' {"iqr (us)":>10} {"change":>9}'
+  )
+  for name, result in results.items():
+    change = ''
+    if comparison and name in comparison:
+      change = f'{comparison[name]["change"]:+.1%}'
+      if comparison[name]['regression']:
+        change += ' !'
+    print(
+      f'{name:<32} {result["min_us"]:>12.2f} {result["median_us"]:>12.2f}'
+      f' {result["iqr_us"]:>10.2f} {change:>9}'
+    )
+
+  if FLAGS.output:
+    with open(FLAGS.output, 'w') as f:
+      json.dump(report, f, indent=2, sort_keys=True)
+      f.write('\n')
+
+  if comparison:
+    regressions = [name for name, c in comparison.items() if c['regression']]
+    if regressions:
+      print(
+        f'{len(regressions)} benchmark(s) regressed by more than'
+        f' {FLAGS.threshold:.0%}: {", ".join(regressions)}'
+      )
+      sys.exit(1)
+
+
+if __name__ == '__main__':
+  app.run(main)
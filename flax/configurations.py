@@ -26,6 +26,10 @@ class Config:
   flax_mutable_array: bool
   flax_pytree_module: bool
   flax_max_repr_depth: int | None
+  flax_jit_graph_cache_size: int
+  flax_jit_executable_cache_dir: str
+  flax_jit_executable_cache_size: int
+  flax_linen_apply_cache_size: int
   # See https://google.github.io/pytype/faq.html.
   _HAS_DYNAMIC_ATTRIBUTES = True
 
@@ -157,6 +161,38 @@ def int_flag(name: str, *, default: int | None, help: str) -> FlagHolder[int]:
   return fh
 
 
+def str_flag(name: str, *, default: str, help: str) -> FlagHolder[str]:
+  """Set up a string flag.
+
+  Example::
+
+    foo_dir = str_flag(
+        name='flax_foo_dir',
+        default='',
+        help='Directory of foo.',
+    )
+
+  Now the ``FLAX_FOO_DIR`` shell environment variable can be used to
+  control the process-level value of the flag, in addition to using e.g.
+  ``config.update("flax_foo_dir", "/tmp/foo")`` directly.
+
+  Args:
+    name: converted to lowercase to define the name of the flag. It is
+      converted to uppercase to define the corresponding shell environment
+      variable.
+    default: a default value for the flag.
+    help: used to populate the docstring of the returned flag holder object.
+
+  Returns:
+    A flag holder object for accessing the value of the flag.
+  """
+  name = name.lower()
+  config._add_option(name, os.getenv(name.upper(), default))
+  fh = FlagHolder[str](name, help)
+  setattr(Config, name, property(lambda _: fh.value, doc=help))
+  return fh
+
+
 def static_bool_env(varname: str, default: bool) -> bool:
   """Read an environment variable and interpret it as a boolean.
 
@@ -283,4 +319,40 @@ flax_max_repr_depth = int_flag(
   name='flax_max_repr_depth',
   default=None,
   help='Maximum depth of reprs for nested flax objects. Default is None (no limit).',
-)
\ No newline at end of file
+)
+
+flax_jit_graph_cache_size = int_flag(
+  name='flax_jit_graph_cache_size',
+  default=4,
+  help=(
+    'Maximum number of input graph structures cached by each nnx.jit'
+    ' function to skip graph traversals on repeated calls, 0 disables it.'
+  ),
+)
+
+flax_jit_executable_cache_dir = str_flag(
+  name='flax_jit_executable_cache_dir',
+  default='',
+  help=(
+    'Directory where nnx.jit stores compiled executables to reuse them across'
+    ' processes, an empty string disables it.'
+  ),
+)
+
+flax_jit_executable_cache_size = int_flag(
+  name='flax_jit_executable_cache_size',
+  default=32,
+  help=(
+    'Maximum number of executables from flax_jit_executable_cache_dir kept in'
+    ' memory by each nnx.jit function.'
+  ),
+)
+
+flax_linen_apply_cache_size = int_flag(
+  name='flax_linen_apply_cache_size',
+  default=0,
+  help=(
+    'Maximum number of jitted functions cached by linen Module.apply to skip'
+    ' Module construction and setup on repeated calls, 0 disables it.'
+  ),
+)
@@ -42,6 +42,7 @@ from .scope import (
     Scope as Scope,
     apply as apply,
     bind as bind,
+    deferred_init as deferred_init,
     init as init,
     lazy_init as lazy_init,
 )
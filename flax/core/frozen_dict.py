@@ -52,9 +52,14 @@ def _indent(x, num_spaces):
 
 @jax.tree_util.register_pytree_with_keys_class
 class FrozenDict(Mapping[K, V]):
-  """An immutable variant of the Python dict."""
+  """An immutable variant of the Python dict.
 
-  __slots__ = ('_dict', '_hash')
+  Nested dicts are never mutated once frozen, so they are shared instead of
+  copied: ``copy`` and ``pop`` only copy the top level dict and nested
+  ``FrozenDict`` views (and their cached hashes) are reused.
+  """
+
+  __slots__ = ('_dict', '_hash', '_children')
 
   def __init__(self, *args, __unsafe_skip_copy__=False, **kwargs):  # pylint: disable=invalid-name
     # make sure the dict is as
@@ -65,13 +70,39 @@ class FrozenDict(Mapping[K, V]):
       self._dict = _prepare_freeze(xs)
 
     self._hash = None
+    self._children = None
+
+  @classmethod
+  def _from_frozen(
+    cls, xs: dict, children: dict | None = None
+  ) -> 'FrozenDict[K, V]':
+    """Wraps a dict that is already frozen, i.e. owned and never mutated."""
+    self = object.__new__(cls)
+    self._dict = xs
+    self._hash = None
+    self._children = children or None
+    return self
 
   def __getitem__(self, key):
     v = self._dict[key]
     if isinstance(v, dict):
-      return FrozenDict(v)
+      # share the nested dict and reuse the view so its hash is cached
+      if self._children is None:
+        self._children = {}
+      child = self._children.get(key)
+      if child is None:
+        child = self._children[key] = FrozenDict._from_frozen(v)
+      return child
     return v
 
+  def _shared_children(self, exclude) -> dict:
+    """Returns the nested views of all keys not in ``exclude``."""
+    return {
+      key: self[key]
+      for key, value in self._dict.items()
+      if isinstance(value, dict) and key not in exclude
+    }
+
   def __setitem__(self, key, value):
     raise ValueError('FrozenDict is immutable.')
 
@@ -118,7 +149,12 @@ class FrozenDict(Mapping[K, V]):
     self, add_or_replace: Mapping[K, V] = MappingProxyType({})
   ) -> 'FrozenDict[K, V]':
     """Create a new FrozenDict with additional or replaced entries."""
-    return type(self)({**self, **unfreeze(add_or_replace)})  # type: ignore[arg-type]
+    new_dict = dict(self._dict)
+    for key, value in add_or_replace.items():
+      new_dict[key] = _prepare_freeze(value)
+    return type(self)._from_frozen(
+      new_dict, self._shared_children(add_or_replace)
+    )
 
   def keys(self):
     return FrozenKeysView(self)
@@ -147,7 +183,7 @@ class FrozenDict(Mapping[K, V]):
     value = self[key]
     new_dict = dict(self._dict)
     new_dict.pop(key)
-    new_self = type(self)(new_dict)
+    new_self = type(self)._from_frozen(new_dict, self._shared_children((key,)))
     return new_self, value
 
   def unfreeze(self) -> dict[K, V]:
@@ -12,13 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import functools
 from typing import Any
+from collections.abc import Callable, Hashable, Iterator
 
 import jax
 from jax import core
+from jax.extend import core as jex_core
 from jax.extend import linear_util as lu
 from jax.interpreters import partial_eval as pe
+import numpy as np
 
 from flax import errors
 
@@ -73,3 +77,210 @@ def lazy_init(fn):
     return jax.tree_util.tree_unflatten(out_tree(), out_flat)
 
   return wrapper
+
+
+Path = tuple[Any, ...]
+Shardings = Any  # a pytree prefix of the output or a (path, abstract) callable
+
+
+def _key_name(key: Any) -> Any:
+  for attr in ('key', 'name', 'idx'):
+    if hasattr(key, attr):
+      return getattr(key, attr)
+  return str(key)
+
+
+def _layer_group(keypath: tuple[Any, ...]) -> Hashable:
+  # the path up to the last dict key, e.g. the kernel and bias of a layer
+  # form a group, including boxed values like nn.Partitioned
+  for i in range(len(keypath) - 1, -1, -1):
+    if isinstance(keypath[i], jax.tree_util.DictKey):
+      return tuple(map(_key_name, keypath[:i]))
+  return ()
+
+
+class DeferredInit:
+  """Output of a function that is only materialized on demand.
+
+  Created by ``deferred_init``, it holds the jaxpr of the function and its
+  concrete inputs (e.g. rngs) instead of the output values. The shapes of the
+  output are available as ``abstract``, ``materialize`` computes the values
+  group by group so only a single group of leaves, by default the leaves
+  of one layer, is computed at a time. Each group is computed by a
+  ``jax.jit`` function restricted to the operations its leaves depend on,
+  which creates the leaves directly in their target sharding.
+  """
+
+  def __init__(
+    self,
+    jaxpr: jex_core.Jaxpr,
+    inputs: list[Any],
+    out_tree: jax.tree_util.PyTreeDef,
+    postprocess: Callable[[Any], Any] | None = None,
+  ):
+    self._jaxpr = jaxpr
+    self._inputs = inputs
+    self._out_tree = out_tree
+    self._postprocess = postprocess
+    self._avals = [v.aval for v in jaxpr.outvars]
+    abstract_flat = [
+      jax.ShapeDtypeStruct(aval.shape, aval.dtype) for aval in self._avals
+    ]
+    self._abstract_tree = jax.tree_util.tree_unflatten(out_tree, abstract_flat)
+    leaves_with_path, _ = jax.tree_util.tree_flatten_with_path(
+      self._abstract_tree
+    )
+    self._keypaths = [keypath for keypath, _ in leaves_with_path]
+    self.paths: list[Path] = [
+      tuple(map(_key_name, keypath)) for keypath in self._keypaths
+    ]
+
+  def _output(self, tree: Any) -> Any:
+    if self._postprocess is not None:
+      return self._postprocess(tree)
+    return tree
+
+  @property
+  def abstract(self) -> Any:
+    """The output with ``jax.ShapeDtypeStruct`` leaves."""
+    return self._output(self._abstract_tree)
+
+  def _flat_shardings(self, shardings: Shardings) -> list[Any]:
+    if shardings is None:
+      return [None] * len(self._avals)
+    if callable(shardings):
+      abstract_flat = jax.tree_util.tree_leaves(self._abstract_tree)
+      return [shardings(p, x) for p, x in zip(self.paths, abstract_flat)]
+    prefix_leaves, prefix_def = jax.tree_util.tree_flatten(
+      shardings, is_leaf=lambda x: x is None
+    )
+    subtrees = prefix_def.flatten_up_to(self._abstract_tree)
+    return [
+      sharding
+      for sharding, subtree in zip(prefix_leaves, subtrees)
+      for _ in jax.tree_util.tree_leaves(subtree)
+    ]
+
+  def materialize_iter(
+    self,
+    shardings: Shardings = None,
+    *,
+    group_by: Callable[[Path], Hashable] | None = None,
+  ) -> Iterator[tuple[Hashable, dict[Path, jax.Array]]]:
+    """Materializes the output one group of leaves at a time.
+
+    Args:
+      shardings: the target sharding of the leaves, either a pytree prefix of
+        the output with ``jax.sharding.Sharding`` (or ``None``) leaves or a
+        function of the leaf path and ``jax.ShapeDtypeStruct``.
+      group_by: maps the path of a leaf to its group, leaves of a group are
+        computed together. Defaults to grouping the leaves of each layer,
+        i.e. leaves with the same path up to their last dict key.
+
+    Yields:
+      ``(group, leaves)`` tuples where ``leaves`` maps paths to arrays.
+    """
+    flat_shardings = self._flat_shardings(shardings)
+    groups: dict[Hashable, list[int]] = collections.defaultdict(list)
+    for i, (path, keypath) in enumerate(zip(self.paths, self._keypaths)):
+      group = _layer_group(keypath) if group_by is None else group_by(path)
+      groups[group].append(i)
+
+    default_sharding = None
+    for group, indices in groups.items():
+      used_outputs = [False] * len(self._avals)
+      for i in indices:
+        used_outputs[i] = True
+      jaxpr, used_inputs = pe.dce_jaxpr(self._jaxpr, used_outputs)
+      inputs = []
+      for x, used in zip(self._inputs, used_inputs):
+        if used:
+          if isinstance(x, jax.ShapeDtypeStruct):
+            raise errors.LazyInitError(x)
+          inputs.append(x)
+      out_shardings = [flat_shardings[i] for i in indices]
+      if all(sharding is None for sharding in out_shardings):
+        fn = jax.jit(jex_core.jaxpr_as_fun(jex_core.ClosedJaxpr(jaxpr, ())))
+      else:
+        if default_sharding is None:
+          default_sharding = jax.sharding.SingleDeviceSharding(jax.devices()[0])
+        fn = jax.jit(
+          jex_core.jaxpr_as_fun(jex_core.ClosedJaxpr(jaxpr, ())),
+          out_shardings=[
+            default_sharding if sharding is None else sharding
+            for sharding in out_shardings
+          ],
+        )
+      values = fn(*inputs)
+      yield group, {self.paths[i]: value for i, value in zip(indices, values)}
+
+  def materialize(
+    self,
+    shardings: Shardings = None,
+    *,
+    group_by: Callable[[Path], Hashable] | None = None,
+  ) -> Any:
+    """Materializes the full output, see ``materialize_iter`` for the args."""
+    values = {}
+    for _, leaves in self.materialize_iter(shardings, group_by=group_by):
+      values.update(leaves)
+    return self._output(
+      jax.tree_util.tree_unflatten(
+        self._out_tree, [values[path] for path in self.paths]
+      )
+    )
+
+
+def _is_array_input(x: Any) -> bool:
+  return isinstance(x, (jax.Array, jax.ShapeDtypeStruct, np.ndarray))
+
+
+def deferred_init(
+  fn: Callable[..., Any],
+  postprocess: Callable[[Any], Any] | None = None,
+) -> Callable[..., DeferredInit]:
+  """Traces a function without computing its output.
+
+  Like ``lazy_init`` the returned function accepts ``jax.ShapeDtypeStruct``
+  instances for inputs that do not affect the output, but instead of
+  computing the output it returns a ``DeferredInit`` that materializes it on
+  demand, see ``DeferredInit``. Array inputs are kept until the output is
+  materialized, all other inputs are treated as static.
+
+  Args:
+    fn: the function to be traced, its output leaves must be arrays.
+    postprocess: an optional function applied to the (abstract or
+      materialized) output.
+  Returns:
+    A new function that accepts a mix of concrete values and
+    ``jax.ShapeDtypeStruct`` instances and returns a ``DeferredInit``.
+  """
+
+  @functools.wraps(fn)
+  def wrapper(*args, **kwargs) -> DeferredInit:
+    inputs_flat, in_tree = jax.tree_util.tree_flatten((args, kwargs))
+    is_array = [_is_array_input(x) for x in inputs_flat]
+    array_inputs = [x for x, array in zip(inputs_flat, is_array) if array]
+    out_tree = None
+
+    def flat_fn(*array_inputs):
+      nonlocal out_tree
+      array_iter = iter(array_inputs)
+      args, kwargs = jax.tree_util.tree_unflatten(
+        in_tree,
+        [
+          next(array_iter) if array else x
+          for x, array in zip(inputs_flat, is_array)
+        ],
+      )
+      out_flat, out_tree = jax.tree_util.tree_flatten(fn(*args, **kwargs))
+      return out_flat
+
+    closed_jaxpr = jax.make_jaxpr(flat_fn)(*array_inputs)
+    assert out_tree is not None
+    jaxpr = pe.convert_constvars_jaxpr(closed_jaxpr.jaxpr)
+    return DeferredInit(
+      jaxpr, [*closed_jaxpr.consts, *array_inputs], out_tree, postprocess
+    )
+
+  return wrapper
@@ -19,7 +19,9 @@ import contextlib
 import dataclasses
 import functools
 import hashlib
+import threading
 import typing
+import weakref
 from typing import (
   Any,
   Generic,
@@ -1085,6 +1087,154 @@ def apply(
   return wrapper
 
 
+# jitted apply functions created by `cached_apply`, in LRU order
+_apply_cache: collections.OrderedDict[Any, Callable[..., Any]] = (
+  collections.OrderedDict()
+)
+
+
+class _ApplyContext(threading.local):
+  """Holds the apply function traced by the jitted functions in `_apply_cache`.
+
+  The cached functions read it at trace time instead of closing over it, so
+  the cache doesn't keep the owner of the traced function alive.
+  """
+
+  def __init__(self):
+    self.fn: Callable[..., Any] | None = None
+
+
+_apply_context = _ApplyContext()
+
+
+def _is_dynamic_arg(x: Any) -> bool:
+  if isinstance(x, bool):
+    return False
+  return isinstance(x, (jax.Array, np.ndarray, np.generic, int, float, complex))
+
+
+_apply_cache_lock = threading.Lock()
+# owners of `_apply_cache` entries that have been garbage collected
+_dead_apply_cache_owners: list[weakref.ref] = []
+
+
+def _drop_apply_cache_entries(owner_ref: weakref.ref) -> None:
+  _dead_apply_cache_owners.append(owner_ref)
+  # the garbage collector can run this while the lock is held, the entries
+  # are then dropped by the next lookup
+  if _apply_cache_lock.acquire(blocking=False):
+    try:
+      _purge_apply_cache()
+    finally:
+      _apply_cache_lock.release()
+
+
+def _purge_apply_cache() -> None:
+  while _dead_apply_cache_owners:
+    owner_ref = _dead_apply_cache_owners.pop()
+    for key in [key for key in _apply_cache if key[0] is owner_ref]:
+      del _apply_cache[key]
+
+
+def cached_apply(
+  fn: Callable[..., Any],
+  owner: Any,
+  cache_key: Any,
+  mutable: CollectionFilter = False,
+  flags: Mapping | None = None,
+) -> Callable[..., Any]:
+  """Like `apply` but reuses a `jax.jit` compiled version of `fn`.
+
+  The compiled function is looked up in a process wide LRU cache of size
+  ``config.flax_linen_apply_cache_size`` keyed on ``owner``, ``cache_key``,
+  ``mutable``, the structure of the arguments and the value of all static
+  arguments. Arrays and Python numbers, variables and rngs are passed
+  dynamically so ``jax.jit`` only retraces ``fn`` for new shapes and dtypes,
+  other arguments such as booleans and strings are static. Repeated calls
+  therefore skip `Scope` construction and all Python code in ``fn``, which
+  must be free of side effects. ``owner`` is referenced weakly and its
+  entries are dropped once it is garbage collected. If the key is not
+  hashable or the cache is disabled this falls back to `apply`.
+
+  Args:
+    fn: a function taking a `Scope` as its first argument.
+    owner: a hashable object that ``fn`` belongs to, calls with equal owners
+      and keys may reuse each other's compiled function.
+    cache_key: a hashable identifier of ``fn`` within ``owner``.
+    mutable: the filter determining which variable collections are mutable.
+    flags: internal flags.
+
+  Returns:
+    `fn` with the scope partially applied.
+  """
+  uncached_fn = apply(fn, mutable=mutable, flags=flags)
+
+  @functools.wraps(fn)
+  def wrapper(
+    variables: VariableDict,
+    *args,
+    rngs: PRNGKey | RNGSequences | None = None,
+    **kwargs,
+  ) -> Any | tuple[Any, VariableDict | dict[str, Any]]:
+    maxsize = config.flax_linen_apply_cache_size
+    if maxsize <= 0:
+      return uncached_fn(variables, *args, rngs=rngs, **kwargs)
+    leaves, treedef = jax.tree.flatten((args, kwargs))
+    is_dynamic = tuple(map(_is_dynamic_arg, leaves))
+    static_leaves = tuple(
+      x for x, dynamic in zip(leaves, is_dynamic) if not dynamic
+    )
+    if isinstance(mutable, list):
+      mutable_key = tuple(mutable)
+    elif isinstance(mutable, set):
+      mutable_key = frozenset(mutable)
+    else:
+      mutable_key = mutable
+    try:
+      key = (
+        weakref.ref(owner, _drop_apply_cache_entries),
+        cache_key,
+        mutable_key,
+        flags and tuple(flags.items()),
+        treedef,
+        is_dynamic,
+        static_leaves,
+      )
+      hash(key)
+    except TypeError:  # unhashable or not weakly referenceable
+      return uncached_fn(variables, *args, rngs=rngs, **kwargs)
+
+    def closed_fn(variables, rngs, dynamic_leaves):
+      dynamic_iter = iter(dynamic_leaves)
+      static_iter = iter(static_leaves)
+      args, kwargs = treedef.unflatten([
+        next(dynamic_iter) if dynamic else next(static_iter)
+        for dynamic in is_dynamic
+      ])
+      assert _apply_context.fn is not None
+      return _apply_context.fn(variables, *args, rngs=rngs, **kwargs)
+
+    # apply can be called from several threads
+    with _apply_cache_lock:
+      _purge_apply_cache()
+      jitted_fn = _apply_cache.get(key)
+      if jitted_fn is None:
+        jitted_fn = _apply_cache[key] = jax.jit(closed_fn)
+        while len(_apply_cache) > maxsize:
+          _apply_cache.popitem(last=False)
+      else:
+        _apply_cache.move_to_end(key)
+
+    dynamic_leaves = [x for x, dynamic in zip(leaves, is_dynamic) if dynamic]
+    previous_fn, _apply_context.fn = _apply_context.fn, uncached_fn
+    try:
+      return jitted_fn(variables, rngs, dynamic_leaves)
+    finally:
+      _apply_context.fn = previous_fn
+
+  return wrapper
+
+
 def init(
   fn: Callable[..., Any],
   mutable: CollectionFilter = True,
@@ -1155,6 +1305,40 @@ def lazy_init(
   )
 
 
+def deferred_init(
+  fn: Callable[..., Any],
+  mutable: CollectionFilter = True,
+  flags: Mapping | None = None,
+) -> Callable[..., partial_eval.DeferredInit]:
+  """Functionalizes a `Scope` function for deferred initialization.
+
+  Similar to ``lazy_init`` except that the variables are not computed.
+  Instead a ``DeferredInit`` is returned which materializes the variables on
+  demand, layer by layer and directly in their target sharding.
+
+  Example::
+
+    def f(scope, x):
+        k = scope.param("kernel", nn.initializers.lecun_normal(), (x.shape[-1], x.shape[-1]))
+        return x @ k
+    init_fn = deferred_init(f)
+    deferred = init_fn(random.key(0), jax.ShapeDtypeStruct((1, 128), jnp.float32))
+    variables = deferred.materialize()
+
+  Args:
+    fn: a function taking a `Scope` as its first argument.
+    mutable: the filter determining which variable collections are mutable.
+    flags: internal flags.
+
+  Returns:
+    `fn` with the scope partially applied. The deferred init function
+    returns a ``DeferredInit`` of the variables.
+  """
+  return partial_eval.deferred_init(
+    lambda *args, **kwargs: init(fn, mutable, flags)(*args, **kwargs)[1]
+  )
+
+
 def _is_valid_collection(col: VariableDict):
   if not isinstance(col, (FrozenDict, dict)):
     return False
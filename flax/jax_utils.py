@@ -15,9 +15,13 @@
 """Utilities we could consider upstreaming to Jax."""
 
 import collections
+import dataclasses
 import itertools
+import threading
+import time
 import warnings
-from collections.abc import Iterable  # pylint: disable=g-importing-member
+from collections.abc import Callable, Iterable, Iterator  # pylint: disable=g-importing-member
+from typing import Any
 
 import jax
 import jax.numpy as jnp
@@ -150,6 +154,242 @@ def prefetch_to_device(iterator, size, devices=None):
     enqueue(1)
 
 
+@dataclasses.dataclass(frozen=True)
+class PrefetchStats:
+  """Metrics of a :class:`DevicePrefetchIterator`.
+
+  Attributes:
+    queue_depth: number of items that are on device and ready to be consumed.
+    in_flight: number of items pulled from the source iterator that are still
+      being prepared by the workers.
+    items: number of items consumed so far.
+    stalls: number of times the consumer had to wait for an item.
+    stall_time: total time in seconds the consumer waited for items. If it
+      grows with the number of steps, the input pipeline is starving the
+      accelerator.
+    producer_wait_time: total time in seconds the workers waited for free
+      space in the buffer, summed over workers.
+  """
+
+  queue_depth: int
+  in_flight: int
+  items: int
+  stalls: int
+  stall_time: float
+  producer_wait_time: float
+
+
+class _PrefetchSlot:
+  __slots__ = ('done', 'value', 'error')
+
+  def __init__(self):
+    self.done = False
+    self.value = None
+    self.error: BaseException | None = None
+
+
+class DevicePrefetchIterator(Iterator[Any]):
+  """Prefetches the items of an iterator to device on background threads.
+
+  Pulling items from ``iterator``, optionally reshaping them for ``pmap`` and
+  transferring them to device happens on ``num_workers`` threads, overlapping
+  with the training step running on the main thread. Items are returned in
+  the order of ``iterator`` and at most ``size`` of them are prefetched.
+
+  Example::
+
+    it = jax_utils.DevicePrefetchIterator(
+      dataset, size=2, sharding=NamedSharding(mesh, P('data'))
+    )
+    for batch in it:
+      state = train_step(state, batch)
+    print(it.stats.stall_time)
+
+  Args:
+    iterator: an iterable yielding pytrees of arrays.
+    size: the maximum number of items prefetched, including the ones being
+      prepared by the workers.
+    sharding: a ``jax.sharding.Sharding``, or a pytree of shardings matching
+      the items, passed to ``jax.device_put``.
+    devices: devices to shard the leading dimension of the arrays over, like
+      ``prefetch_to_device``. Can't be used together with ``sharding``.
+    shard: if True, the leading dimension of the arrays is reshaped to
+      ``(num_devices, -1)`` first, like ``flax.training.common_utils.shard``.
+      The number of devices is ``len(devices)`` if given and
+      ``jax.local_device_count()`` otherwise.
+    transform: an optional function applied to each item on the workers before
+      reshaping and transferring it, e.g. host-side batching or augmentation.
+    num_workers: number of worker threads. Note that with more than one worker
+      the items of ``iterator`` are still pulled one at a time.
+  """
+
+  def __init__(
+    self,
+    iterator: Iterable[Any],
+    size: int = 2,
+    *,
+    sharding: Any = None,
+    devices: list[jax.Device] | None = None,
+    shard: bool = False,
+    transform: Callable[[Any], Any] | None = None,
+    num_workers: int = 1,
+  ):
+    if size < 1:
+      raise ValueError(f'size must be at least 1, got {size}.')
+    if num_workers < 1:
+      raise ValueError(f'num_workers must be at least 1, got {num_workers}.')
+    if sharding is not None and devices is not None:
+      raise ValueError('Only one of sharding and devices can be set.')
+    self._iterator = iter(iterator)
+    self._sharding = sharding
+    self._devices = devices
+    self._shard = shard
+    self._transform = transform
+    self._cond = threading.Condition()
+    self._iterator_lock = threading.Lock()
+    self._free_slots = threading.Semaphore(size)
+    self._queue: collections.deque[_PrefetchSlot] = collections.deque()
+    self._exhausted = False
+    self._closed = False
+    self._items = 0
+    self._stalls = 0
+    self._stall_time = 0.0
+    self._producer_wait_time = 0.0
+    self._workers = [
+      threading.Thread(target=self._worker_loop, daemon=True)
+      for _ in range(num_workers)
+    ]
+    self._num_running = num_workers
+    for worker in self._workers:
+      worker.start()
+
+  def _put(self, item):
+    if self._transform is not None:
+      item = self._transform(item)
+    if self._shard:
+      num_devices = (
+        len(self._devices)
+        if self._devices is not None
+        else jax.local_device_count()
+      )
+      item = jax.tree_util.tree_map(
+        lambda x: x.reshape((num_devices, -1) + x.shape[1:]), item
+      )
+    if self._devices is not None:
+      item = jax.tree_util.tree_map(
+        lambda x: jax.device_put_sharded(list(x), self._devices), item
+      )
+    else:
+      item = jax.device_put(item, self._sharding)
+    # wait for the transfer here so that the consumer never blocks on it.
+    return jax.block_until_ready(item)
+
+  def _worker_loop(self):
+    try:
+      while True:
+        start = time.perf_counter()
+        self._free_slots.acquire()
+        wait_time = time.perf_counter() - start
+        with self._iterator_lock:
+          if self._closed or self._exhausted:
+            self._free_slots.release()
+            return
+          slot = _PrefetchSlot()
+          try:
+            item = next(self._iterator)
+          except StopIteration:
+            self._exhausted = True
+            self._free_slots.release()
+            return
+          except Exception as e:  # pylint: disable=broad-except
+            # the error is raised by the consumer in place of the item.
+            self._exhausted = True
+            slot.error = e
+          with self._cond:
+            self._producer_wait_time += wait_time
+            self._queue.append(slot)
+        if slot.error is None:
+          try:
+            slot.value = self._put(item)
+          except Exception as e:  # pylint: disable=broad-except
+            slot.error = e
+        with self._cond:
+          slot.done = True
+          self._cond.notify_all()
+    finally:
+      with self._cond:
+        self._num_running -= 1
+        self._cond.notify_all()
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    with self._cond:
+      def is_ready():
+        return (
+          (self._queue and self._queue[0].done)
+          or (not self._queue and self._num_running == 0)
+          or self._closed
+        )
+
+      if not is_ready():
+        start = time.perf_counter()
+        self._cond.wait_for(is_ready)
+        self._stalls += 1
+        self._stall_time += time.perf_counter() - start
+      if self._closed or not self._queue:
+        raise StopIteration
+      slot = self._queue.popleft()
+      self._items += 1
+    self._free_slots.release()
+    if slot.error is not None:
+      raise slot.error
+    return slot.value
+
+  @property
+  def stats(self) -> PrefetchStats:
+    """Returns the current metrics of the prefetch pipeline."""
+    with self._cond:
+      queue_depth = sum(slot.done for slot in self._queue)
+      return PrefetchStats(
+        queue_depth=queue_depth,
+        in_flight=len(self._queue) - queue_depth,
+        items=self._items,
+        stalls=self._stalls,
+        stall_time=self._stall_time,
+        producer_wait_time=self._producer_wait_time,
+      )
+
+  def close(self, timeout: float | None = 10.0):
+    """Stops the workers, prefetched items are discarded.
+
+    Args:
+      timeout: the maximum number of seconds to wait for the workers to stop,
+        or ``None`` to wait until they do. Workers finish the item they are
+        pulling or transferring before stopping.
+    """
+    with self._cond:
+      self._closed = True
+      self._queue.clear()
+      self._cond.notify_all()
+    # wake up the workers waiting for a free slot.
+    for _ in self._workers:
+      self._free_slots.release()
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    for worker in self._workers:
+      if deadline is None:
+        worker.join()
+      else:
+        worker.join(max(0.0, deadline - time.perf_counter()))
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+
 def _scan_nd(body_fn, init, xs, n=1, unroll=(1,)):
   """Utility for performing an n-dimensional `lax.scan`.
 
@@ -68,11 +68,13 @@ from .attention import (
     MultiHeadAttention as MultiHeadAttention,
     MultiHeadDotProductAttention as MultiHeadDotProductAttention,
     SelfAttention as SelfAttention,
+    blockwise_dot_product_attention as blockwise_dot_product_attention,
     combine_masks as combine_masks,
     dot_product_attention_weights as dot_product_attention_weights,
     dot_product_attention as dot_product_attention,
     make_attention_mask as make_attention_mask,
     make_causal_mask as make_causal_mask,
+    rollback_cache as rollback_cache,
 )
 from .batch_apply import BatchApply as BatchApply
 from .combinators import Sequential as Sequential
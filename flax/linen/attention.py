@@ -17,6 +17,7 @@ from __future__ import annotations
 
 import functools
 import inspect
+import math
 import warnings
 from typing import Any, overload
 from collections.abc import Callable
@@ -180,6 +181,7 @@ def dot_product_attention(
     einsum_dot_general: Callable[..., Array] | None = None,
     qk_attn_weights_einsum: Callable[..., Array] | None = None,
     attn_weights_value_einsum: Callable[..., Array] | None = None,
+    backend: str | None = None,
 ):
   """Computes dot-product attention given query, key, and value.
 
@@ -187,6 +189,17 @@ def dot_product_attention(
   https://arxiv.org/abs/1706.03762. It calculates the attention weights given
   query and key and combines the values using the attention weights.
 
+  ``backend`` selects the implementation:
+
+  * ``'einsum'`` (default): computes the attention weights explicitly with
+    :func:`dot_product_attention_weights`, supports all arguments.
+  * ``'jax'``: uses the fused ``jax.nn.dot_product_attention``.
+  * ``'blockwise'``: uses :func:`blockwise_dot_product_attention`, memory
+    grows linearly instead of quadratically with the sequence length.
+
+  The ``'jax'`` and ``'blockwise'`` backends never materialize the attention
+  weights so they don't support dropout, ``module`` or custom einsums.
+
   .. note::
     ``query``, ``key``, ``value`` needn't have any batch dimensions.
 
@@ -226,6 +239,8 @@ def dot_product_attention(
       attention weights and the values. When unspecified, the default
       `jnp.einsum` will be used. This argument is mutually exclusive with
       `precision` and `einsum_dot_general`.
+    backend: one of ``'einsum'``, ``'jax'`` or ``'blockwise'``, see above.
+      ``None`` means ``'einsum'``.
 
   Returns:
     Output of shape ``[batch..., q_length, num_heads, v_depth_per_head]``.
@@ -235,6 +250,11 @@ def dot_product_attention(
     `qk_attn_weights_einsum`/`attn_weights_value_einsum` are
       specified.
   """
+  if backend not in (None, 'einsum', 'jax', 'blockwise'):
+    raise ValueError(
+        "backend must be one of 'einsum', 'jax' or 'blockwise', got"
+        f' {backend!r}.'
+    )
   if (qk_attn_weights_einsum and not attn_weights_value_einsum) or (
       not qk_attn_weights_einsum and attn_weights_value_einsum
   ):
@@ -262,6 +282,24 @@ def dot_product_attention(
   ), 'q, k, v num_heads must match.'
   assert key.shape[-3] == value.shape[-3], 'k, v lengths must match.'
 
+  if backend in ('jax', 'blockwise'):
+    if (
+        module is not None
+        or (dropout_rate > 0.0 and not deterministic)
+        or einsum_dot_general
+        or qk_attn_weights_einsum
+    ):
+      raise ValueError(
+          f'backend={backend!r} does not materialize the attention weights,'
+          ' it does not support dropout, module or custom einsums. Use'
+          " backend='einsum' instead."
+      )
+    if backend == 'jax':
+      return _fused_dot_product_attention(query, key, value, bias, mask)
+    return blockwise_dot_product_attention(
+        query, key, value, bias, mask, precision=precision
+    )
+
   # compute attention weights
   attn_weights = dot_product_attention_weights(
       query,
@@ -295,6 +333,237 @@ def dot_product_attention(
   )
 
 
+def _fused_dot_product_attention(query, key, value, bias, mask):
+  # jax.nn.dot_product_attention requires a single batch dimension
+  query_shape = query.shape
+  if len(query_shape) > 4:
+
+    def reshape_4d(x):
+      return jnp.reshape(x, (math.prod(x.shape[:-3]), *x.shape[-3:]))
+
+    query, key, value, bias, mask = jax.tree.map(
+        reshape_4d, (query, key, value, bias, mask)
+    )
+  if mask is not None:
+    mask = mask.astype(jnp.bool_)
+  out = jax.nn.dot_product_attention(query, key, value, bias, mask)
+  if len(query_shape) > 4:
+    out = jnp.reshape(out, (*query_shape[:-1], value.shape[-1]))
+  return out
+
+
+def _check_attention_backend(attention_fn: Callable[..., Array], backend):
+  """Raises a ``ValueError`` if ``attention_fn`` can't take ``backend``."""
+  if backend is None:
+    return
+  parameters = inspect.signature(attention_fn).parameters
+  if 'backend' not in parameters and not any(
+      p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters.values()
+  ):
+    raise ValueError(
+        f'attention_backend={backend!r} was set but attention_fn '
+        f'{attention_fn!r} does not accept a `backend` argument.'
+    )
+
+
+def blockwise_dot_product_attention(
+    query: Array,
+    key: Array,
+    value: Array,
+    bias: Array | None = None,
+    mask: Array | None = None,
+    *,
+    dtype: Dtype | None = None,
+    precision: PrecisionLike = None,
+    q_chunk_size: int = 512,
+    kv_chunk_size: int = 512,
+):
+  """Computes dot-product attention without materializing the attention weights.
+
+  Equivalent to :func:`dot_product_attention` without dropout, up to floating
+  point reassociation. Queries are processed in chunks of ``q_chunk_size``
+  and for each chunk the keys and values are processed in chunks of
+  ``kv_chunk_size`` using an online softmax (as in FlashAttention), so the
+  largest intermediate has shape ``[batch, num_heads, q_chunk_size,
+  kv_chunk_size]`` instead of ``[batch..., num_heads, q_length, kv_length]``.
+  Scores and the softmax are accumulated in float32. It is written with
+  ``lax.map`` and ``lax.scan`` and runs on any backend, including CPU.
+
+  ``bias`` and ``mask`` are sliced per chunk and dimensions of size 1 are not
+  broadcasted, e.g. a padding mask of shape ``[batch, 1, 1, kv_length]``
+  doesn't grow with the query length.
+
+  Args:
+    query: queries with shape ``[batch..., q_length, num_heads,
+      qk_depth_per_head]``.
+    key: keys with shape ``[batch..., kv_length, num_heads,
+      qk_depth_per_head]``.
+    value: values with shape ``[batch..., kv_length, num_heads,
+      v_depth_per_head]``.
+    bias: bias for the attention weights, broadcastable to ``[batch...,
+      num_heads, q_length, kv_length]``.
+    mask: mask for the attention weights, broadcastable to ``[batch...,
+      num_heads, q_length, kv_length]``. Attention weights are masked out if
+      their corresponding mask value is ``False``.
+    dtype: the dtype of the computation (default: infer from inputs)
+    precision: numerical precision of the computation see
+      ``jax.lax.Precision`` for details.
+    q_chunk_size: number of queries processed at once.
+    kv_chunk_size: number of keys and values processed at once.
+
+  Returns:
+    Output of shape ``[batch..., q_length, num_heads, v_depth_per_head]``.
+  """
+  return _blockwise_attention(
+      query,
+      key,
+      value,
+      bias,
+      mask,
+      promote_dtype=lambda arrays, dtype: promote_dtype(*arrays, dtype=dtype),
+      dtype=dtype,
+      precision=precision,
+      q_chunk_size=q_chunk_size,
+      kv_chunk_size=kv_chunk_size,
+  )
+
+
+def _blockwise_attention(
+    query: Array,
+    key: Array,
+    value: Array,
+    bias: Array | None,
+    mask: Array | None,
+    *,
+    promote_dtype: Callable[..., tuple[Array, ...]],
+    dtype: Dtype | None,
+    precision: PrecisionLike,
+    q_chunk_size: int,
+    kv_chunk_size: int,
+):
+  """Implementation of :func:`blockwise_dot_product_attention`.
+
+  Shared with ``flax.nnx``, ``promote_dtype`` is called with a tuple of
+  ``(query, key, value)`` and a ``dtype`` keyword argument.
+  """
+  query, key, value = promote_dtype((query, key, value), dtype=dtype)
+  dtype = query.dtype
+  assert key.ndim == query.ndim == value.ndim, 'q, k, v must have same rank.'
+  assert (
+      query.shape[:-3] == key.shape[:-3] == value.shape[:-3]
+  ), 'q, k, v batch dims must match.'
+  assert (
+      query.shape[-2] == key.shape[-2] == value.shape[-2]
+  ), 'q, k, v num_heads must match.'
+  assert key.shape[-3] == value.shape[-3], 'k, v lengths must match.'
+
+  batch_dims = query.shape[:-3]
+  q_length, num_heads, depth = query.shape[-3:]
+  kv_length = key.shape[-3]
+  batch = math.prod(batch_dims)
+  q_chunk = min(q_chunk_size, q_length)
+  kv_chunk = min(kv_chunk_size, kv_length)
+  num_q_chunks = -(-q_length // q_chunk)
+  num_kv_chunks = -(-kv_length // kv_chunk)
+  q_pad = num_q_chunks * q_chunk - q_length
+  kv_pad = num_kv_chunks * kv_chunk - kv_length
+
+  def pad_length(x, pad):
+    # x has shape [batch, length, num_heads, depth]
+    return jnp.pad(x, ((0, 0), (0, pad), (0, 0), (0, 0))) if pad else x
+
+  query = query / jnp.sqrt(depth).astype(dtype)
+  query = pad_length(query.reshape((batch, *query.shape[-3:])), q_pad)
+  key = pad_length(key.reshape((batch, *key.shape[-3:])), kv_pad)
+  value = pad_length(value.reshape((batch, *value.shape[-3:])), kv_pad)
+
+  def prepare(x):
+    # returns x with shape [batch or 1, num_heads or 1, q or 1, kv or 1]
+    if x is None:
+      return None
+    x = jnp.asarray(x)
+    x = x.reshape((1,) * (len(batch_dims) + 3 - x.ndim) + x.shape)
+    if all(d == 1 for d in x.shape[:-3]):
+      x = x.reshape(x.shape[-3:])[None]
+    else:
+      x = jnp.broadcast_to(x, batch_dims + x.shape[-3:])
+      x = x.reshape((batch, *x.shape[-3:]))
+    pad = [(0, 0), (0, 0), (0, 0), (0, 0)]
+    if x.shape[2] > 1:
+      pad[2] = (0, q_pad)
+    if x.shape[3] > 1:
+      pad[3] = (0, kv_pad)
+    return jnp.pad(x, pad)
+
+  def chunk(x, q_start, kv_start):
+    if x.shape[2] > 1:
+      x = lax.dynamic_slice_in_dim(x, q_start, q_chunk, axis=2)
+    if x.shape[3] > 1:
+      x = lax.dynamic_slice_in_dim(x, kv_start, kv_chunk, axis=3)
+    return x
+
+  bias, mask = prepare(bias), prepare(mask)
+  big_neg = jnp.finfo(dtype).min
+
+  def attend_q_chunk(q_index):
+    q_start = q_index * q_chunk
+    q = lax.dynamic_slice_in_dim(query, q_start, q_chunk, axis=1)
+
+    # recompute the scores of each chunk during the backward pass instead of
+    # storing them
+    @functools.partial(jax.checkpoint, prevent_cse=False)
+    def kv_step(carry, kv_index):
+      running_max, normalizer, acc = carry
+      kv_start = kv_index * kv_chunk
+      k = lax.dynamic_slice_in_dim(key, kv_start, kv_chunk, axis=1)
+      v = lax.dynamic_slice_in_dim(value, kv_start, kv_chunk, axis=1)
+      scores = jnp.einsum(
+          'bqhd,bkhd->bhqk',
+          q,
+          k,
+          precision=precision,
+          preferred_element_type=jnp.float32,
+      )
+      if bias is not None:
+        scores = scores + chunk(bias, q_start, kv_start)
+      if mask is not None:
+        scores = jnp.where(chunk(mask, q_start, kv_start), scores, big_neg)
+      if kv_pad:
+        valid = kv_start + jnp.arange(kv_chunk) < kv_length
+        scores = jnp.where(valid, scores, -jnp.inf)
+      new_max = jnp.maximum(running_max, scores.max(axis=-1))
+      # avoid inf - inf if all scores seen so far are -inf
+      safe_max = jnp.where(jnp.isneginf(new_max), 0.0, new_max)
+      weights = jnp.exp(scores - safe_max[..., None])
+      correction = jnp.exp(running_max - safe_max)
+      normalizer = normalizer * correction + weights.sum(axis=-1)
+      acc = acc * correction[..., None] + jnp.einsum(
+          'bhqk,bkhd->bhqd',
+          weights,
+          v.astype(jnp.float32),
+          precision=precision,
+      )
+      return (new_max, normalizer, acc), None
+
+    init = (
+        jnp.full((batch, num_heads, q_chunk), -jnp.inf, jnp.float32),
+        jnp.zeros((batch, num_heads, q_chunk), jnp.float32),
+        jnp.zeros((batch, num_heads, q_chunk, value.shape[-1]), jnp.float32),
+    )
+    (_, normalizer, acc), _ = lax.scan(kv_step, init, jnp.arange(num_kv_chunks))
+    out = acc / normalizer[..., None]
+    return out.transpose(0, 2, 1, 3).astype(dtype)
+
+  # [num_q_chunks, batch, q_chunk, num_heads, v_depth]
+  out = lax.map(attend_q_chunk, jnp.arange(num_q_chunks))
+  out = jnp.moveaxis(out, 0, 1).reshape(
+      (batch, num_q_chunks * q_chunk, num_heads, value.shape[-1])
+  )
+  return out[:, :q_length].reshape(
+      (*batch_dims, q_length, num_heads, value.shape[-1])
+  )
+
+
 class MultiHeadDotProductAttention(Module):
   """Multi-head dot-product attention.
 
@@ -369,12 +638,19 @@ class MultiHeadDotProductAttention(Module):
     attention_fn: dot_product_attention or compatible function. Accepts query,
       key, value, and returns output of shape ``[bs, dim1, dim2, ..., dimN,,
       num_heads, value_channels]``
-    decode: Whether to prepare and use an autoregressive cache.
+    decode: Whether to prepare and use an autoregressive cache. Each call
+      appends the passed positions to the cache, several positions attend
+      causally to each other, see :func:`rollback_cache`.
     normalize_qk: Should QK normalization be applied (arxiv.org/abs/2302.05442).
     qk_attn_weights_einsum_cls: factory function to create the einsum for
       computing the attention weights.
     attn_weights_value_einsum_cls: factory function to create the einsum for
       computing the product of the attention weights and the values.
+    attention_backend: passed as ``backend`` to ``attention_fn``, one of
+      ``'einsum'``, ``'jax'`` or ``'blockwise'`` for
+      :func:`dot_product_attention`. ``None`` uses the default of
+      ``attention_fn``. A ``ValueError`` is raised if it is set and
+      ``attention_fn`` doesn't accept a ``backend`` argument.
   """
 
   num_heads: int
@@ -404,6 +680,7 @@ class MultiHeadDotProductAttention(Module):
   attn_weights_value_einsum_cls: Callable[..., Callable[..., Array]] | None = (
       None
   )
+  attention_backend: str | None = None
 
   @overload
   def __call__(
@@ -588,14 +865,25 @@ class MultiHeadDotProductAttention(Module):
           num_heads,
           depth_per_head,
         ) = cached_key.value.shape
-        # shape check of cached keys against query input
-        expected_shape = tuple(batch_dims) + (1, num_heads, depth_per_head)
+        # shape check of cached keys against query input, a step can decode
+        # several positions at once, e.g. to verify speculative draft tokens
+        num_new = query.shape[-3]
+        expected_shape = tuple(batch_dims) + (
+          num_new,
+          num_heads,
+          depth_per_head,
+        )
         if expected_shape != query.shape:
           raise ValueError(
             'Autoregressive cache shape error, '
             'expected query shape %s instead got %s.'
             % (expected_shape, query.shape)
           )
+        if not 0 < num_new <= max_length:
+          raise ValueError(
+            'Autoregressive cache length error, a decode step must write '
+            f'between 1 and {max_length} positions, got {num_new}.'
+          )
         # update key, value caches with our new 1d spatial slices
         cur_index = cache_index.value
         zero = jnp.array(0, dtype=lax.dtype(cur_index.dtype))
@@ -610,16 +898,17 @@ class MultiHeadDotProductAttention(Module):
         value = lax.dynamic_update_slice(cached_value.value, value, indices)
         cached_key.value = key
         cached_value.value = value
-        cache_index.value = cache_index.value + 1
+        cache_index.value = cache_index.value + num_new
         # causal mask for cached decoder self-attention:
-        # our single query position should only attend to those key
-        # positions that have already been generated and cached,
+        # each query position should only attend to those key positions
+        # that have already been generated and cached up to itself,
         # not the remaining zero elements.
+        query_index = cur_index + jnp.arange(num_new)
         mask = combine_masks(
           mask,
           jnp.broadcast_to(
-            jnp.arange(max_length) <= cur_index,
-            tuple(batch_dims) + (1, 1, max_length),
+            jnp.arange(max_length)[None, :] <= query_index[:, None],
+            tuple(batch_dims) + (1, num_new, max_length),
           ),
         )
 
@@ -668,6 +957,9 @@ class MultiHeadDotProductAttention(Module):
         for k, v in attn_kwargs.items()
         if k in inspect.signature(self.attention_fn).parameters
     }
+    if self.attention_backend is not None:
+      _check_attention_backend(self.attention_fn, self.attention_backend)
+      attn_kwargs['backend'] = self.attention_backend
     if sow_weights:
       x = self.attention_fn(*attn_args, **attn_kwargs, module=self)
     else:
@@ -909,3 +1201,39 @@ def combine_masks(
   for other_mask in other_masks:
     mask = jnp.logical_and(mask, other_mask)
   return mask.astype(dtype)
+
+
+def rollback_cache(cache: Any, num_tokens: int | Array) -> Any:
+  """Discards the last ``num_tokens`` positions of autoregressive caches.
+
+  Rewinds every ``cache_index`` in ``cache`` so the next decode step
+  overwrites the discarded positions, without copying the cached keys and
+  values. This is used by speculative decoding to drop rejected draft tokens
+  after decoding several positions in one step::
+
+    >>> import flax.linen as nn
+    >>> import jax, jax.numpy as jnp
+    ...
+    >>> layer = nn.MultiHeadDotProductAttention(num_heads=2, decode=True)
+    >>> variables = layer.init(jax.random.key(0), jnp.ones((1, 16, 4)))
+    >>> y, updates = layer.apply(
+    ...   variables, jnp.ones((1, 4, 4)), mutable=['cache']
+    ... )  # verify 4 draft tokens
+    >>> cache = nn.rollback_cache(updates['cache'], 3)  # accept the first one
+    >>> cache['cache_index']
+    Array(1, dtype=int32)
+
+  Args:
+    cache: the ``'cache'`` collection of a model, or any subtree of it.
+    num_tokens: number of positions to discard.
+
+  Returns:
+    A copy of ``cache`` with the rewound ``cache_index`` entries.
+  """
+
+  def rewind(path, x):
+    if getattr(path[-1], 'key', None) == 'cache_index':
+      return jnp.maximum(x - num_tokens, 0).astype(x.dtype)
+    return x
+
+  return jax.tree_util.tree_map_with_path(rewind, cache)
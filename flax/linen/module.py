@@ -21,6 +21,7 @@ import functools
 import inspect
 import sys
 import threading
+import types
 import typing
 import weakref
 from types import MappingProxyType
@@ -36,6 +37,7 @@ from collections.abc import Callable, Iterable, Iterator, Mapping
 
 import jax
 import jax.numpy as jnp
+import numpy as np
 import typing_extensions as tpe
 
 import flax
@@ -455,6 +457,16 @@ def _map_over_modules_in_tree(fn, tree_or_leaf):
     )
 
 
+_ATOMIC_ATTR_TYPES = frozenset(
+  {type(None), bool, int, float, complex, str, bytes, types.FunctionType}
+)
+
+
+def _is_atomic_attr(val: Any) -> bool:
+  """Whether ``_register_submodules`` would leave ``val`` unchanged."""
+  return type(val) in _ATOMIC_ATTR_TYPES or isinstance(val, np.dtype)
+
+
 def _freeze_attr(val: Any) -> Any:
   """Recursively wrap the given attribute `var` in ``FrozenDict``."""
   if isinstance(val, (dict, FrozenDict)):
@@ -674,6 +686,23 @@ def _get_local_descriptor_names(
   return tuple(true_properties.difference(set(exclude)))
 
 
+# Skip interceptor, capture and tabulate handling for method calls when none of
+# them is active.
+# -----------------------------------------------------------------------------
+_use_fast_dispatch = True
+
+
+@dataclasses.dataclass(frozen=True)
+class _MethodPlan:
+  """Properties of a wrapped method that are fixed at class creation."""
+
+  fun_name: str
+  is_compact: bool
+  is_setup: bool
+  # appended to the Module name to derive the profiling name
+  method_suffix: str
+
+
 def wrap_method_once(fun: Callable[..., Any]) -> Callable[..., Any]:
   """Manages Module state for a given user-defined method.
 
@@ -689,6 +718,14 @@ def wrap_method_once(fun: Callable[..., Any]) -> Callable[..., Any]:
   if hasattr(fun, 'method_handler_wrapped'):
     return fun
 
+  fun_name = _get_fn_name(fun)
+  plan = _MethodPlan(
+    fun_name=fun_name,
+    is_compact=hasattr(fun, 'compact'),
+    is_setup=fun_name == 'setup',
+    method_suffix=f'.{fun_name}' if fun_name != '__call__' else '',
+  )
+
   @functools.wraps(fun)
   def wrapped_module_method(*args, **kwargs):
     # We might have incorrectly wrappped a callable
@@ -696,6 +733,12 @@ def wrap_method_once(fun: Callable[..., Any]) -> Callable[..., Any]:
     # otherwise call the wrapped function as is.
     if args and isinstance(args[0], Module):
       self, args = args[0], args[1:]
+      if _use_fast_dispatch and not plan.is_setup and not (
+        _global_interceptor_stack
+        or _context.call_info_stack
+        or (_context.capture_stack and _context.capture_stack[-1])
+      ):
+        return self._call_wrapped_method_fast(fun, plan, args, kwargs)
       return self._call_wrapped_method(fun, args, kwargs)
     else:
       return fun(*args, **kwargs)
@@ -1043,6 +1086,7 @@ class Module(ModuleBase):
     # We wrap user-defined methods including setup and __call__ to enforce
     # a number of different checks and to provide clear error messages.
     cls._find_compact_name_scope_methods()
+    cls._find_attribute_fields()
     cls._wrap_module_attributes()
     # Set empty class defaults.
     cls._state = _uninitialized_module_internal_state  # type: ignore[attr-defined]
@@ -1131,6 +1175,15 @@ class Module(ModuleBase):
     )
     cls._compact_name_scope_methods = compact_name_scope_fns
 
+  @classmethod
+  def _find_attribute_fields(cls):
+    """Finds the dataclass fields whose values are registered on setup."""
+    cls._attribute_fields = tuple(
+      field.name
+      for field in dataclasses.fields(cls)  # type: ignore[arg-type]
+      if field.name not in ('parent', 'name') and field.init
+    )
+
   @classmethod
   def _wrap_module_attributes(cls):
     """Wraps user-defined non-inherited methods and descriptors with state
@@ -1249,6 +1302,36 @@ class Module(ModuleBase):
       if (is_compact_method or is_setup_method) and not is_recurrent:
         self._state.reset()
 
+  def _call_wrapped_method_fast(self, fun, plan: _MethodPlan, args, kwargs):
+    """Calls a wrapped method without interceptors or capture.
+
+    Equivalent to :meth:`_call_wrapped_method` when no interceptors,
+    ``capture_intermediates`` filter or ``tabulate`` context are active, in
+    which case most of its bookkeeping is a no-op. Method properties are read
+    from ``plan`` instead of being recomputed on every call.
+    """
+    self._try_setup()
+    is_compact_method = plan.is_compact
+    if is_compact_method:
+      if self.scope is None:
+        raise errors.CallCompactUnboundModuleError()
+      is_recurrent = self._state.in_compact_method
+      self._state.in_compact_method = True
+    module_stack = _context.module_stack
+    module_stack.append(self)
+    try:
+      if _use_named_call:
+        name = (self.name or type(self).__name__) + plan.method_suffix
+        with jax.named_scope(name):
+          return fun(self, *args, **kwargs)
+      return fun(self, *args, **kwargs)
+    finally:
+      module_stack.pop()
+      if is_compact_method:
+        object.__setattr__(self, 'scope', self.scope.rewound())
+        if not is_recurrent:
+          self._state.reset()
+
   def __setattr__(self, name: str, val: Any):
     """Sets an attribute on this Module.
 
@@ -1487,9 +1570,11 @@ class Module(ModuleBase):
         # A shallow setup will only register attribute submodules but it does
         # not call the user's setup. This avoids running before a
         # transformation.
-        for field in dataclasses.fields(self):
-          if field.name not in ('parent', 'name') and field.init:
-            self._register_submodules(field.name, getattr(self, field.name))
+        for field_name in self._attribute_fields:
+          val = getattr(self, field_name)
+          # atomic values contain no Modules and are already frozen
+          if not _is_atomic_attr(val):
+            self._register_submodules(field_name, val)
         if not shallow:
           self.setup()
           # create NonTransparent Modules
@@ -2182,6 +2267,15 @@ class Module(ModuleBase):
       >>> # same output (key(0))
       >>> np.testing.assert_allclose(out2, out3)
 
+    If ``config.flax_linen_apply_cache_size`` is positive, ``apply`` on an
+    unbound, hashable Module runs a ``jax.jit`` compiled function that is
+    cached on the Module, ``method``, ``mutable``, the input avals and the value
+    of all non-numeric Python arguments. Python numbers are traced like arrays,
+    so they can't be used in Python control flow. Repeated calls then skip
+    Module construction and ``setup``, so the applied method must be free of
+    Python side effects. The cache references the Module weakly, its entries
+    are dropped when the Module is garbage collected.
+
     Args:
       variables: A dictionary containing variables keyed by variable
         collections. See :mod:`flax.core.variables` for more details about
@@ -2238,6 +2332,13 @@ class Module(ModuleBase):
     elif method is None:
       method = self.__call__
     method = _get_unbound_fn(method)
+    if config.flax_linen_apply_cache_size > 0 and self.scope is None:
+      scope_fn, mutable = _apply_scope_fn(
+        method, self, mutable, capture_intermediates
+      )
+      return core.scope.cached_apply(
+        scope_fn, self, (method, capture_intermediates), mutable=mutable
+      )(variables, *args, **kwargs, rngs=rngs)
     return apply(
       method,
       self,
@@ -2511,6 +2612,59 @@ class Module(ModuleBase):
 
     return partial_eval.lazy_init(lazy_wrapper)(rngs, *args, **kwargs)
 
+  def deferred_init(
+    self,
+    rngs: PRNGKey | RNGSequences,
+    *args,
+    method: Callable[..., Any] | None = None,
+    mutable: CollectionFilter = DenyList('intermediates'),
+    **kwargs,
+  ) -> partial_eval.DeferredInit:
+    """Traces the initialization of a module without computing the variables.
+
+    Like :meth:`lazy_init` the inputs can be passed as ``jax.ShapeDtypeStruct``
+    but no variables are computed. Instead the returned ``DeferredInit``
+    records how each variable is initialized, including its initializer and
+    rng, and materializes the variables on demand one layer at a time,
+    directly in their target sharding. This way no host has to hold more than
+    a single layer of unsharded variables.
+
+    Example::
+
+      >>> model = nn.Dense(features=256)
+      >>> deferred = model.deferred_init(
+      ...     jax.random.key(0), jax.ShapeDtypeStruct((1, 128), jnp.float32))
+      >>> jax.tree.map(jnp.shape, deferred.abstract)
+      {'params': {'bias': (256,), 'kernel': (128, 256)}}
+      >>> variables = deferred.materialize()
+
+    ``materialize`` accepts a pytree prefix of shardings, e.g. the output of
+    :func:`flax.linen.get_sharding` on ``deferred.abstract``, and
+    ``materialize_iter`` yields the variables layer by layer, e.g. to save
+    them to a checkpoint.
+
+    Args:
+      rngs: The rngs for the variable collections.
+      *args: arguments passed to the init function.
+      method: An optional method. If provided, applies this method. If not
+        provided, applies the ``__call__`` method.
+      mutable: Can be bool, str, or list. Specifies which collections should be
+        treated as mutable: ``bool``: all/no collections are mutable. ``str``:
+        The name of a single mutable collection. ``list``: A list of names of
+        mutable collections. By default all collections except "intermediates"
+        are mutable.
+      **kwargs: Keyword arguments passed to the init function.
+
+    Returns:
+      A ``DeferredInit`` of the variable dict.
+    """
+    Module._module_checks(self)
+
+    def deferred_wrapper(rngs, *args, **kwargs):
+      return self.init(rngs, *args, method=method, mutable=mutable, **kwargs)
+
+    return partial_eval.deferred_init(deferred_wrapper)(rngs, *args, **kwargs)
+
   @property
   def variables(self) -> VariableDict:
     """Returns the variables in this module."""
@@ -3016,6 +3170,20 @@ def apply(
     The apply function wrapping ``fn``.
   """
 
+  scope_fn, mutable = _apply_scope_fn(
+    fn, module, mutable, capture_intermediates
+  )
+  return core.apply(scope_fn, mutable=mutable)
+
+
+def _apply_scope_fn(
+  fn: Callable[..., Any],
+  module: Module,
+  mutable: CollectionFilter,
+  capture_intermediates: bool | Callable[[Module, str], bool],
+) -> tuple[Callable[..., Any], CollectionFilter]:
+  """Returns the scope function and mutable filter used by ``apply``."""
+
   @functools.wraps(fn)
   def scope_fn(scope, *args, **kwargs):
     _context.capture_stack.append(capture_intermediates)
@@ -3028,7 +3196,7 @@ def apply(
     capture_intermediates = capture_call_intermediates
   if capture_intermediates:
     mutable = union_filters(mutable, 'intermediates')
-  return core.apply(scope_fn, mutable=mutable)
+  return scope_fn, mutable
 
 
 @traceback_util.api_boundary
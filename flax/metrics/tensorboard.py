@@ -121,6 +121,22 @@ class SummaryWriter:
     with self._as_default(self._event_writer):
       tf.summary.scalar(name=tag, data=value, step=step)
 
+  def write_scalars(self, step, scalars):
+    """Saves several scalar values of the same step.
+
+    The values are written in a single summary context, so with
+    ``auto_flush`` the event file is flushed once per call instead of once
+    per value. The signature matches the ``write_fn`` of
+    :class:`flax.nnx.metrics.MetricLogger`.
+
+    Args:
+      step: int: training step
+      scalars: dict mapping labels to int/float numbers to log
+    """
+    with self._as_default(self._event_writer):
+      for tag, value in scalars.items():
+        tf.summary.scalar(name=tag, data=float(np.array(value)), step=step)
+
   def image(self, tag, image, step, max_outputs=3):
     """Saves RGB image summary from np.ndarray [H,W], [H,W,1], or [H,W,3].
 
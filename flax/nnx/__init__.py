@@ -19,6 +19,7 @@ from flax.linen.pooling import pool as pool
 from flax.typing import Initializer as Initializer
 
 from .bridge import wrappers as wrappers
+from . import profiling as profiling
 from .filterlib import WithTag as WithTag
 from .filterlib import PathContains as PathContains
 from .filterlib import OfType as OfType
@@ -88,6 +89,7 @@ from .nn.activations import tanh as tanh
 from .nn.attention import MultiHeadAttention as MultiHeadAttention
 from .nn.attention import combine_masks as combine_masks
 from .nn.attention import dot_product_attention as dot_product_attention
+from .nn.attention import blockwise_dot_product_attention as blockwise_dot_product_attention
 from .nn.attention import make_attention_mask as make_attention_mask
 from .nn.attention import make_causal_mask as make_causal_mask
 from .nn.recurrent import RNNCellBase as RNNCellBase
@@ -145,6 +147,7 @@ from .training.optimizer import OptArray as OptArray
 from .training.optimizer import OptVariable as OptVariable
 from .training.optimizer import Optimizer as Optimizer
 from .training.optimizer import ModelAndOptimizer as ModelAndOptimizer
+from .training.optimizer import MicroBatched as MicroBatched
 from .training.optimizer import OptState as OptState
 from .transforms.autodiff import DiffState as DiffState
 from .transforms.autodiff import grad as grad
@@ -159,6 +162,7 @@ from .transforms.iteration import scan as scan
 from .transforms.iteration import vmap as vmap
 from .transforms.iteration import pmap as pmap
 from .transforms.transforms import eval_shape as eval_shape
+from .transforms.transforms import deferred_init as deferred_init
 from .transforms.transforms import cond as cond
 from .transforms.transforms import switch as switch
 from .transforms.transforms import checkify as checkify
@@ -93,7 +93,7 @@ def _maybe_call_setup(module: Module):
     )
     try:
       module.setup()  # type: ignore[attribute-error]
-      module._object__state._is_setup = True
+      module._object__state.is_setup = True
     finally:
       MODULE_CONTEXT.module_stack.pop()
 
@@ -245,7 +245,7 @@ class Module(nnx_module.Module, ModuleBase, metaclass=ModuleMeta):
         graph.update(value, state)
       for leaf in jax.tree.leaves(value, is_leaf=graph.is_graph_node):
         if isinstance(leaf, Module):
-          leaf._object__state._initializing = self.is_initializing()
+          leaf._object__state.initializing = self.is_initializing()
           _bind_module(self, leaf)
     super()._setattr(name, value)
 
@@ -473,7 +473,7 @@ class Module(nnx_module.Module, ModuleBase, metaclass=ModuleMeta):
     # set temporary state
     for _, value in graph.iter_graph(module):
       if isinstance(value, Object):
-        value._object__state._initializing = _initialize
+        value._object__state.initializing = _initialize
       if isinstance(value, Module):
         value.scope = Scope(rngs, mutable)
         _maybe_call_setup(value)
@@ -488,7 +488,7 @@ class Module(nnx_module.Module, ModuleBase, metaclass=ModuleMeta):
       # reset temporary state
       for _, value in graph.iter_graph(module):
         if isinstance(value, Object):
-          value._object__state._initializing = False
+          value._object__state.initializing = False
         if isinstance(value, Module):
           value.scope = None
 
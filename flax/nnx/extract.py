@@ -20,7 +20,7 @@ import jax
 from flax import struct
 from flax.nnx.object import Object
 from flax.typing import Missing, PathParts
-from flax.nnx import graph, variablelib
+from flax.nnx import graph, profiling, variablelib
 
 
 A = tp.TypeVar('A')
@@ -196,6 +196,7 @@ def default_split_fn(
   return NodeStates.from_split(*ctx.split(leaf))
 
 
+@profiling.profile('to_tree')
 def to_tree(
   tree,
   /,
@@ -270,6 +271,7 @@ def is_tree_node(x):
   return isinstance(x, NodeStates)
 
 
+@profiling.profile('from_tree')
 def from_tree(
   tree: tp.Any,
   /,
@@ -14,16 +14,19 @@
 
 from __future__ import annotations
 
+import collections
 import contextlib
 import dataclasses
 import functools
+import itertools
 import threading
 import typing as tp
+import weakref
 
 import jax.experimental
 
 from flax import config
-from flax.nnx import filterlib, reprlib, traversals, variablelib
+from flax.nnx import filterlib, profiling, reprlib, traversals, variablelib
 from flax.nnx import statelib
 from flax.nnx.proxy_caller import (
   ApplyCaller,
@@ -174,6 +177,53 @@ if config.flax_use_flaxlib:
   globals()['RefMap'] = flaxlib.RefMap
 
 
+_STRUCTURE_VERSION = itertools.count()
+
+
+class StructureVersion:
+  """Tracks structural changes of a graph node.
+
+  ``version`` is a globally monotonic integer that is renewed every time
+  :meth:`bump` is called on the node or on any of its descendants, bumps are
+  propagated upwards through the parents registered with :meth:`add_parent`.
+  Parents are referenced weakly. Graph caches can compare the version of a
+  root node to verify that its structure didn't change instead of walking
+  the graph.
+  """
+
+  __slots__ = ('version', '_parents', '__weakref__')
+
+  def __init__(self):
+    self.version: int = next(_STRUCTURE_VERSION)
+    self._parents: list[weakref.ref[StructureVersion]] | None = None
+
+  def add_parent(self, parent: StructureVersion):
+    if parent is self:
+      return
+    if self._parents is None:
+      self._parents = [weakref.ref(parent)]
+    elif all(ref() is not parent for ref in self._parents):
+      self._parents.append(weakref.ref(parent))
+
+  def bump(self):
+    version = next(_STRUCTURE_VERSION)
+    stack = [self]
+    while stack:
+      structure = stack.pop()
+      if structure.version == version:
+        continue
+      structure.version = version
+      if structure._parents is not None:
+        for ref in structure._parents:
+          parent = ref()
+          if parent is not None:
+            stack.append(parent)
+
+  # parents are not preserved on copy / pickle
+  def __reduce__(self):
+    return StructureVersion, ()
+
+
 @dataclasses.dataclass(frozen=True, slots=True)
 class NodeImplBase(tp.Generic[Node, Leaf, AuxData]):
   type: type[Node]
@@ -191,6 +241,7 @@ class GraphNodeImpl(NodeImplBase[Node, Leaf, AuxData]):
   create_empty: tp.Callable[[AuxData], Node]
   clear: tp.Callable[[Node], None]
   init: tp.Callable[[Node, tp.Iterable[tuple[Key, Leaf]]], None]
+  structure: tp.Callable[[Node], StructureVersion] | None = None
 
 
 @dataclasses.dataclass(frozen=True, slots=True)
@@ -215,6 +266,7 @@ def register_graph_node_type(
   create_empty: tp.Callable[[AuxData], Node],
   clear: tp.Callable[[Node], None],
   init: tp.Callable[[Node, tp.Iterable[tuple[Key, Leaf]]], None],
+  structure: tp.Callable[[Node], StructureVersion] | None = None,
 ):
   if type in GRAPH_REGISTRY:
     raise ValueError(f'Node type {type} is already registered.')
@@ -227,6 +279,7 @@ def register_graph_node_type(
     create_empty=create_empty,
     clear=clear,
     init=init,
+    structure=structure,
   )
 
 
@@ -336,13 +389,6 @@ class NodeRef(tp.Generic[Node], reprlib.Representable):
     )
 
 
-if config.flax_use_flaxlib:
-  import flaxlib  # type: ignore[import]
-
-  jax.tree_util.register_static(flaxlib.NodeRef)
-  globals()['NodeRef'] = flaxlib.NodeRef
-
-
 @dataclasses.dataclass(frozen=True, repr=False)
 class VariableDef(reprlib.Representable, tp.Generic[Node]):
   type: type[Node]
@@ -394,13 +440,6 @@ class VariableDef(reprlib.Representable, tp.Generic[Node]):
     )
 
 
-if config.flax_use_flaxlib:
-  import flaxlib  # type: ignore[import]
-
-  jax.tree_util.register_static(flaxlib.VariableDef)
-  globals()['VariableDef'] = flaxlib.VariableDef
-
-
 @dataclasses.dataclass(frozen=True, repr=False)
 class MutableArrayDef(reprlib.Representable):
   index: int
@@ -490,12 +529,6 @@ class NodeDef(tp.Generic[Node], reprlib.Representable):
     )
 
 
-if config.flax_use_flaxlib:
-  import flaxlib  # type: ignore[import]
-
-  jax.tree_util.register_static(flaxlib.NodeDef)
-  globals()['NodeDef'] = flaxlib.NodeDef
-
 NodeDefType = tp.Union[
   NodeDef[Node],
   NodeRef[Node],
@@ -837,6 +870,15 @@ def _graph_flatten(
   return
 
 
+if config.flax_use_flaxlib:
+  import flaxlib  # type: ignore[import]
+
+  # flaxlib builds without the native traversals keep the Python version
+  globals()['_graph_flatten'] = getattr(
+    flaxlib, '_graph_flatten', _graph_flatten
+  )
+
+
 @dataclasses.dataclass(slots=True)
 class FingerprintContext:
   next_index: int
@@ -844,6 +886,7 @@ class FingerprintContext:
 
 # TODO(cgarciae): the actual fingerprint object is not being used,
 # only the traversal process is still relevant
+@profiling.profile('fingerprint')
 def fingerprint(
   node,
   /,
@@ -926,6 +969,15 @@ def _graph_fingerprint(
       append_fn(value)
 
 
+if config.flax_use_flaxlib:
+  import flaxlib  # type: ignore[import]
+
+  globals()['_graph_fingerprint'] = getattr(
+    flaxlib, '_graph_fingerprint', _graph_fingerprint
+  )
+
+
+@profiling.profile('check_fingerprint')
 def check_fingerprint(
   node,
   fp: list[tp.Hashable],
@@ -1038,6 +1090,14 @@ def _check_graph_fingerprint(
   return True
 
 
+if config.flax_use_flaxlib:
+  import flaxlib  # type: ignore[import]
+
+  globals()['_check_graph_fingerprint'] = getattr(
+    flaxlib, '_check_graph_fingerprint', _check_graph_fingerprint
+  )
+
+
 def _get_sorted_leaves(
   xs: tp.Mapping[tp.Any, tp.Any],
 ) -> list[tp.Any]:
@@ -1335,6 +1395,14 @@ f0f6619b-dde6-4466-b699-61c47f268d6b    index_ref_cache: A mapping from indexes
   return node
 
 
+if config.flax_use_flaxlib:
+  import flaxlib  # type: ignore[import]
+
+  globals()['_graph_unflatten'] = getattr(
+    flaxlib, '_graph_unflatten', _graph_unflatten
+  )
+
+
 def graph_pop(
   node: tp.Any,
   filters: tuple[filterlib.Filter, ...],
@@ -1490,6 +1558,9 @@ class StaticCache(tp.NamedTuple):
   variables: list[Variable[tp.Any]]
   new_ref_index: RefMap
   new_index_ref: IndexMap
+  # if False, structural changes inside the transformation are allowed
+  # and fall back to a regular unflatten instead of raising an error
+  strict: bool = True
 
   @staticmethod
   def create(
@@ -1497,6 +1568,8 @@ class StaticCache(tp.NamedTuple):
     paths: tuple[PathParts, ...],
     variables: list[Variable[tp.Any]],
     new_ref_index: RefMap,
+    *,
+    strict: bool = True,
   ):
     new_index_ref = IndexMap.from_refmap(new_ref_index)
     final_graphdef: GraphDef[tp.Any]
@@ -1508,6 +1581,7 @@ class StaticCache(tp.NamedTuple):
       variables=variables,
       new_ref_index=new_ref_index,
       new_index_ref=new_index_ref,
+      strict=strict,
     )
 
 
@@ -1639,6 +1713,328 @@ else:
   cached_partial = _cached_partial
 
 
+def _container_snapshot(container: list[tp.Any] | dict[tp.Any, tp.Any]):
+  if type(container) is list:
+    return tuple(map(id, container))
+  return tuple(container), tuple(map(id, container.values()))
+
+
+@dataclasses.dataclass(slots=True)
+class _GraphScan:
+  seen: set[int] = dataclasses.field(default_factory=set)
+  # (owner graph node, path from the owner, snapshot) of the lists and dicts
+  containers: list[tuple[tp.Any, PathParts, tp.Any]] = dataclasses.field(
+    default_factory=list
+  )
+  # False if the structure of some node can't be tracked with versions
+  versioned: bool = True
+
+
+def _scan_graph(
+  node: tp.Any,
+  owner: tp.Any,
+  path: PathParts,
+  parent: StructureVersion | None,
+  scan: _GraphScan,
+) -> bool:
+  """Links the StructureVersion of every graph node to the one of its closest
+  graph node ancestor and collects snapshots of the mutable containers (lists
+  and dicts) in between. Returns False as soon as a leaf that can't be cached
+  is found: Array attributes, mutable arrays or Variables holding tracers."""
+  node_impl = get_node_impl(node)
+  if node_impl is None:
+    if isinstance(node, Variable):
+      value = node.raw_value
+      return not (
+        isinstance(value, jax.core.Tracer) or is_mutable_array(value)
+      )
+    return not (
+      is_mutable_array(node) or isinstance(node, (jax.Array, np.ndarray))
+    )
+  if type(node_impl) is GraphNodeImpl:
+    if node_impl.structure is None:
+      scan.versioned = False
+    else:
+      structure = node_impl.structure(node)
+      if parent is not None:
+        structure.add_parent(parent)
+      parent = structure
+    if id(node) in scan.seen:
+      return True
+    scan.seen.add(id(node))
+    owner, path = node, ()
+  elif type(node) is list or type(node) is dict:
+    scan.containers.append((owner, path, _container_snapshot(node)))
+  elif node_impl is PYTREE_NODE_IMPL and not isinstance(node, tuple):
+    # generic pytrees can be mutated in place
+    scan.versioned = False
+  values, _ = node_impl.flatten(node)
+  return all(
+    _scan_graph(value, owner, (*path, key), parent, scan)
+    for key, value in values
+  )
+
+
+def _get_child(node: tp.Any, path: PathParts) -> tp.Any:
+  for key in path:
+    if type(node) is list or type(node) is dict or type(node) is tuple:
+      node = node[key]
+    else:
+      node = getattr(node, key)
+  return node
+
+
+def _weakrefs(xs: tp.Iterable[tp.Any]) -> tuple[weakref.ref, ...] | None:
+  try:
+    return tuple(weakref.ref(x) for x in xs)
+  except TypeError:
+    # the type doesn't support weak references
+    return None
+
+
+def _dereference(
+  refs: tp.Sequence[weakref.ref],
+) -> list[tp.Any] | None:
+  objects = [ref() for ref in refs]
+  if any(x is None for x in objects):
+    return None
+  return objects
+
+
+@dataclasses.dataclass(slots=True)
+class _WeakStaticCache:
+  """A :class:`StaticCache` that references the graph nodes and Variables
+  weakly."""
+
+  graphdef: GraphDef[tp.Any]
+  final_graphdef: GraphDef[tp.Any]
+  paths: tuple[PathParts, ...]
+  variables: tuple[weakref.ref, ...]
+  refs: tuple[weakref.ref, ...]
+  indexes: tuple[int, ...]
+
+  def resolve(self) -> StaticCache | None:
+    """Returns the StaticCache or ``None`` if some referent died."""
+    variables = _dereference(self.variables)
+    objects = _dereference(self.refs)
+    if variables is None or objects is None:
+      return None
+    return StaticCache(
+      graphdef=self.graphdef,
+      final_graphdef=self.final_graphdef,
+      paths=self.paths,
+      variables=variables,
+      new_ref_index=RefMap(list(zip(objects, self.indexes))),
+      new_index_ref=IndexMap(dict(zip(self.indexes, objects))),
+      strict=False,
+    )
+
+
+@dataclasses.dataclass(slots=True)
+class _GraphCacheEntry:
+  nodes: tuple[weakref.ref, ...]
+  fingerprints: tuple[list[tp.Hashable], ...]
+  static_caches: tuple[_WeakStaticCache, ...]
+  # structure versions of the nodes, None if they can't be tracked
+  versions: tuple[int, ...] | None
+  containers: tuple[tuple[weakref.ref, PathParts, tp.Any], ...]
+  metadata_version: int
+
+  @staticmethod
+  def create(
+    nodes: tuple[tp.Any, ...],
+    callback: tp.Callable[[weakref.ref], tp.Any],
+  ) -> _GraphCacheEntry | None:
+    # check that the graphs can be cached and link their structures before
+    # the more expensive flatten
+    scan = _GraphScan()
+    if not all(_scan_graph(node, node, (), None, scan) for node in nodes):
+      return None
+    try:
+      node_refs = tuple(weakref.ref(node, callback) for node in nodes)
+    except TypeError:
+      return None
+
+    ref_index: RefMap = RefMap()
+    fp_ref_index: RefMap = RefMap()
+    fingerprints: list[list[tp.Hashable]] = []
+    static_caches: list[_WeakStaticCache] = []
+    for node in nodes:
+      graphdef, flat_state = flatten(node, with_paths=True, ref_index=ref_index)
+      new_ref_index = RefMap()
+      fingerprints.append(
+        fingerprint(node, ref_index=fp_ref_index, new_ref_index=new_ref_index)
+      )
+      fp_ref_index.update(new_ref_index)
+      variables = _weakrefs(flat_state.leaves)
+      ref_items = list(new_ref_index.items())
+      refs = _weakrefs(obj for obj, _ in ref_items)
+      if variables is None or refs is None:
+        return None
+      static_caches.append(
+        _WeakStaticCache(
+          graphdef=graphdef,
+          final_graphdef=graphdef.with_same_outer_index(),
+          paths=flat_state.paths,
+          variables=variables,
+          refs=refs,
+          indexes=tuple(index for _, index in ref_items),
+        )
+      )
+
+    versions: tuple[int, ...] | None = None
+    containers: list[tuple[weakref.ref, PathParts, tp.Any]] = []
+    if scan.versioned:
+      versions = _structure_versions(nodes)
+      for owner, path, snapshot in scan.containers:
+        try:
+          containers.append((weakref.ref(owner), path, snapshot))
+        except TypeError:
+          versions = None
+          containers = []
+          break
+    return _GraphCacheEntry(
+      node_refs,
+      tuple(fingerprints),
+      tuple(static_caches),
+      versions,
+      tuple(containers),
+      variablelib.metadata_version(),
+    )
+
+  def get(
+    self, nodes: tuple[tp.Any, ...]
+  ) -> tp.MutableMapping[tp.Any, StaticCache] | None:
+    """Returns the static cache for ``nodes`` or ``None`` if the entry is no
+    longer valid."""
+    if any(ref() is not node for ref, node in zip(self.nodes, nodes)):
+      return None
+    static_cache: tp.MutableMapping[tp.Any, StaticCache] = PythonRefMap()  # type: ignore
+    for node, weak_static_cache in zip(nodes, self.static_caches):
+      node_static_cache = weak_static_cache.resolve()
+      if node_static_cache is None:
+        return None
+      static_cache[node] = node_static_cache
+    if not self.is_valid(nodes):
+      return None
+    return static_cache
+
+  def is_valid(self, nodes: tuple[tp.Any, ...]) -> bool:
+    if self.versions is not None:
+      if _structure_versions(nodes) != self.versions:
+        return False
+      for owner_ref, path, snapshot in self.containers:
+        owner = owner_ref()
+        if owner is None:
+          return False
+        try:
+          container = _get_child(owner, path)
+        except (AttributeError, IndexError, KeyError, TypeError):
+          return False
+        if (
+          type(container) is not list and type(container) is not dict
+        ) or _container_snapshot(container) != snapshot:
+          return False
+      if self.metadata_version == variablelib.metadata_version():
+        return True
+
+    # the metadata of some Variable changed or versions are not available,
+    # verify the structure by walking the graph
+    ref_index: RefMap = RefMap()
+    for node, fp in zip(nodes, self.fingerprints):
+      new_ref_index = RefMap()
+      try:
+        if not check_fingerprint(
+          node, fp, ref_index=ref_index, new_ref_index=new_ref_index
+        ):
+          return False
+      except ValueError:
+        # an Array attribute was added
+        return False
+      ref_index.update(new_ref_index)
+    self.metadata_version = variablelib.metadata_version()
+    return True
+
+
+def _structure_versions(nodes: tp.Iterable[tp.Any]) -> tuple[int, ...]:
+  return tuple(
+    GRAPH_REGISTRY[type(node)].structure(node).version  # type: ignore
+    for node in nodes
+  )
+
+
+class GraphCache:
+  """A bounded LRU cache of :class:`StaticCache` entries for the graph nodes
+  passed to a transformed function.
+
+  Entries are keyed by the identity of the input graph nodes and are only
+  reused if the structure of the nodes didn't change since the entry was
+  created, this gives repeated calls (e.g. a ``train_step``) the same speedup
+  as :func:`cached_partial` without requiring the user to wrap the function.
+  Structural changes are detected by comparing the :class:`StructureVersion`
+  of the input nodes plus a snapshot of the lists and dicts in the graph,
+  graphs that can't be tracked this way are verified with
+  :func:`check_fingerprint`. Entries only reference the graph nodes and their
+  Variables weakly and are dropped as soon as one of the input nodes is
+  garbage collected, so the cache doesn't keep models alive.
+
+  Args:
+    maxsize: maximum number of entries, ``0`` disables the cache.
+  """
+
+  def __init__(self, maxsize: int):
+    self.maxsize = maxsize
+    self.entries: collections.OrderedDict[tuple[int, ...], _GraphCacheEntry] = (
+      collections.OrderedDict()
+    )
+
+  def get(self, tree: tp.Any) -> tp.MutableMapping[tp.Any, StaticCache] | None:
+    """Returns a static cache for the graph nodes in ``tree`` or ``None`` if
+    they can't be cached."""
+    if self.maxsize <= 0:
+      return None
+    nodes: list[tp.Any] = []
+    node_ids: list[int] = []
+    for x in jax.tree.leaves(
+      tree, is_leaf=lambda x: isinstance(x, Variable) or is_graph_node(x)
+    ):
+      if isinstance(x, Variable):
+        return None
+      if is_graph_node(x) and id(x) not in node_ids:
+        nodes.append(x)
+        node_ids.append(id(x))
+    if not nodes:
+      return None
+
+    key = tuple(node_ids)
+    entry = self.entries.get(key)
+    if entry is not None:
+      static_cache = entry.get(tuple(nodes))
+      if static_cache is not None:
+        self.entries.move_to_end(key)
+        return static_cache
+
+    entries = self.entries
+
+    def drop_entry(_):
+      # one of the nodes was garbage collected
+      if entries.get(key) is entry:
+        del entries[key]
+
+    entry = _GraphCacheEntry.create(tuple(nodes), drop_entry)
+    if entry is None:
+      self.entries.pop(key, None)
+      return None
+    self.entries[key] = entry
+    self.entries.move_to_end(key)
+    while len(self.entries) > self.maxsize:
+      self.entries.popitem(last=False)
+    return entry.get(tuple(nodes))
+
+  def clear(self):
+    self.entries.clear()
+
+
 @dataclasses.dataclass
 class SplitContext:
   ctxtag: tp.Hashable | None
@@ -1874,21 +2270,35 @@ class MergeContext:
         index_ref=self.index_ref,
       )
 
-    elif static_cache is not None:
-      assert isinstance(graphdef.nodes[0], NodeDef)
+    elif static_cache is not None and type(graphdef.nodes[0]) is NodeDef:
       assert ctx is not None
       if (outer_index := graphdef.nodes[0].outer_index) is not None:
         outer_index_outer_ref = ctx.outer_index_outer_ref
         assert outer_index_outer_ref is not None
         node = outer_index_outer_ref[outer_index]
 
-        if node in static_cache:
-          static_cache_node = static_cache[node]
-          if static_cache_node.final_graphdef != graphdef:
+        static_cache_node = static_cache[node] if node in static_cache else None
+        if (
+          static_cache_node is not None
+          and static_cache_node.final_graphdef is not graphdef
+        ):
+          if static_cache_node.final_graphdef == graphdef:
+            # jit returns the same output graphdef object on every call,
+            # store it so the next comparison is an identity check
+            static_cache_node = static_cache_node._replace(
+              final_graphdef=graphdef
+            )
+            static_cache[node] = static_cache_node
+          elif static_cache_node.strict:
             raise ValueError(
               'The graph structure of a node added to cached_partial was mutated inside the transformation, '
               f'this is not allowed.\nNode: {node}\nOuput graphdef: {graphdef}\nExpected graphdef: {static_cache_node.final_graphdef}'
             )
+          else:
+            # the structure changed, fall back to a regular unflatten
+            static_cache_node = None
+
+        if static_cache_node is not None:
           if type(state) is list:
             leaves = state
           elif type(state) is FlatState:
@@ -35,6 +35,11 @@ from flax.nnx.nn.linear import (
   default_kernel_init,
 )
 from flax.nnx.nn.normalization import LayerNorm
+from flax.linen.attention import (
+  _blockwise_attention,
+  _check_attention_backend,
+  _fused_dot_product_attention,
+)
 from flax.typing import (
   Dtype,
   PromoteDtypeFn,
@@ -155,6 +160,7 @@ def dot_product_attention(
   precision: PrecisionLike = None,
   module: Module | None = None,
   promote_dtype: PromoteDtypeFn = dtypes.promote_dtype,
+  backend: str | None = None,
 ):
   """Computes dot-product attention given query, key, and value.
 
@@ -162,8 +168,18 @@ def dot_product_attention(
   https://arxiv.org/abs/1706.03762. It calculates the attention weights given
   query and key and combines the values using the attention weights.
 
-  Will use the more optimized `jax.nn.dot_product_attention` if dropout is
-  not activated and `module=None`.
+  ``backend`` selects the implementation:
+
+  * ``'einsum'``: computes the attention weights explicitly with
+    :func:`dot_product_attention_weights`, supports all arguments.
+  * ``'jax'``: uses the fused ``jax.nn.dot_product_attention``.
+  * ``'blockwise'``: uses :func:`blockwise_dot_product_attention`, memory
+    grows linearly instead of quadratically with the sequence length.
+  * ``None`` (default): uses ``'jax'`` if dropout is not activated and
+    ``module=None``, else ``'einsum'``.
+
+  The ``'jax'`` and ``'blockwise'`` backends never materialize the attention
+  weights so they don't support dropout or ``module``.
 
   .. note::
     ``query``, ``key``, ``value`` needn't have any batch dimensions.
@@ -196,10 +212,17 @@ def dot_product_attention(
       dtype. The function should accept a tuple of ``(query, key, value)`` and a
       ``dtype`` keyword argument, and return a tuple of arrays with the promoted
       dtype.
+    backend: one of ``'einsum'``, ``'jax'``, ``'blockwise'`` or ``None``, see
+      above.
 
   Returns:
     Output of shape `[batch..., q_length, num_heads, v_depth_per_head]`.
   """
+  if backend not in (None, 'einsum', 'jax', 'blockwise'):
+    raise ValueError(
+      "backend must be one of 'einsum', 'jax' or 'blockwise', got"
+      f' {backend!r}.'
+    )
   query, key, value = promote_dtype((query, key, value), dtype=dtype)  # type: ignore[bad-unpacking]
   dtype = query.dtype
   assert key.ndim == query.ndim == value.ndim, 'q, k, v must have same rank.'
@@ -211,21 +234,22 @@ def dot_product_attention(
   ), 'q, k, v num_heads must match.'
   assert key.shape[-3] == value.shape[-3], 'k, v lengths must match.'
 
+  if backend in ('jax', 'blockwise'):
+    if module is not None or (dropout_rate > 0.0 and not deterministic):
+      raise ValueError(
+        f'backend={backend!r} does not materialize the attention weights,'
+        " it does not support dropout or module. Use backend='einsum'"
+        ' instead.'
+      )
   # Criteria that invoke the more optimized dot product attention
-  if dropout_rate == 0.0 and module == None:
-    # make sure qkv batch are compressed to one dim
-    query_shape = query.shape
-    if len(query_shape) > 4:
-      def reshape_4d(x):
-        return jnp.reshape(x, (math.prod(x.shape[:-3]), *x.shape[-3:]))
-      query, key, value, bias, mask = jax.tree.map(
-        reshape_4d, (query, key, value, bias, mask))
-    if mask is not None:
-      mask = mask.astype(jnp.bool)
-    out = jax.nn.dot_product_attention(query, key, value, bias, mask)
-    if len(query_shape) > 4:
-      out = jnp.reshape(out, query_shape)
-    return out
+  if backend == 'jax' or (
+    backend is None and dropout_rate == 0.0 and module == None
+  ):
+    return _fused_dot_product_attention(query, key, value, bias, mask)
+  if backend == 'blockwise':
+    return blockwise_dot_product_attention(
+      query, key, value, bias, mask, precision=precision
+    )
 
   # compute attention weights
   attn_weights = dot_product_attention_weights(
@@ -248,6 +272,155 @@ def dot_product_attention(
   )
 
 
+def blockwise_dot_product_attention(
+  query: Array,
+  key: Array,
+  value: Array,
+  bias: Array | None = None,
+  mask: Array | None = None,
+  *,
+  dtype: Dtype | None = None,
+  precision: PrecisionLike = None,
+  q_chunk_size: int = 512,
+  kv_chunk_size: int = 512,
+  promote_dtype: PromoteDtypeFn = dtypes.promote_dtype,
+):
+  """Computes dot-product attention without materializing the attention weights.
+
+  Equivalent to :func:`dot_product_attention` without dropout, up to floating
+  point reassociation. Queries are processed in chunks of ``q_chunk_size``
+  and for each chunk the keys and values are processed in chunks of
+  ``kv_chunk_size`` using an online softmax (as in FlashAttention), so the
+  largest intermediate has shape ``[batch, num_heads, q_chunk_size,
+  kv_chunk_size]`` instead of ``[batch..., num_heads, q_length, kv_length]``.
+  Scores and the softmax are accumulated in float32. It is written with
+  ``lax.map`` and ``lax.scan`` and runs on any backend, including CPU.
+
+  ``bias`` and ``mask`` are sliced per chunk and dimensions of size 1 are not
+  broadcasted, e.g. a padding mask of shape ``[batch, 1, 1, kv_length]``
+  doesn't grow with the query length.
+
+  Args:
+    query: queries with shape ``[batch..., q_length, num_heads,
+      qk_depth_per_head]``.
+    key: keys with shape ``[batch..., kv_length, num_heads,
+      qk_depth_per_head]``.
+    value: values with shape ``[batch..., kv_length, num_heads,
+      v_depth_per_head]``.
+    bias: bias for the attention weights, broadcastable to ``[batch...,
+      num_heads, q_length, kv_length]``.
+    mask: mask for the attention weights, broadcastable to ``[batch...,
+      num_heads, q_length, kv_length]``. Attention weights are masked out if
+      their corresponding mask value is ``False``.
+    dtype: the dtype of the computation (default: infer from inputs)
+    precision: numerical precision of the computation see
+      ``jax.lax.Precision`` for details.
+    q_chunk_size: number of queries processed at once.
+    kv_chunk_size: number of keys and values processed at once.
+    promote_dtype: function to promote the dtype of the arrays to the desired
+      dtype. The function should accept a tuple of ``(query, key, value)`` and a
+      ``dtype`` keyword argument, and return a tuple of arrays with the promoted
+      dtype.
+
+  Returns:
+    Output of shape ``[batch..., q_length, num_heads, v_depth_per_head]``.
+  """
+  return _blockwise_attention(
+    query,
+    key,
+    value,
+    bias,
+    mask,
+    promote_dtype=promote_dtype,
+    dtype=dtype,
+    precision=precision,
+    q_chunk_size=q_chunk_size,
+    kv_chunk_size=kv_chunk_size,
+  )
+
+
+def _paged_dot_product_attention(
+  query: Array,
+  key_pages: Array,
+  value_pages: Array,
+  block_table: Array,
+  lengths: Array,
+  *,
+  precision: PrecisionLike = None,
+):
+  """Attends the newest queries of each sequence to keys and values in pages.
+
+  The ``q_length`` queries of a sequence are its last ``q_length`` cached
+  positions and attend causally to the positions before them. Only the pages
+  holding cached positions are read: the loop runs over the first
+  ``ceil(max(lengths) / page_size)`` entries of ``block_table`` and combines
+  them with an online softmax accumulated in float32.
+
+  Args:
+    query: queries with shape ``[batch, q_length, num_heads,
+      qk_depth_per_head]``.
+    key_pages: keys with shape ``[num_pages, page_size, num_heads,
+      qk_depth_per_head]``.
+    value_pages: values with shape ``[num_pages, page_size, num_heads,
+      v_depth_per_head]``.
+    block_table: page ids of each sequence with shape ``[batch,
+      pages_per_sequence]``.
+    lengths: number of cached positions of each sequence, including the
+      queries, with shape ``[batch]``.
+    precision: numerical precision of the computation.
+
+  Returns:
+    Output of shape ``[batch, q_length, num_heads, v_depth_per_head]``.
+  """
+  batch, q_length, num_heads, depth = query.shape
+  page_size = key_pages.shape[1]
+  dtype = query.dtype
+  q = query / jnp.sqrt(depth).astype(dtype)
+  # number of positions visible to each query, shape [batch, q_length]
+  visible = lengths[:, None] - q_length + 1 + jnp.arange(q_length)
+  num_live_pages = (jnp.max(lengths) + page_size - 1) // page_size
+  num_live_pages = jnp.minimum(num_live_pages, block_table.shape[1])
+
+  def attend_page(page_index, carry):
+    running_max, normalizer, acc = carry
+    page_ids = block_table[:, page_index]
+    k = key_pages[page_ids]
+    v = value_pages[page_ids]
+    scores = jnp.einsum(
+      'bqhd,bphd->bhqp',
+      q,
+      k,
+      precision=precision,
+      preferred_element_type=jnp.float32,
+    )
+    positions = page_index * page_size + jnp.arange(page_size)
+    valid = positions[None, None, :] < visible[:, :, None]
+    scores = jnp.where(valid[:, None], scores, -jnp.inf)
+    new_max = jnp.maximum(running_max, scores.max(axis=-1))
+    # sequences without cached positions in this page keep their state
+    safe_max = jnp.where(jnp.isneginf(new_max), 0.0, new_max)
+    correction = jnp.exp(running_max - safe_max)
+    weights = jnp.exp(scores - safe_max[..., None])
+    normalizer = normalizer * correction + weights.sum(axis=-1)
+    acc = acc * correction[..., None] + jnp.einsum(
+      'bhqp,bphd->bhqd',
+      weights.astype(v.dtype),
+      v,
+      precision=precision,
+      preferred_element_type=jnp.float32,
+    )
+    return new_max, normalizer, acc
+
+  init = (
+    jnp.full((batch, num_heads, q_length), -jnp.inf, jnp.float32),
+    jnp.zeros((batch, num_heads, q_length), jnp.float32),
+    jnp.zeros((batch, num_heads, q_length, value_pages.shape[-1]), jnp.float32),
+  )
+  _, normalizer, acc = lax.fori_loop(0, num_live_pages, attend_page, init)
+  out = acc / jnp.where(normalizer == 0.0, 1.0, normalizer)[..., None]
+  return out.transpose(0, 2, 1, 3).astype(dtype)
+
+
 class MultiHeadAttention(Module):
   """Multi-head attention.
 
@@ -301,6 +474,11 @@ class MultiHeadAttention(Module):
       num_heads, value_channels]``
     decode: whether to prepare and use an autoregressive cache.
     normalize_qk: should QK normalization be applied (arxiv.org/abs/2302.05442).
+    attention_backend: passed as ``backend`` to ``attention_fn``, one of
+      ``'einsum'``, ``'jax'`` or ``'blockwise'`` for
+      :func:`dot_product_attention`. ``None`` uses the default of
+      ``attention_fn``. A ``ValueError`` is raised if it is set and
+      ``attention_fn`` doesn't accept a ``backend`` argument.
     rngs: rng key.
     keep_rngs: whether to store the input rngs as attribute (i.e. `self.rngs = rngs`)
       (default: True). If rngs is stored, we should split the module as
@@ -330,6 +508,7 @@ class MultiHeadAttention(Module):
     attention_fn: Callable[..., Array] = dot_product_attention,
     decode: bool | None = None,
     normalize_qk: bool = False,
+    attention_backend: str | None = None,
     # Deprecated, will be removed.
     qkv_dot_general: DotGeneralT | None = None,
     out_dot_general: DotGeneralT | None = None,
@@ -363,11 +542,13 @@ class MultiHeadAttention(Module):
     self.attention_fn = attention_fn
     self.decode = decode
     self.normalize_qk = normalize_qk
+    self.attention_backend = attention_backend
     self.qkv_dot_general = qkv_dot_general
     self.out_dot_general = out_dot_general
     self.qkv_dot_general_cls = qkv_dot_general_cls
     self.out_dot_general_cls = out_dot_general_cls
 
+    _check_attention_backend(attention_fn, attention_backend)
     if self.qkv_features % self.num_heads != 0:
       raise ValueError(
         f'Memory dimension ({self.qkv_features}) must be divisible by '
@@ -436,6 +617,8 @@ class MultiHeadAttention(Module):
     self.cached_key: nnx.Cache[Array] | None = None
     self.cached_value: nnx.Cache[Array] | None = None
     self.cache_index: nnx.Cache[Array] | None = None
+    self.block_table: nnx.Cache[Array] | None = None
+    self.cache_layout = 'dense'
 
   def __call__(
     self,
@@ -533,38 +716,76 @@ class MultiHeadAttention(Module):
         raise ValueError(
           'Autoregressive cache not initialized, call ``init_cache`` first.'
         )
+      if self.cache_layout != 'dense' and mask is not None:
+        raise ValueError(
+          f'mask is not supported with the {self.cache_layout!r} cache layout.'
+        )
+      if self.cache_layout == 'paged':
+        if sow_weights:
+          raise ValueError(
+            "sow_weights is not supported with the 'paged' cache layout."
+          )
+        if self.dropout_rate > 0.0 and not first_from(
+          deterministic,
+          self.deterministic,
+          error_msg="""No `deterministic` argument was provided to MultiHeadAttention
+            as either a __call__ argument, class attribute, or nnx.flag.""",
+        ):
+          raise ValueError(
+            "Dropout is not supported with the 'paged' cache layout."
+          )
+        return self.out(self._paged_decode(query, key, value))
       (
         *batch_dims,
         max_length,
         num_heads,
         depth_per_head,
       ) = self.cached_key.value.shape
-      # shape check of cached keys against query input
-      expected_shape = tuple(batch_dims) + (1, num_heads, depth_per_head)
+      # shape check of cached keys against query input, a step can decode
+      # several positions at once, e.g. to verify speculative draft tokens
+      num_new = query.shape[-3]
+      expected_shape = tuple(batch_dims) + (num_new, num_heads, depth_per_head)
       if expected_shape != query.shape:
         raise ValueError(
           'Autoregressive cache shape error, '
           'expected query shape %s instead got %s.'
           % (expected_shape, query.shape)
         )
+      if not 0 < num_new <= max_length:
+        raise ValueError(
+          'Autoregressive cache length error, a decode step must write '
+          f'between 1 and {max_length} positions, got {num_new}.'
+        )
+      if self.cache_layout == 'ring' and num_new != 1:
+        raise ValueError(
+          "The 'ring' cache layout only supports decoding one position per "
+          f'step, got {num_new}.'
+        )
       # update key, value caches with our new 1d spatial slices
       cur_index = self.cache_index[...]
       zero = jnp.array(0, dtype=lax.dtype(cur_index.dtype))
-      indices = (zero,) * len(batch_dims) + (cur_index, zero, zero)
+      if self.cache_layout == 'ring':
+        # overwrite the oldest position once the window is full
+        write_index = cur_index % max_length
+      else:
+        write_index = cur_index
+      indices = (zero,) * len(batch_dims) + (write_index, zero, zero)
       key = lax.dynamic_update_slice(self.cached_key[...], key, indices)
       value = lax.dynamic_update_slice(self.cached_value[...], value, indices)
       self.cached_key[...] = key
       self.cached_value[...] = value
-      self.cache_index[...] += 1
+      self.cache_index[...] += num_new
       # causal mask for cached decoder self-attention:
-      # our single query position should only attend to those key
-      # positions that have already been generated and cached,
-      # not the remaining zero elements.
+      # each query position should only attend to those key positions
+      # that have already been generated and cached up to itself,
+      # not the remaining zero elements. For the ring layout all positions
+      # are valid once the window is full.
+      query_index = cur_index + jnp.arange(num_new)
       mask = combine_masks(
         mask,
         jnp.broadcast_to(
-          jnp.arange(max_length) <= cur_index,
-          tuple(batch_dims) + (1, 1, max_length),
+          jnp.arange(max_length)[None, :] <= query_index[:, None],
+          tuple(batch_dims) + (1, num_new, max_length),
         ),
       )
 
@@ -591,6 +812,9 @@ class MultiHeadAttention(Module):
       dropout_rng = None
 
     # apply attention
+    attn_kwargs = {}
+    if self.attention_backend is not None:
+      attn_kwargs['backend'] = self.attention_backend
     x = self.attention_fn(
       query,
       key,
@@ -603,16 +827,28 @@ class MultiHeadAttention(Module):
       dtype=self.dtype,
       precision=self.precision,
       module=self if sow_weights else None,
+      **attn_kwargs,
     )
     # back to the original inputs dimensions
     out = self.out(x)
     return out
 
-  def init_cache(self, input_shape: Shape, dtype: Dtype = jnp.float32):
+  def init_cache(
+    self,
+    input_shape: Shape,
+    dtype: Dtype = jnp.float32,
+    *,
+    layout: str = 'dense',
+    window_size: int | None = None,
+    page_size: int = 16,
+    num_pages: int | None = None,
+  ):
     """Initializes cache for fast autoregressive decoding. When
     ``decode=True``, this method must be called first before performing
-    forward inference. When in decode mode, only one token must be passed
-    at a time.
+    forward inference. In decode mode each call appends the passed positions
+    to the cache, usually one token at a time. Several positions can be
+    passed at once and attend causally to each other, see
+    :meth:`rollback_cache`.
 
     Example usage::
 
@@ -636,11 +872,164 @@ class MultiHeadAttention(Module):
       ...
       >>> model_nnx.init_cache(x.shape)
       >>> out_nnx = model_nnx(x)
+
+    The ``layout`` argument selects how keys and values are stored:
+
+    * ``'dense'``: a ``[batch..., max_length, num_heads, head_dim]`` buffer
+      where ``max_length`` is ``input_shape[-2]``. Every step attends over
+      the whole buffer.
+    * ``'ring'``: a sliding window of the last ``window_size`` positions.
+      Once the window is full new positions overwrite the oldest ones, so
+      memory and compute per step are bounded by ``window_size`` regardless
+      of the generated length.
+    * ``'paged'``: keys and values are stored in a pool of ``num_pages``
+      pages of ``page_size`` positions, ``input_shape`` must be
+      ``(batch, max_length, features)``. ``block_table`` holds the page ids
+      of each sequence and ``cache_index`` the number of cached positions
+      of each sequence, so sequences of different lengths can share a
+      batch. Each step only reads the pages holding cached positions. By
+      default every sequence owns ``ceil(max_length / page_size)``
+      consecutive pages, a serving loop that allocates pages on demand can
+      pass a smaller ``num_pages`` and assign ``block_table`` and
+      ``cache_index`` entries itself, e.g. to recycle the slot of a
+      finished sequence.
+
+    Example usage of the paged layout::
+
+      >>> model_nnx = nnx.MultiHeadAttention(
+      ...   num_heads=2, in_features=4, decode=True, rngs=nnx.Rngs(0)
+      ... )
+      >>> model_nnx.init_cache((2, 64, 4), layout='paged', page_size=16)
+      >>> model_nnx.block_table.shape
+      (2, 4)
+      >>> # reset the second sequence
+      >>> model_nnx.cache_index[...] = model_nnx.cache_index[...].at[1].set(0)
+
+    Args:
+      input_shape: the shape of the inputs, ``(*batch, max_length,
+        features)``.
+      dtype: the dtype of the cached keys and values.
+      layout: one of ``'dense'``, ``'ring'`` or ``'paged'``.
+      window_size: number of positions kept by the ``'ring'`` layout.
+      page_size: number of positions per page of the ``'paged'`` layout.
+      num_pages: number of pages of the ``'paged'`` layout, defaults to
+        enough pages for every sequence to reach ``max_length``.
     """
-    cache_shape = (*input_shape[:-1], self.num_heads, self.head_dim)
+    *batch_dims, max_length = input_shape[:-1]
+    self.block_table = None
+    if layout == 'dense':
+      cache_shape = (*batch_dims, max_length, self.num_heads, self.head_dim)
+      cache_index = jnp.array(0, dtype=jnp.int32)
+    elif layout == 'ring':
+      if window_size is None:
+        raise ValueError("window_size is required for the 'ring' layout.")
+      cache_shape = (*batch_dims, window_size, self.num_heads, self.head_dim)
+      cache_index = jnp.array(0, dtype=jnp.int32)
+    elif layout == 'paged':
+      if len(batch_dims) != 1:
+        raise ValueError(
+          "The 'paged' layout requires an input_shape of the form "
+          f'(batch, max_length, features), got {input_shape}.'
+        )
+      (batch,) = batch_dims
+      pages_per_sequence = -(-max_length // page_size)
+      if num_pages is None:
+        num_pages = batch * pages_per_sequence
+      if num_pages >= batch * pages_per_sequence:
+        block_table = jnp.arange(batch * pages_per_sequence, dtype=jnp.int32)
+        block_table = block_table.reshape(batch, pages_per_sequence)
+      else:
+        block_table = jnp.zeros((batch, pages_per_sequence), jnp.int32)
+      cache_shape = (num_pages, page_size, self.num_heads, self.head_dim)
+      cache_index = jnp.zeros((batch,), dtype=jnp.int32)
+      self.block_table = nnx.Cache(block_table)
+    else:
+      raise ValueError(
+        f"Unknown cache layout {layout!r}, expected 'dense', 'ring' or "
+        "'paged'."
+      )
+    self.cache_layout = layout
     self.cached_key = nnx.Cache(jnp.zeros(cache_shape, dtype))
     self.cached_value = nnx.Cache(jnp.zeros(cache_shape, dtype))
-    self.cache_index = nnx.Cache(jnp.array(0, dtype=jnp.int32))
+    self.cache_index = nnx.Cache(cache_index)
+
+  def _paged_decode(self, query: Array, key: Array, value: Array) -> Array:
+    assert self.block_table is not None
+    batch = self.block_table.shape[0]
+    num_new = query.shape[1]
+    expected_shape = (batch, num_new, self.num_heads, self.head_dim)
+    if expected_shape != query.shape:
+      raise ValueError(
+        'Autoregressive cache shape error, '
+        'expected query shape %s instead got %s.'
+        % (expected_shape, query.shape)
+      )
+    page_size = self.cached_key.shape[1]
+    max_length = self.block_table.shape[1] * page_size
+    if not 0 < num_new <= max_length:
+      raise ValueError(
+        'Autoregressive cache length error, a decode step must write '
+        f'between 1 and {max_length} positions, got {num_new}.'
+      )
+    lengths = self.cache_index[...]
+    block_table = self.block_table[...]
+    positions = lengths[:, None] + jnp.arange(num_new)
+    page_ids = jnp.take_along_axis(block_table, positions // page_size, axis=1)
+    offsets = positions % page_size
+    key_pages = self.cached_key[...].at[page_ids, offsets].set(key)
+    value_pages = self.cached_value[...].at[page_ids, offsets].set(value)
+    self.cached_key[...] = key_pages
+    self.cached_value[...] = value_pages
+    self.cache_index[...] = lengths + num_new
+    return _paged_dot_product_attention(
+      query,
+      key_pages,
+      value_pages,
+      block_table,
+      lengths + num_new,
+      precision=self.precision,
+    )
+
+  def rollback_cache(self, num_tokens: int | Array):
+    """Discards the last ``num_tokens`` cached positions.
+
+    Rewinds ``cache_index`` so the next decode step overwrites the discarded
+    positions, without copying the cache. This is used by speculative
+    decoding to drop rejected draft tokens after a multi-token verification
+    step::
+
+      >>> from flax import nnx
+      >>> import jax.numpy as jnp
+      ...
+      >>> model_nnx = nnx.MultiHeadAttention(
+      ...   num_heads=2, in_features=4, decode=True, rngs=nnx.Rngs(0)
+      ... )
+      >>> model_nnx.init_cache((1, 16, 4))
+      >>> y = model_nnx(jnp.ones((1, 4, 4)))  # verify 4 draft tokens
+      >>> model_nnx.rollback_cache(3)  # only the first one was accepted
+      >>> model_nnx.cache_index[...]
+      Array(1, dtype=int32)
+
+    To roll back every attention layer of a model, call this method on all
+    ``MultiHeadAttention`` submodules, e.g. using ``nnx.iter_graph``.
+
+    Args:
+      num_tokens: number of positions to discard. For the ``'paged'`` layout
+        this can be an array of shape ``[batch]`` with a number per sequence.
+    """
+    if self.cache_index is None:
+      raise ValueError(
+        'Autoregressive cache not initialized, call ``init_cache`` first.'
+      )
+    if self.cache_layout == 'ring':
+      raise ValueError(
+        "The 'ring' cache layout can't be rolled back, its oldest positions "
+        'are overwritten.'
+      )
+    cache_index = self.cache_index[...]
+    self.cache_index[...] = jnp.maximum(cache_index - num_tokens, 0).astype(
+      cache_index.dtype
+    )
 
 
 # mask-making utility functions
@@ -234,12 +234,13 @@ OBJECT_CONTEXT = ObjectContext()
 
 
 class ObjectState(reprlib.Representable):
-  __slots__ = ('_trace_state', '_initializing', '_is_setup')
+  __slots__ = ('_trace_state', '_initializing', '_is_setup', '_structure')
 
   def __init__(self, initializing: bool = False, is_setup: bool = False):
     self._trace_state = tracers.TraceState()
     self._initializing = initializing
     self._is_setup = is_setup
+    self._structure = graph.StructureVersion()
 
   @property
   def trace_state(self) -> tracers.TraceState:
@@ -249,10 +250,33 @@ class ObjectState(reprlib.Representable):
   def initializing(self) -> bool:
     return self._initializing
 
+  @initializing.setter
+  def initializing(self, value: bool):
+    if value != self._initializing:
+      self._initializing = value
+      self._structure.bump()
+
   @property
   def is_setup(self) -> bool:
     return self._is_setup
 
+  @is_setup.setter
+  def is_setup(self, value: bool):
+    if value != self._is_setup:
+      self._is_setup = value
+      self._structure.bump()
+
+  @property
+  def structure(self) -> graph.StructureVersion:
+    return self._structure
+
+  @property
+  def structure_version(self) -> int:
+    """A monotonic counter that changes every time an attribute of the
+    Object or of any of its descendants is set or deleted. Updates to the
+    value of a Variable don't change it."""
+    return self._structure.version
+
   def __nnx_repr__(self):
     yield reprlib.Object(type(self))
     yield reprlib.Attr('trace_state', self._trace_state)
@@ -280,6 +304,13 @@ jax.tree_util.register_pytree_node(
   _flatten_object_state,
   _unflatten_object_state,
 )
+# register ObjectState as an NNX pytree node to avoid going through
+# jax.tree_util.tree_flatten_with_path on every graph traversal
+graph.register_pytree_node_type(
+  ObjectState,
+  flatten=lambda state: ((), (state.initializing, state.is_setup)),
+  unflatten=lambda _, static: _unflatten_object_state(static, ()),
+)
 
 
 class ObjectMeta(ABCMeta):
@@ -292,6 +323,25 @@ class ObjectMeta(ABCMeta):
     self.__init__(*args, **kwargs)
 
 
+def _link_children(structure: graph.StructureVersion, value: tp.Any):
+  # register the structure of an Object as the parent of the Objects
+  # directly contained in one of its attributes
+  value_type = type(value)
+  if isinstance(value_type, ObjectMeta):
+    children = (value,)
+  elif value_type is list or value_type is tuple or value_type is dict:
+    children = jax.tree.leaves(
+      value, is_leaf=lambda x: isinstance(type(x), ObjectMeta)
+    )
+  else:
+    return
+  for child in children:
+    if isinstance(type(child), ObjectMeta) and (
+      state := vars(child).get('_object__state')
+    ) is not None:
+      state._structure.add_parent(structure)
+
+
 def _graph_node_meta_call(cls: tp.Type[O], *args, **kwargs) -> O:
   node = cls.__new__(cls, *args, **kwargs)
   vars_obj = vars(node)
@@ -361,6 +411,7 @@ class Object(reprlib.Representable, metaclass=ObjectMeta):
       create_empty=cls._graph_node_create_empty,
       clear=cls._graph_node_clear,
       init=cls._graph_node_init,  # type: ignore
+      structure=cls._graph_node_structure,
     )
 
     cls._object__is_pytree = pytree
@@ -393,6 +444,9 @@ class Object(reprlib.Representable, metaclass=ObjectMeta):
     def __setattr__(self, name: str, value: Any) -> None:
       self._setattr(name, value)
 
+    def __delattr__(self, name: str) -> None:
+      self._delattr(name)
+
   def _setattr(self, name: str, value: tp.Any) -> None:
     self._check_valid_context(
       lambda: f"Cannot mutate '{type(self).__name__}' from different trace level"
@@ -408,6 +462,16 @@ class Object(reprlib.Representable, metaclass=ObjectMeta):
     ):
       self._object__nodes = self._object__nodes.union((name,))
     object.__setattr__(self, name, value)
+    structure = self._object__state.structure
+    _link_children(structure, value)
+    structure.bump()
+
+  def _delattr(self, name: str) -> None:
+    self._check_valid_context(
+      lambda: f"Cannot mutate '{type(self).__name__}' from different trace level"
+    )
+    object.__delattr__(self, name)
+    self._object__state.structure.bump()
 
   def _check_valid_context(self, error_msg: tp.Callable[[], str]) -> None:
     if not self._object__state.trace_state.is_valid():
@@ -613,7 +677,9 @@ class Object(reprlib.Representable, metaclass=ObjectMeta):
   def _graph_node_pop_key(self, key: str):
     if not isinstance(key, str):
       raise KeyError(f'Invalid key: {key!r}')
-    return vars(self).pop(key)
+    value = vars(self).pop(key)
+    self._object__state.structure.bump()
+    return value
 
   @staticmethod
   def _graph_node_create_empty(node_type: tp.Type[O]) -> O:
@@ -621,7 +687,24 @@ class Object(reprlib.Representable, metaclass=ObjectMeta):
     return node
 
   def _graph_node_clear(self):
-    vars(self).clear()
+    vars_obj = vars(self)
+    state = vars_obj.get('_object__state')
+    vars_obj.clear()
+    if state is not None:
+      # keep the state so _graph_node_init can preserve the structure version
+      vars_obj['_object__state'] = state
 
   def _graph_node_init(self, attributes: tp.Iterable[tuple[str, tp.Any]]):
-    vars(self).update(attributes)
+    vars_obj = vars(self)
+    prev_state = vars_obj.get('_object__state')
+    vars_obj.update(attributes)
+    state: ObjectState = vars_obj['_object__state']
+    if prev_state is not None and state is not prev_state:
+      # the node was re-initialized, keep its identity for the parents
+      state._structure = prev_state._structure
+    for value in vars_obj.values():
+      _link_children(state._structure, value)
+    state._structure.bump()
+
+  def _graph_node_structure(self) -> graph.StructureVersion:
+    return self._object__state.structure
@@ -0,0 +1,268 @@
+# Copyright 2024 The Flax Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Opt-in instrumentation of the Python overhead of NNX transforms."""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import functools
+import json
+import os
+import threading
+import time
+import typing as tp
+
+F = tp.TypeVar('F', bound=tp.Callable[..., tp.Any])
+
+# the profiler spans are recorded to, ``None`` when profiling is disabled
+_PROFILER: OverheadProfiler | None = None
+_NULL_SPAN = contextlib.nullcontext()
+
+
+@dataclasses.dataclass(frozen=True)
+class SpanEvent:
+  """A single timed span, ``path`` holds the names of the enclosing spans."""
+
+  path: tuple[str, ...]
+  start_ns: int
+  duration_ns: int
+  thread_id: int
+
+
+@dataclasses.dataclass(frozen=True)
+class SpanStats:
+  """Aggregated wall time of all spans with the same path, in microseconds."""
+
+  count: int
+  total_us: float
+  mean_us: float
+  p50_us: float
+  p90_us: float
+  p99_us: float
+  max_us: float
+
+
+def _percentile(sorted_values: list[int], q: float) -> int:
+  # nearest-rank percentile
+  index = max(0, -(-len(sorted_values) * q // 100) - 1)
+  return sorted_values[int(index)]
+
+
+class OverheadProfiler:
+  """Records the wall time of the phases of NNX transform calls.
+
+  Use :func:`overhead` to create and activate a profiler. Spans are named
+  after the transform (``'jit'``, ``'grad'``, ``'value_and_grad'``,
+  ``'vmap'``, ``'scan'``, ``'remat'``) and the phase inside of it:
+
+  * ``'to_tree'``: splitting the graph nodes in the inputs or outputs.
+  * ``'from_tree'``: merging the pure inputs or outputs back into graph nodes.
+  * ``'graph_cache'``: looking up the cached traversal of the inputs.
+  * ``'fingerprint'`` / ``'check_fingerprint'``: fingerprint computations.
+  * ``'dispatch'``: the call to the underlying JAX transform. Because JAX
+    dispatches asynchronously this doesn't include the device computation,
+    but it includes tracing and compilation on the first call.
+
+  Spans nest, e.g. the ``to_tree`` inside of a traced ``jit`` function is
+  reported as ``'jit/dispatch/to_tree'``.
+
+  Args:
+    max_events: maximum number of recorded spans, later spans are dropped
+      and counted in ``dropped``. ``None`` means no limit.
+  """
+
+  def __init__(self, max_events: int | None = None):
+    self.max_events = max_events
+    self.events: list[SpanEvent] = []
+    self.dropped = 0
+    self.start_ns = time.perf_counter_ns()
+    self._local = threading.local()
+    self._lock = threading.Lock()
+
+  def _stack(self) -> list[str]:
+    stack = getattr(self._local, 'stack', None)
+    if stack is None:
+      stack = self._local.stack = []
+    return stack
+
+  def _record(self, event: SpanEvent):
+    with self._lock:
+      if self.max_events is not None and len(self.events) >= self.max_events:
+        self.dropped += 1
+      else:
+        self.events.append(event)
+
+  def clear(self):
+    """Removes all recorded spans."""
+    with self._lock:
+      self.events.clear()
+      self.dropped = 0
+
+  def summary(self) -> dict[str, SpanStats]:
+    """Returns the statistics of the recorded spans keyed by their path."""
+    durations: dict[str, list[int]] = {}
+    with self._lock:
+      events = list(self.events)
+    for event in events:
+      durations.setdefault('/'.join(event.path), []).append(event.duration_ns)
+    stats = {}
+    for path, values in sorted(durations.items()):
+      values.sort()
+      total = sum(values)
+      stats[path] = SpanStats(
+        count=len(values),
+        total_us=total / 1e3,
+        mean_us=total / len(values) / 1e3,
+        p50_us=_percentile(values, 50) / 1e3,
+        p90_us=_percentile(values, 90) / 1e3,
+        p99_us=_percentile(values, 99) / 1e3,
+        max_us=values[-1] / 1e3,
+      )
+    return stats
+
+  def report(self) -> str:
+    """Returns the :meth:`summary` formatted as a table."""
+    header = (
+      f'{"span":<40} {"count":>7} {"total (us)":>12} {"mean (us)":>10}'
+      f' {"p50 (us)":>10} {"p90 (us)":>10} {"p99 (us)":>10}'
+    )
+    lines = [header]
+    for path, s in self.summary().items():
+      lines.append(
+        f'{path:<40} {s.count:>7} {s.total_us:>12.1f} {s.mean_us:>10.1f}'
+        f' {s.p50_us:>10.1f} {s.p90_us:>10.1f} {s.p99_us:>10.1f}'
+      )
+    return '\n'.join(lines)
+
+  def chrome_trace(self) -> dict[str, tp.Any]:
+    """Returns the recorded spans in the Chrome trace event format.
+
+    The result can be opened with ``chrome://tracing`` or
+    `Perfetto <https://ui.perfetto.dev>`__.
+    """
+    pid = os.getpid()
+    with self._lock:
+      events = list(self.events)
+    trace_events = [
+      {
+        'name': event.path[-1],
+        'cat': event.path[0],
+        'ph': 'X',
+        'ts': (event.start_ns - self.start_ns) / 1e3,
+        'dur': event.duration_ns / 1e3,
+        'pid': pid,
+        'tid': event.thread_id,
+        'args': {'path': '/'.join(event.path)},
+      }
+      for event in events
+    ]
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+  def export_chrome_trace(self, path: str):
+    """Writes :meth:`chrome_trace` as JSON to ``path``."""
+    with open(path, 'w') as f:
+      json.dump(self.chrome_trace(), f)
+
+
+class _Span:
+  __slots__ = ('profiler', 'name', 'start_ns')
+
+  def __init__(self, profiler: OverheadProfiler, name: str):
+    self.profiler = profiler
+    self.name = name
+
+  def __enter__(self):
+    self.profiler._stack().append(self.name)
+    self.start_ns = time.perf_counter_ns()
+
+  def __exit__(self, *exc_info):
+    end_ns = time.perf_counter_ns()
+    stack = self.profiler._stack()
+    path = tuple(stack)
+    stack.pop()
+    self.profiler._record(
+      SpanEvent(path, self.start_ns, end_ns - self.start_ns, threading.get_ident())
+    )
+
+
+def span(name: str) -> tp.ContextManager[None]:
+  """Returns a context manager that times its body as the span ``name``.
+
+  If no profiler is active this returns a no-op context manager.
+  """
+  profiler = _PROFILER
+  if profiler is None:
+    return _NULL_SPAN
+  return _Span(profiler, name)
+
+
+def profile(name: str) -> tp.Callable[[F], F]:
+  """Decorator version of :func:`span`."""
+
+  def decorator(f: F) -> F:
+    @functools.wraps(f)
+    def profile_wrapper(*args, **kwargs):
+      profiler = _PROFILER
+      if profiler is None:
+        return f(*args, **kwargs)
+      with _Span(profiler, name):
+        return f(*args, **kwargs)
+
+    return profile_wrapper  # type: ignore[return-value]
+
+  return decorator
+
+
+@contextlib.contextmanager
+def overhead(
+  max_events: int | None = None,
+) -> tp.Iterator[OverheadProfiler]:
+  """Records the Python overhead of NNX transform calls inside the context.
+
+  Example usage::
+
+    >>> from flax import nnx
+    >>> import jax.numpy as jnp
+    ...
+    >>> model = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    >>> forward = nnx.jit(lambda model, x: model(x))
+    >>> with nnx.profiling.overhead() as profiler:
+    ...   y = forward(model, jnp.ones((1, 2)))
+    ...   y = forward(model, jnp.ones((1, 2)))
+    >>> profiler.summary()['jit'].count
+    2
+    >>> profiler.summary()['jit/to_tree'].count
+    2
+
+  The spans can be printed with :meth:`OverheadProfiler.report` or exported
+  with :meth:`OverheadProfiler.export_chrome_trace`. Spans are recorded for
+  all threads, outside of the context NNX transforms have no profiling
+  overhead other than a global lookup per span.
+
+  Args:
+    max_events: maximum number of recorded spans, see
+      :class:`OverheadProfiler`.
+
+  Returns:
+    A context manager yielding the :class:`OverheadProfiler`.
+  """
+  global _PROFILER
+  profiler = OverheadProfiler(max_events)
+  previous = _PROFILER
+  _PROFILER = profiler
+  try:
+    yield profiler
+  finally:
+    _PROFILER = previous
@@ -21,6 +21,7 @@ import warnings
 
 import jax
 import jax.tree_util as jtu
+import numpy as np
 import treescope  # type: ignore[import-not-found,import-untyped]
 
 from flax.nnx import filterlib, reprlib, traversals, variablelib
@@ -57,10 +58,11 @@ class NestedStateRepr(reprlib.Representable):
     return subtree_renderer(children, path=path)
 
 class FlatState(tp.Sequence[tuple[PathParts, V]], reprlib.Representable):
-  __slots__ = ('_keys', '_values')
+  __slots__ = ('_keys', '_values', '_index')
 
   _keys: tuple[PathParts, ...]
   _values: list[V]
+  _index: FlatStateIndex | None
 
   def __init__(self, items: tp.Iterable[tuple[PathParts, V]], /, *, sort: bool):
     keys, values = [], []
@@ -71,6 +73,7 @@ class FlatState(tp.Sequence[tuple[PathParts, V]], reprlib.Representable):
       values.append(value)
     self._keys = tuple(keys)
     self._values = values
+    self._index = None
 
   @staticmethod
   def from_sorted_keys_values(
@@ -79,8 +82,18 @@ class FlatState(tp.Sequence[tuple[PathParts, V]], reprlib.Representable):
     flat_state = object.__new__(FlatState)
     flat_state._keys = keys
     flat_state._values = values
+    flat_state._index = None
     return flat_state
 
+  @property
+  def index(self) -> FlatStateIndex:
+    """A columnar view of the paths and leaf types, built lazily and used to
+    evaluate filters as vectorized masks. The index is cached, it must not be
+    used after the leaves are mutated in place."""
+    if self._index is None:
+      self._index = FlatStateIndex(self._keys, self._values)
+    return self._index
+
   @property
   def paths(self) -> tp.Tuple[PathParts, ...]:
     return self._keys
@@ -208,6 +221,7 @@ def _flat_state_pytree_unflatten(
   flat_state = object.__new__(FlatState)
   flat_state._keys = keys
   flat_state._values = values
+  flat_state._index = None
   return flat_state
 
 
@@ -711,6 +725,121 @@ def diff(state: State, other: State) -> State:
   return from_flat_state(diff)
 
 
+class FlatStateIndex:
+  """Columnar representation of the paths and leaf types of a
+  :class:`FlatState`.
+
+  Leaf types are stored as an integer array of codes into ``types``, paths
+  are interned into ``path_positions`` (path -> position) and
+  ``key_positions`` (path key -> positions of the paths containing it),
+  the last two are built on first use.
+  """
+
+  __slots__ = ('paths', 'types', 'type_codes', '_path_positions', '_key_positions')
+
+  def __init__(self, paths: tp.Sequence[PathParts], leaves: tp.Sequence[tp.Any]):
+    type_ids: dict[type, int] = {}
+    self.paths = paths
+    self.type_codes = np.fromiter(
+      (type_ids.setdefault(type(leaf), len(type_ids)) for leaf in leaves),
+      dtype=np.int32,
+      count=len(leaves),
+    )
+    self.types: tuple[type, ...] = tuple(type_ids)
+    self._path_positions: dict[PathParts, int] | None = None
+    self._key_positions: dict[Key, np.ndarray] | None = None
+
+  def __len__(self) -> int:
+    return len(self.type_codes)
+
+  @property
+  def path_positions(self) -> dict[PathParts, int]:
+    if self._path_positions is None:
+      self._path_positions = {path: i for i, path in enumerate(self.paths)}
+    return self._path_positions
+
+  @property
+  def key_positions(self) -> dict[Key, np.ndarray]:
+    if self._key_positions is None:
+      positions: dict[Key, list[int]] = {}
+      for i, path in enumerate(self.paths):
+        for key in dict.fromkeys(path):
+          positions.setdefault(key, []).append(i)
+      self._key_positions = {
+        key: np.asarray(indexes, dtype=np.intp)
+        for key, indexes in positions.items()
+      }
+    return self._key_positions
+
+  def type_mask(self, type_: type) -> np.ndarray:
+    codes = [
+      code for code, leaf_type in enumerate(self.types)
+      if issubclass(leaf_type, type_)
+    ]
+    return np.isin(self.type_codes, codes)
+
+
+# below this size the per-call overhead of numpy is larger than the savings
+_VECTORIZED_FILTER_MIN_SIZE = 256
+
+
+def _filter_mask(
+  predicate: filterlib.Predicate,
+  flat_state: FlatState[tp.Any],
+) -> np.ndarray:
+  """Evaluates a predicate over all the elements of ``flat_state`` as a
+  boolean mask. Built-in filters over types and paths are vectorized, other
+  predicates are called once per element."""
+  index = flat_state.index
+  predicate_type = type(predicate)
+  if predicate_type is filterlib.OfType:
+    return index.type_mask(predicate.type)  # type: ignore[attr-defined]
+  elif predicate_type is filterlib.Everything:
+    return np.ones(len(index), dtype=bool)
+  elif predicate_type is filterlib.Nothing:
+    return np.zeros(len(index), dtype=bool)
+  elif predicate_type is filterlib.PathContains:
+    mask = np.zeros(len(index), dtype=bool)
+    positions = index.key_positions.get(predicate.key)  # type: ignore[attr-defined]
+    if positions is not None:
+      mask[positions] = True
+    return mask
+  elif predicate_type is filterlib.PathIn:
+    mask = np.zeros(len(index), dtype=bool)
+    path_positions = index.path_positions
+    mask[
+      [path_positions[p] for p in predicate.paths if p in path_positions]  # type: ignore[attr-defined]
+    ] = True
+    return mask
+  elif predicate_type is filterlib.Any:
+    mask = np.zeros(len(index), dtype=bool)
+    for sub_predicate in predicate.predicates:  # type: ignore[attr-defined]
+      mask |= _filter_mask(sub_predicate, flat_state)
+    return mask
+  elif predicate_type is filterlib.All:
+    mask = np.ones(len(index), dtype=bool)
+    for sub_predicate in predicate.predicates:  # type: ignore[attr-defined]
+      mask &= _filter_mask(sub_predicate, flat_state)
+    return mask
+  elif predicate_type is filterlib.Not:
+    return ~_filter_mask(predicate.predicate, flat_state)  # type: ignore[attr-defined]
+  else:
+    return np.fromiter(
+      (bool(predicate(path, value)) for path, value in flat_state),
+      dtype=bool,
+      count=len(flat_state),
+    )
+
+
+def _take(flat_state: FlatState[V], positions: np.ndarray) -> FlatState[V]:
+  keys, values = flat_state._keys, flat_state._values
+  positions_list: list[int] = positions.tolist()
+  return FlatState.from_sorted_keys_values(
+    tuple([keys[i] for i in positions_list]),
+    [values[i] for i in positions_list],
+  )
+
+
 def _split_state(
   flat_state: FlatState[V],
   *filters: filterlib.Filter,
@@ -725,6 +854,18 @@ def _split_state(
         )
   predicates = tuple(map(filterlib.to_predicate, filters))
 
+  if len(flat_state) >= _VECTORIZED_FILTER_MIN_SIZE:
+    # evaluate the predicates as masks, each element goes to the first
+    # predicate that matches it and the rest to the last state
+    remaining = np.ones(len(flat_state), dtype=bool)
+    split_states: list[FlatState[V]] = []
+    for predicate in predicates:
+      mask = _filter_mask(predicate, flat_state) & remaining
+      remaining &= ~mask
+      split_states.append(_take(flat_state, np.flatnonzero(mask)))
+    split_states.append(_take(flat_state, np.flatnonzero(remaining)))
+    return tuple(split_states)
+
   # we have n + 1 states, where n is the number of predicates
   # the last state is for values that don't match any predicate
   flat_states: tuple[list[tuple[PathParts, V]], ...] = tuple(
@@ -13,6 +13,7 @@
 # limitations under the License.
 from __future__ import annotations
 
+from concurrent import futures
 import typing as tp
 
 import numpy as np
@@ -422,3 +423,128 @@ class MultiMetric(Metric):
         f'{metric_name}': getattr(self, metric_name).compute()
         for metric_name in self._metric_names
     }
+
+
+@jax.jit
+def _stack_values(values):
+  return jax.tree.map(lambda *xs: jnp.stack(xs), *values)
+
+
+class MetricLogger:
+  """Logs metric values without blocking on the device.
+
+  Converting a metric to a Python number, e.g.
+  ``float(metrics.compute()['loss'])``, waits for the device to finish the
+  current step and copies the value to the host. Doing this every step
+  stalls the accelerator. ``MetricLogger`` instead buffers the device values
+  passed to :func:`log`, and every ``buffer_size`` steps stacks them on
+  device, starts a single asynchronous device to host transfer and hands the
+  result to a background thread which calls ``write_fn(step, scalars)`` once
+  per logged step, in order::
+
+    >>> from flax import nnx
+    >>> import jax.numpy as jnp
+    ...
+    >>> metrics = nnx.MultiMetric(loss=nnx.metrics.Average('loss'))
+    ...
+    >>> @nnx.jit
+    ... def train_step(metrics, x):
+    ...   metrics.update(loss=(x**2).mean())
+    ...   return metrics.compute()
+    ...
+    >>> logs = []
+    >>> with nnx.metrics.MetricLogger(
+    ...   lambda step, scalars: logs.append((step, scalars)), buffer_size=2
+    ... ) as logger:
+    ...   for step in range(3):
+    ...     logger.log(step, train_step(metrics, jnp.full((4,), float(step))))
+    >>> logs
+    [(0, {'loss': 0.0}), (1, {'loss': 0.5}), (2, {'loss': 1.6666666269302368})]
+
+  ``write_fn`` can be e.g. the ``write_scalars`` method of
+  :class:`flax.metrics.tensorboard.SummaryWriter`. Nested values such as the
+  ``Statistics`` of :class:`Welford` are flattened into ``'/'`` separated
+  names. Exceptions raised by ``write_fn`` are re-raised by the next call to
+  :func:`flush` or :func:`close`.
+
+  Args:
+    write_fn: called from a background thread as ``write_fn(step, scalars)``
+      where ``scalars`` maps the metric names to Python scalars.
+    buffer_size: the number of steps to buffer before transferring them to
+      the host.
+  """
+
+  def __init__(
+    self,
+    write_fn: tp.Callable[[int, dict[str, tp.Any]], tp.Any],
+    *,
+    buffer_size: int = 100,
+  ):
+    if buffer_size < 1:
+      raise ValueError(f'buffer_size must be positive, got {buffer_size}.')
+    self.write_fn = write_fn
+    self.buffer_size = buffer_size
+    self._steps: list[int] = []
+    self._values: list[tp.Any] = []
+    self._pending: list[futures.Future] = []
+    self._executor = futures.ThreadPoolExecutor(max_workers=1)
+
+  def log(self, step: int, values) -> None:
+    """Buffers the metric values of a step.
+
+    Args:
+      step: the training step.
+      values: a pytree of scalars, e.g. the output of
+        :func:`MultiMetric.compute`. The structure must be the same for all
+        steps.
+    """
+    self._steps.append(int(step))
+    self._values.append(values)
+    if len(self._steps) >= self.buffer_size:
+      self.flush()
+
+  def flush(self, wait: bool = False) -> None:
+    """Transfers the buffered values to the host and writes them.
+
+    Args:
+      wait: whether to block until all the values have been written.
+    """
+    if self._steps:
+      steps, values = self._steps, self._values
+      self._steps, self._values = [], []
+      stacked = _stack_values(values)
+      for x in jax.tree.leaves(stacked):
+        x.copy_to_host_async()
+      self._pending.append(self._executor.submit(self._write, steps, stacked))
+    # the single worker completes the writes in order, a future is removed
+    # before its result is checked so that each error is raised once.
+    while self._pending and (wait or self._pending[0].done()):
+      self._pending.pop(0).result()
+
+  def close(self) -> None:
+    """Writes the buffered values and stops the background thread."""
+    try:
+      self.flush(wait=True)
+    finally:
+      self._executor.shutdown()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def _write(self, steps: list[int], stacked) -> None:
+    # blocks until the transfer started in `flush` is done
+    paths_values, _ = jax.tree_util.tree_flatten_with_path(
+      jax.device_get(stacked)
+    )
+    names = [
+      jax.tree_util.keystr(path, simple=True, separator='/')
+      for path, _ in paths_values
+    ]
+    for i, step in enumerate(steps):
+      scalars = {
+        name: value[i].item() for name, (_, value) in zip(names, paths_values)
+      }
+      self.write_fn(step, scalars)
@@ -17,11 +17,16 @@ import functools
 import typing as tp
 
 import jax
+from jax._src.sharding_impls import TransferToMemoryKind
+from jax.interpreters import pxla
 import jax.numpy as jnp
 import optax
 
 from flax import nnx
 from flax.nnx import filterlib
+from flax.nnx import spmd
+from flax.nnx import statelib
+from flax.nnx import variablelib
 from flax.nnx.object import Object
 from flax.nnx.variablelib import Variable
 
@@ -65,6 +70,118 @@ def to_opt_state(tree):
   )
   return tree
 
+def _is_variable(x) -> bool:
+  return isinstance(x, Variable)
+
+
+def _read(x):
+  if isinstance(x, Variable):
+    x = x.raw_value
+  if variablelib.is_mutable_array(x):
+    x = x[...]
+  return x
+
+
+def _apply_update(param, update):
+  # same as ``optax.apply_updates`` without the ``jnp.asarray`` calls when
+  # the dtype is already preserved
+  value = param + update
+  dtype = param.dtype if hasattr(param, 'dtype') else jnp.asarray(param).dtype
+  if getattr(value, 'dtype', None) != dtype:
+    value = jnp.asarray(value).astype(dtype)
+  return value
+
+
+def _write(leaf, value) -> bool:
+  """Writes ``value`` into ``leaf`` in place, returns False for plain arrays."""
+  if isinstance(leaf, Variable):
+    if variablelib.is_mutable_array(leaf.raw_value):
+      leaf.raw_value[...] = value
+    else:
+      leaf.raw_value = value
+  elif variablelib.is_mutable_array(leaf):
+    leaf[...] = value
+  else:
+    return False
+  return True
+
+
+def _mesh_axis_size(axis: str, mesh) -> int | None:
+  if mesh is None:
+    physical_mesh = pxla.thread_resources.env.physical_mesh
+    if not physical_mesh.empty:
+      mesh = physical_mesh
+    elif not (abstract_mesh := jax.sharding.get_abstract_mesh()).empty:
+      mesh = abstract_mesh
+  if mesh is None:
+    return None
+  if axis not in mesh.axis_names:
+    raise ValueError(
+      f'shard_axis {axis!r} is not an axis of the mesh {mesh.axis_names}.'
+    )
+  return mesh.shape[axis]
+
+
+def _shard_sharding(variable: Variable, axis: str):
+  """Adds ``axis`` to the largest unsharded dimension of ``variable``."""
+  sharding = variable.get_metadata().get('sharding')
+  shape = getattr(variable.raw_value, 'shape', ())
+  names = tuple(sharding) if sharding else ()
+  if not shape or axis in names:
+    return sharding
+  names = names + (None,) * (len(shape) - len(names))
+  axis_size = _mesh_axis_size(axis, variable.get_metadata().get('mesh'))
+  candidates = [
+    i
+    for i, (name, size) in enumerate(zip(names, shape))
+    if name is None and (axis_size is None or size % axis_size == 0)
+  ]
+  if not candidates:
+    return sharding
+  index = max(candidates, key=lambda i: shape[i])
+  return names[:index] + (axis,) + names[index + 1 :]
+
+
+def _partition_spec(leaf, **metadata):
+  if not isinstance(leaf, Variable):
+    return None
+  if metadata:
+    leaf = leaf.replace(leaf.raw_value, **metadata)
+  return spmd.get_partition_spec(leaf).raw_value
+
+
+def _memory_kinds() -> tuple[str, str]:
+  """Returns the host and device memory kinds of the default device.
+
+  Backends without a pinned host memory, e.g. CPU, use their default memory
+  as the host memory.
+  """
+  device = jax.devices()[0]
+  device_kind = device.default_memory().kind
+  kinds = {memory.kind for memory in device.addressable_memories()}
+  host_kind = 'pinned_host' if 'pinned_host' in kinds else device_kind
+  return host_kind, device_kind
+
+
+def _to_memory_kind(x, memory_kind: str):
+  if isinstance(x, jax.core.Tracer):
+    return jax.device_put(x, TransferToMemoryKind(memory_kind))
+  x = jnp.asarray(x)
+  return jax.device_put(x, x.sharding.with_memory_kind(memory_kind))
+
+
+def _transfer(values, memory_kind: str):
+  return [_to_memory_kind(x, memory_kind) for x in values]
+
+
+def _layer_chunks(state) -> list[statelib.State]:
+  """Groups the leaves of ``state`` by the path of their parent node."""
+  chunks: dict[tuple, list] = {}
+  for path, leaf in nnx.to_flat_state(state):
+    chunks.setdefault(path[:-1], []).append((path, leaf))
+  return [nnx.from_flat_state(items) for items in chunks.values()]
+
+
 class _Missing:
   pass
 
@@ -136,12 +253,59 @@ class Optimizer(Object, tp.Generic[M]):
     tx: optax.GradientTransformation,
     *,
     wrt: filterlib.Filter,  # type: ignore
+    shard_axis: str | None = None,
+    offload: bool = False,
   ):
     """
     Instantiate the class and wrap the :class:`Module` and Optax gradient
     transformation. Instantiate the optimizer state to keep track of
     :class:`Variable` types specified in ``wrt``. Set the step count to 0.
 
+    By default the optimizer state has the same sharding as the parameters,
+    so with data parallelism every replica holds a full copy of it. Passing
+    the data parallel mesh axis as ``shard_axis`` partitions the optimizer
+    state across that axis instead (ZeRO stage 1): the axis is added to the
+    largest unsharded dimension of each optimizer state Variable that is
+    divisible by the axis size. :func:`update` then constrains the gradients
+    to that sharding (a reduce-scatter), updates the local shards and
+    constrains the new parameters back to their own sharding (an
+    all-gather), reducing the optimizer memory per device by the size of the
+    axis::
+
+      >>> from flax import nnx
+      >>> import optax
+      ...
+      >>> model = nnx.Linear(16, 4, rngs=nnx.Rngs(0))
+      >>> optimizer = nnx.Optimizer(
+      ...   model, optax.adam(1e-3), wrt=nnx.Param, shard_axis='data'
+      ... )
+      >>> optimizer.opt_state[0].mu['kernel'].sharding
+      ('data', None)
+
+    The shardings are applied inside of a mesh context, see the `Scale up
+    on multiple devices <https://flax.readthedocs.io/en/latest/guides/flax_gspmd.html>`__
+    guide.
+
+    For models whose optimizer state doesn't fit in accelerator memory,
+    ``offload=True`` keeps the optimizer state in pinned host memory. The
+    state is grouped into one chunk per layer, i.e. per parent node of the
+    ``wrt`` Variables, and :func:`update` streams the chunks to the device one
+    at a time, loading the next chunk while the current one is being updated
+    and writing the results back to the host. The device then only holds the
+    parameters, the gradients and about two chunks of optimizer state::
+
+      >>> optimizer = nnx.Optimizer(
+      ...   model, optax.adam(1e-3), wrt=nnx.Param, offload=True
+      ... )
+      >>> list(optimizer.opt_state[0][0].mu)
+      ['bias', 'kernel']
+
+    Since ``tx`` is applied to each chunk separately, offloading assumes
+    that ``tx`` transforms each parameter independently, transformations
+    such as ``optax.clip_by_global_norm`` would only see one layer at a time.
+    Backends without pinned host memory, e.g. CPU, keep the state in their
+    default memory.
+
     Args:
       model: An NNX Module.
       tx: An Optax gradient transformation.
@@ -151,6 +315,10 @@ class Optimizer(Object, tp.Generic[M]):
         ``wrt``  argument passed to the ``nnx.grad`` call that will generate the
         gradients that will be passed into the ``grads`` argument of the
         :func:`update` method.
+      shard_axis: optional mesh axis to partition the optimizer state across,
+        typically the data parallel axis.
+      offload: whether to keep the optimizer state in host memory and stream
+        it to the device one layer at a time during :func:`update`.
     """
     if isinstance(wrt, _Missing):
       raise TypeError(
@@ -160,10 +328,28 @@ class Optimizer(Object, tp.Generic[M]):
       wrt = nnx.Param
     self.step = OptState(jnp.array(0, dtype=jnp.uint32))
     self.tx = tx
-    self.opt_state = nnx.data(
-      to_opt_state(tx.init(nnx.state(model, wrt)))
-    )
+    params = nnx.state(model, wrt)
+    if offload:
+      # one optimizer state per layer, kept in host memory
+      opt_state = [
+        to_opt_state(tx.init(chunk)) for chunk in _layer_chunks(params)
+      ]
+      host_kind, _ = _memory_kinds()
+    else:
+      opt_state = to_opt_state(tx.init(params))
+    for variable in jax.tree.leaves(opt_state, is_leaf=_is_variable):
+      if shard_axis is not None:
+        sharding = _shard_sharding(variable, shard_axis)
+        if sharding is not None:
+          variable.sharding = sharding
+          spec = _partition_spec(variable)
+          _write(variable, spmd.with_sharding_constraint(_read(variable), spec))
+      if offload:
+        _write(variable, _to_memory_kind(_read(variable), host_kind))
+    self.opt_state = nnx.data(opt_state)
     self.wrt = wrt
+    self.shard_axis = shard_axis
+    self.offload = offload
 
   if not tp.TYPE_CHECKING:
     def __getattribute__(self, name: str) -> tp.Any:
@@ -202,27 +388,174 @@ class Optimizer(Object, tp.Generic[M]):
       ... )
       >>> optimizer.update(model, grads)
 
-    Note that internally this function calls ``.tx.update()`` followed by a call
-    to ``optax.apply_updates()`` to update ``params`` and ``opt_state``.
+    Note that internally this function calls ``.tx.update()`` and then adds the
+    updates to the parameters as ``optax.apply_updates()`` does. The ``wrt``
+    Variables of ``model`` and the Variables of ``opt_state`` are traversed
+    once and their values are replaced in place, so when the training step
+    is compiled with ``nnx.jit(..., donate_argnums=...)`` donating the model
+    and the optimizer, XLA can reuse their buffers for the new values::
+
+      >>> @nnx.jit(donate_argnums=(0, 1))
+      ... def train_step(model, optimizer, x, y):
+      ...   grads = nnx.grad(loss_fn)(model, x, y)
+      ...   optimizer.update(model, grads)
+      ...
+      >>> train_step(model, optimizer, jnp.ones((1, 2)), jnp.ones((1, 3)))
 
     Args:
       grads: the gradients derived from ``nnx.grad``.
       **kwargs: additional keyword arguments passed to the tx.update, to support
       ``GradientTransformationExtraArgs``, such as ``optax.scale_by_backtracking_linesearch``.
     """
-    param_arrays = nnx.freeze(nnx.pure(nnx.state(model, self.wrt)))
-    grad_arrays = nnx.freeze(nnx.pure(nnx.state(grads)))
-    opt_state_arrays = nnx.freeze(nnx.pure(self.opt_state))
+    # the leaves of the state are the Variables of the model
+    params = nnx.state(model, self.wrt)
+    param_leaves, treedef = jax.tree.flatten(params, is_leaf=_is_variable)
+    if not isinstance(grads, statelib.State):
+      grads = nnx.state(grads)
+    grad_leaves, grads_treedef = jax.tree.flatten(grads, is_leaf=_is_variable)
+    if grads_treedef != treedef:
+      raise ValueError(
+        'Expected the structure of `grads` to match the structure of the '
+        f'Variables selected by `wrt={self.wrt!r}`, got:\n{grads_treedef}\n'
+        f'and:\n{treedef}'
+      )
     kwargs_arrays = nnx.freeze(nnx.pure(kwargs))
 
+    if not self.offload:
+      opt_state_vars, opt_state_treedef = jax.tree.flatten(
+        self.opt_state, is_leaf=_is_variable
+      )
+      new_values, new_opt_state_values = self._update_arrays(
+        param_leaves,
+        grad_leaves,
+        treedef,
+        [_read(x) for x in opt_state_vars],
+        opt_state_treedef,
+        kwargs_arrays,
+      )
+      self._write_params(model, param_leaves, treedef, new_values)
+      self._write_opt_state(opt_state_vars, new_opt_state_values)
+      self.step[...] += 1
+      return
+
+    # stream the optimizer state of one layer at a time to the device, the
+    # next chunk is loaded while the current one is being updated
+    host_kind, device_kind = _memory_kinds()
+    chunks = []
+    for param_chunk, grad_chunk, opt_state in zip(
+      _layer_chunks(params), _layer_chunks(grads), self.opt_state, strict=True
+    ):
+      param_leaves, treedef = jax.tree.flatten(
+        param_chunk, is_leaf=_is_variable
+      )
+      opt_state_vars, opt_state_treedef = jax.tree.flatten(
+        opt_state, is_leaf=_is_variable
+      )
+      chunks.append((
+        param_leaves,
+        jax.tree.leaves(grad_chunk, is_leaf=_is_variable),
+        treedef,
+        opt_state_vars,
+        opt_state_treedef,
+      ))
+    loaded = _transfer([_read(x) for x in chunks[0][3]], device_kind)
+    previous: list[jax.Array] = []
+    for i, chunk in enumerate(chunks):
+      param_leaves, grad_leaves, treedef, opt_state_vars, opt_state_treedef = (
+        chunk
+      )
+      if i + 1 < len(chunks):
+        # only start loading the next chunk once the previous one is done, so
+        # at most two chunks are loaded at the same time
+        next_values = [_read(x) for x in chunks[i + 1][3]]
+        next_values, previous = jax.lax.optimization_barrier(
+          (next_values, previous)
+        )
+        next_loaded = _transfer(next_values, device_kind)
+      new_values, new_opt_state_values = self._update_arrays(
+        param_leaves,
+        grad_leaves,
+        treedef,
+        loaded,
+        opt_state_treedef,
+        kwargs_arrays,
+      )
+      self._write_params(model, param_leaves, treedef, new_values)
+      self._write_opt_state(opt_state_vars, new_opt_state_values, host_kind)
+      previous = new_opt_state_values
+      if i + 1 < len(chunks):
+        loaded = next_loaded
+    self.step[...] += 1
+
+  def _update_arrays(
+    self,
+    param_leaves,
+    grad_leaves,
+    treedef,
+    opt_state_values,
+    opt_state_treedef,
+    kwargs_arrays,
+  ):
+    """Returns the new parameter values and flat optimizer state values."""
+    param_values = [_read(x) for x in param_leaves]
+    grad_values = [_read(x) for x in grad_leaves]
+    if self.shard_axis is not None:
+      # update the shards of the parameters with the sharding of the optimizer
+      # state, the gradients are reduce-scattered to it
+      shard_specs = [
+        _partition_spec(x, sharding=_shard_sharding(x, self.shard_axis))
+        if isinstance(x, Variable)
+        else None
+        for x in param_leaves
+      ]
+      param_values = [
+        spmd.with_sharding_constraint(x, spec)
+        for x, spec in zip(param_values, shard_specs)
+      ]
+      grad_values = [
+        spmd.with_sharding_constraint(x, spec)
+        for x, spec in zip(grad_values, shard_specs)
+      ]
+
     updates, new_opt_state = self.tx.update(
-      grad_arrays, opt_state_arrays, param_arrays, **kwargs_arrays
+      treedef.unflatten(grad_values),
+      opt_state_treedef.unflatten(opt_state_values),
+      treedef.unflatten(param_values),
+      **kwargs_arrays,
     )
-    new_params = optax.apply_updates(param_arrays, updates)
 
-    nnx.update(model, new_params)
-    nnx.update(self.opt_state, nnx.state(new_opt_state))
-    self.step[...] += 1
+    new_values = []
+    for leaf, param, update in zip(
+      param_leaves, param_values, treedef.flatten_up_to(updates)
+    ):
+      value = param if update is None else _apply_update(param, update)
+      if self.shard_axis is not None:
+        # all-gather the updated shards
+        value = spmd.with_sharding_constraint(value, _partition_spec(leaf))
+      new_values.append(value)
+    new_opt_state_values = [
+      _read(x) for x in opt_state_treedef.flatten_up_to(new_opt_state)
+    ]
+    return new_values, new_opt_state_values
+
+  def _write_params(self, model, param_leaves, treedef, new_values):
+    # apply the updates directly to the Variables, only graphs holding plain
+    # arrays need to be updated
+    update_model = False
+    for leaf, value in zip(param_leaves, new_values):
+      if not _write(leaf, value):
+        update_model = True
+    if update_model:
+      nnx.update(model, treedef.unflatten(new_values))
+
+  def _write_opt_state(self, opt_state_vars, values, memory_kind=None):
+    for leaf, value in zip(opt_state_vars, values):
+      if self.shard_axis is not None:
+        value = spmd.with_sharding_constraint(value, _partition_spec(leaf))
+      if memory_kind is not None:
+        value = _to_memory_kind(value, memory_kind)
+      _write(leaf, value)
+
 
 class ModelAndOptimizer(Optimizer[M]):
   """A convenience class that combines a model and an optimizer.
@@ -236,4 +569,117 @@ class ModelAndOptimizer(Optimizer[M]):
     self.model = model
 
   def update(self, grads, /, **kwargs): # type: ignore
-    return super().update(self.model, grads, **kwargs)
\ No newline at end of file
+    return super().update(self.model, grads, **kwargs)
+
+class MicroBatched:
+  """Computes the value and gradients of a loss by accumulating micro-batches.
+
+  ``MicroBatched(f, num_micro_batches)`` behaves like
+  ``nnx.value_and_grad(f, argnums=nnx.DiffState(0, wrt))`` but splits the
+  batched arguments into ``num_micro_batches`` micro-batches along their
+  leading axis and iterates over them with :func:`nnx.scan`, accumulating the
+  gradients. Activations are only kept for one micro-batch at a time, so
+  memory scales with the micro-batch size while the returned loss and
+  gradients are the averages over the micro-batches, which equal the
+  full-batch values when ``f`` returns a mean over its batch. Together with
+  :meth:`Optimizer.update` this applies a single optimizer update per
+  compiled step::
+
+    >>> from flax import nnx
+    >>> import jax.numpy as jnp
+    >>> import optax
+    ...
+    >>> model = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    >>> optimizer = nnx.Optimizer(model, optax.adam(1e-3), wrt=nnx.Param)
+    >>> loss_fn = lambda model, x, y: ((model(x) - y) ** 2).mean()
+    >>> grad_fn = nnx.MicroBatched(loss_fn, num_micro_batches=4)
+    ...
+    >>> @nnx.jit
+    ... def train_step(model, optimizer, x, y):
+    ...   loss, grads = grad_fn(model, x, y)
+    ...   optimizer.update(model, grads)
+    ...   return loss
+    ...
+    >>> loss = train_step(model, optimizer, jnp.ones((16, 2)), jnp.ones((16, 3)))
+
+  State updates of the model, e.g. batch statistics or RNG counts, are carried
+  from one micro-batch to the next.
+
+  Args:
+    f: the loss function, called as ``f(model, *micro_batch)``. It should
+      return a scalar loss, or a ``(loss, aux)`` pair if ``has_aux=True``.
+    num_micro_batches: the number of micro-batches, must divide the size of
+      the leading axis of all batched arguments.
+    wrt: a Filter selecting the Variables of the model to differentiate,
+      should match the ``wrt`` of the :class:`Optimizer`.
+    has_aux: whether ``f`` returns a ``(loss, aux)`` pair. The ``aux`` outputs
+      of the micro-batches are stacked along a new leading axis.
+    accumulate_dtype: the dtype of the gradient accumulators, defaults to the
+      dtype of each Variable. The returned gradients are cast back to the
+      dtype of the Variables.
+  """
+
+  def __init__(
+    self,
+    f: tp.Callable[..., tp.Any],
+    num_micro_batches: int,
+    *,
+    wrt: filterlib.Filter = nnx.Param,
+    has_aux: bool = False,
+    accumulate_dtype: tp.Any | None = None,
+  ):
+    if num_micro_batches < 1:
+      raise ValueError(
+        f'num_micro_batches must be positive, got {num_micro_batches}.'
+      )
+    self.loss_fn = f
+    self.num_micro_batches = num_micro_batches
+    self.wrt = wrt
+    self.has_aux = has_aux
+    self.accumulate_dtype = accumulate_dtype
+    self._value_and_grad = nnx.value_and_grad(
+      f, argnums=nnx.DiffState(0, wrt), has_aux=has_aux
+    )
+
+    @nnx.scan(in_axes=(nnx.Carry, 0), out_axes=(nnx.Carry, 0))
+    def accumulate(carry, micro_batch):
+      model, acc = carry
+      value, grads = self._value_and_grad(model, *micro_batch)
+      acc = jax.tree.map(lambda a, g: a + g.astype(a.dtype), acc, grads)
+      return (model, acc), value
+
+    self._accumulate = accumulate
+
+  def __call__(self, model, *batch):
+    """Returns the averaged ``(value, grads)`` of ``f`` over the micro-batches.
+
+    Args:
+      model: the graph node differentiated with respect to the ``wrt``
+        Variables, it isn't split.
+      *batch: the batched arguments of ``f``, pytrees of arrays whose leading
+        axis is split into micro-batches.
+    """
+    k = self.num_micro_batches
+    if k == 1:
+      return self._value_and_grad(model, *batch)
+
+    def split(x):
+      if x.shape[0] % k != 0:
+        raise ValueError(
+          f'Batch size {x.shape[0]} is not divisible by num_micro_batches={k}.'
+        )
+      return x.reshape(k, x.shape[0] // k, *x.shape[1:])
+
+    micro_batches = jax.tree.map(split, batch)
+    acc = jax.tree.map(
+      lambda x: jnp.zeros(x.shape, self.accumulate_dtype or x.dtype),
+      nnx.state(model, self.wrt),
+    )
+    (_, acc), values = self._accumulate((model, acc), micro_batches)
+    grads = jax.tree.map(
+      lambda g, x: (g / k).astype(x.dtype), acc, nnx.state(model, self.wrt)
+    )
+    if self.has_aux:
+      loss, aux = values
+      return (loss.mean(), aux), grads
+    return values.mean(), grads
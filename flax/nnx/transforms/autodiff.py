@@ -23,6 +23,7 @@ from flax.nnx import (
   extract,
   filterlib,
   graph,
+  profiling,
   variablelib,
 )
 from flax.nnx.statelib import State
@@ -130,6 +131,7 @@ def _grad_general(
       else DiffState(-1, variablelib.Param)
     )
 
+  @profiling.profile('value_and_grad' if return_value else 'grad')
   @graph.update_context('grad')
   def grad_wrapper(*args, **kwargs):
     args = resolve_kwargs(f, args, kwargs)
@@ -160,7 +162,8 @@ def _grad_general(
       allow_int=allow_int,
     )
 
-    fn_out = gradded_fn(*pure_args)
+    with profiling.span('dispatch'):
+      fn_out = gradded_fn(*pure_args)
 
     def process_grads(grads):
       return jax.tree.map(
@@ -14,19 +14,31 @@
 # pytype: skip-file
 from __future__ import annotations
 
+import collections
 import dataclasses
 import functools
+import hashlib
+import os
+import re
 import typing as tp
+import uuid
 
+from absl import logging
 import jax
 import jax.experimental
 import jax.experimental.shard_map
+import msgpack
+import numpy as np
+from jax.experimental import serialize_executable
 from jax.sharding import AbstractMesh, Mesh, PartitionSpec
 
+from flax import config
+from flax import io
 from flax.nnx import (
   extract,
   filterlib,
   graph,
+  profiling,
   statelib,
   variablelib,
 )
@@ -395,6 +407,13 @@ class JitWrapped:
     self.out_shardings = out_shardings
     self.kwarg_shardings = kwarg_shardings
     self.static_argnums = static_argnums
+    self.static_argnames = static_argnames
+    self.graph_cache = graph.GraphCache(config.flax_jit_graph_cache_size)
+    # executables loaded from or written to flax_jit_executable_cache_dir,
+    # in LRU order
+    self._executables: collections.OrderedDict[tp.Any, tp.Any] = (
+      collections.OrderedDict()
+    )
 
   # implement descriptor protocol so that we can use this as a method
   def __get__(self, obj, objtype=None):
@@ -424,16 +443,56 @@ class JitWrapped:
     )
     return out
 
+  @profiling.profile('jit')
   def __call__(self, *args, **kwargs):
+    # reuse the traversal of input graph nodes whose structure didn't change
+    # since a previous call, an active cached_partial takes precedence
+    if graph.GRAPH_CONTEXT.tmp_static_cache is None:
+      with profiling.span('graph_cache'):
+        graph.GRAPH_CONTEXT.tmp_static_cache = self.graph_cache.get(
+          (args, kwargs)
+        )
     # run dynamic_cache_context before update_context
     with graph.update_context(self):
       pure_args, pure_kwargs = self._get_pure_args_kwargs(args, kwargs)
-      pure_args_out, pure_kwargs_out, pure_out = self.jitted_fn(
-        *pure_args, **pure_kwargs
-      )
+      cache_dir = config.flax_jit_executable_cache_dir
+      with profiling.span('dispatch'):
+        if (
+          cache_dir
+          and self.static_argnums is None
+          and self.static_argnames is None
+        ):
+          pure_args_out, pure_kwargs_out, pure_out = self._call_cached(
+            cache_dir, pure_args, pure_kwargs
+          )
+        else:
+          pure_args_out, pure_kwargs_out, pure_out = self.jitted_fn(
+            *pure_args, **pure_kwargs
+          )
       out = self._get_non_pure_out(pure_args_out, pure_kwargs_out, pure_out)
     return out
 
+  def _call_cached(self, cache_dir: str, pure_args, pure_kwargs):
+    """Runs the pure function through an executable from ``cache_dir``.
+
+    A disk hit still traces the function, the output pytree holds GraphDefs
+    which cannot be serialized, but lowering and compilation are skipped.
+    """
+    leaves, treedef = jax.tree.flatten((pure_args, pure_kwargs))
+    if any(isinstance(x, jax.core.Tracer) for x in leaves):
+      return self.jitted_fn(*pure_args, **pure_kwargs)
+    key = (treedef, tuple(map(_leaf_signature, leaves)))
+    compiled = self._executables.get(key)
+    if compiled is None:
+      traced = self.jitted_fn.trace(*pure_args, **pure_kwargs)
+      compiled = _load_or_compile(cache_dir, traced, leaves)
+      self._executables[key] = compiled
+      while len(self._executables) > config.flax_jit_executable_cache_size:
+        self._executables.popitem(last=False)
+    else:
+      self._executables.move_to_end(key)
+    return compiled(*pure_args, **pure_kwargs)
+
   def eval_shape(self, *args, **kwargs):
     """See ``jax.eval_shape``."""
     args, kwargs = graph.clone((args, kwargs))
@@ -477,6 +536,82 @@ class JitWrapped:
     return Lowered(lowered, self)
 
 
+def _leaf_signature(x) -> tuple[tp.Any, ...]:
+  aval = jax.core.get_aval(x)
+  sharding = x.sharding if isinstance(x, jax.Array) else None
+  return (aval.shape, aval.dtype, aval.weak_type, sharding)
+
+
+_ADDRESS_RE = re.compile(r' at 0x[0-9a-fA-F]+')
+
+
+def _executable_key(traced: jax.stages.Traced, leaves) -> str:
+  """Hash of everything the compiled executable depends on."""
+  h = hashlib.sha256()
+
+  def add(x):
+    h.update(_ADDRESS_RE.sub('', str(x)).encode())
+    h.update(b'\0')
+
+  add(jax.__version__)
+  add(jax.default_backend())
+  add([(d.platform, d.device_kind) for d in jax.devices()])
+  add(traced.jaxpr)
+  for const in traced.jaxpr.consts:
+    add(getattr(const, 'dtype', type(const)))
+    h.update(np.asarray(const).tobytes())
+  add([arg.donated for arg in jax.tree.leaves(traced.args_info)])
+  add([_leaf_signature(x) for x in leaves])
+  return h.hexdigest()
+
+
+def _load_or_compile(cache_dir: str, traced: jax.stages.Traced, leaves):
+  """Loads the executable of ``traced`` from ``cache_dir`` or compiles it.
+
+  Errors of the cache, e.g. a corrupt file or an executable that can't be
+  serialized, are logged and fall back to compiling without the cache.
+  """
+  path = os.path.join(cache_dir, _executable_key(traced, leaves) + '.xla')
+  in_tree = jax.tree.structure(traced.args_info)
+  out_tree = jax.tree.structure(traced.out_info)
+  if io.exists(path):
+    try:
+      with io.GFile(path, 'rb') as f:
+        entry = msgpack.unpackb(f.read())
+      # the executable must be loaded on the devices it was compiled for, not
+      # on every device of the backend
+      devices_by_id = {d.id: d for d in jax.devices()}
+      return serialize_executable.deserialize_and_load(
+        entry['executable'],
+        in_tree,
+        out_tree,
+        execution_devices=[devices_by_id[i] for i in entry['devices']],
+      )
+    except Exception as e:  # pylint: disable=broad-except
+      logging.warning(
+        'Failed to load the cached executable %s, compiling it instead: %r',
+        path,
+        e,
+      )
+  compiled = traced.lower().compile()
+  try:
+    payload, _, _ = serialize_executable.serialize(compiled)
+    devices = compiled.runtime_executable().local_devices()
+    payload = msgpack.packb(
+      {'devices': [d.id for d in devices], 'executable': payload}
+    )
+    io.makedirs(cache_dir)
+    # write to a temporary file first so concurrent readers never see a
+    # partially written executable
+    tmp_path = f'{path}.tmp-{uuid.uuid4().hex}'
+    with io.GFile(tmp_path, 'wb') as f:
+      f.write(payload)
+    io.rename(tmp_path, path, overwrite=True)
+  except Exception as e:  # pylint: disable=broad-except
+    logging.warning('Failed to cache the executable in %s: %r', path, e)
+  return compiled
+
+
 class Stage:
   args_info: tp.Any  # PyTree of ArgInfo
 
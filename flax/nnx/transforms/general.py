@@ -17,6 +17,7 @@ import typing as tp
 from flax.nnx import (
   extract,
   graph,
+  profiling,
 )
 from flax.typing import MISSING, Missing
 
@@ -146,11 +147,13 @@ def split_inputs(
   if isinstance(f, Missing):
     return functools.partial(split_inputs, ctxtag=ctxtag)  # type: ignore[return-value]
 
+  @profiling.profile(ctxtag)
   @graph.update_context(ctxtag)
   @functools.wraps(f)
   def split_inputs_wrapper(*args):
     pure_args = extract.to_tree(args, ctxtag=ctxtag)
-    pure_args_out, pure_out = f(*pure_args)
+    with profiling.span('dispatch'):
+      pure_args_out, pure_out = f(*pure_args)
     args_out, out = extract.from_tree(
       (pure_args_out, pure_out), ctxtag=ctxtag, is_inner=False
     )
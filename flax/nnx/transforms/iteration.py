@@ -20,7 +20,7 @@ import typing as tp
 
 from flax import struct
 from flax.core.frozen_dict import FrozenDict
-from flax.nnx import extract, filterlib, graph, spmd, variablelib
+from flax.nnx import extract, filterlib, graph, profiling, spmd, variablelib
 from flax.nnx import statelib
 from flax.nnx.module import Module
 from flax.nnx.statelib import State
@@ -339,13 +339,15 @@ def vmap(
   )
 
   @functools.wraps(f)
+  @profiling.profile('vmap')
   @graph.update_context('vmap')
   def vmap_wrapper(*args, **kwargs):
     args = resolve_kwargs(f, args, kwargs)
     pure_args = extract.to_tree(
         args, prefix=in_axes, split_fn=_vmap_split_fn, ctxtag='vmap'
     )
-    pure_args_out, pure_out = vmapped_fn(*pure_args)
+    with profiling.span('dispatch'):
+      pure_args_out, pure_out = vmapped_fn(*pure_args)
     _args_out, out = extract.from_tree(
       (pure_args_out, pure_out), ctxtag='vmap', is_inner=False
     )
@@ -1197,6 +1199,7 @@ def scan(
   )
 
   @functools.wraps(f)
+  @profiling.profile('scan')
   @graph.update_context('scan')
   def scan_wrapper(*args, **kwargs):
     args = resolve_kwargs(f, args, kwargs)
@@ -1233,15 +1236,16 @@ def scan(
 
     carry = (pure_carry_arg, carry_deque, broadcast_deque, broadcast_arrays)
 
-    carry_out, scan_out = jax.lax.scan(
-      scan_fn,
-      carry,
-      pure_args,
-      length=length,
-      reverse=reverse,
-      unroll=unroll,
-      _split_transpose=_split_transpose,
-    )
+    with profiling.span('dispatch'):
+      carry_out, scan_out = jax.lax.scan(
+        scan_fn,
+        carry,
+        pure_args,
+        length=length,
+        reverse=reverse,
+        unroll=unroll,
+        _split_transpose=_split_transpose,
+      )
     (
         pure_carry_arg_out,
         carry_deque_out,
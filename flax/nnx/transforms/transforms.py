@@ -22,6 +22,7 @@ import typing as tp
 
 from jax._src import checkify as checkify_lib
 
+from flax.core import partial_eval
 from flax.nnx import (
   extract,
   graph,
@@ -151,6 +152,45 @@ def eval_shape(
   out = jax.eval_shape(_eval_shape_fn, *args, **kwargs)
   return extract.from_tree(out)
 
+
+def deferred_init(
+  f: tp.Callable[..., tp.Any],
+  *args: tp.Any,
+  **kwargs: tp.Any,
+) -> partial_eval.DeferredInit:
+  """Traces ``f`` without computing the Variables it creates.
+
+  Like :func:`eval_shape`, ``f`` is only traced, but the returned
+  ``DeferredInit`` records how every Variable is initialized, including its
+  initializer and rng, so that ``materialize`` can create the output layer by
+  layer, directly in the target sharding. This way no host has to hold more
+  than a single layer of unsharded weights::
+
+    >>> from flax import nnx
+    >>> import jax
+    ...
+    >>> deferred = nnx.deferred_init(lambda: nnx.Linear(2, 3, rngs=nnx.Rngs(0)))
+    >>> deferred.abstract.kernel.value
+    ShapeDtypeStruct(shape=(2, 3), dtype=float32)
+    >>> model = deferred.materialize()
+    >>> model.kernel.value.shape
+    (2, 3)
+
+  ``materialize`` and ``materialize_iter`` accept a function of the leaf path
+  and ``jax.ShapeDtypeStruct`` returning the target sharding of each leaf.
+  """
+  args, kwargs = extract.to_tree((args, kwargs))
+
+  @functools.wraps(f)
+  def _deferred_init_fn(*args, **kwargs):
+    args, kwargs = extract.from_tree((args, kwargs))
+    out = f(*args, **kwargs)
+    return graph.freeze(extract.to_tree(out), allow_duplicates=True)
+
+  return partial_eval.deferred_init(
+    _deferred_init_fn, postprocess=extract.from_tree
+  )(*args, **kwargs)
+
 @dataclasses.dataclass(eq=False)
 class CheckifyFn:
   f: tp.Callable[..., tp.Any]
@@ -54,6 +54,20 @@ class VariableContext(threading.local):
 
 VARIABLE_CONTEXT = VariableContext()
 
+# incremented every time the metadata of a Variable is mutated in place
+_metadata_version: int = 0
+
+
+def metadata_version() -> int:
+  """Returns a global counter that changes every time the metadata of any
+  Variable is mutated in place. Value updates don't change it."""
+  return _metadata_version
+
+
+def _bump_metadata_version():
+  global _metadata_version
+  _metadata_version += 1
+
 
 def using_mutable_arrays() -> bool:
   """Returns whether Variables are using MutableArrays by default.
@@ -283,8 +297,11 @@ class Variable(tp.Generic[A], reprlib.Representable):
       or name == '_trace_state'
     ):
       object.__setattr__(self, name, value)
+      if name == '_var_metadata':
+        _bump_metadata_version()
     else:
       self._var_metadata[name] = value
+      _bump_metadata_version()
 
   def __delattr__(self, name: str):
     if not self._trace_state.is_valid():
@@ -301,6 +318,7 @@ class Variable(tp.Generic[A], reprlib.Representable):
       object.__delattr__(self, name)
     else:
       del self._var_metadata[name]
+      _bump_metadata_version()
 
   # NOTE(cgarciae): adding this for backward compatibility with VariableState
   @property
@@ -330,8 +348,10 @@ class Variable(tp.Generic[A], reprlib.Representable):
     if self is other:
       return
     self.raw_value = other.raw_value
-    self._var_metadata.clear()
-    self._var_metadata.update(other.get_metadata())
+    if self._var_metadata != other.get_metadata():
+      self._var_metadata.clear()
+      self._var_metadata.update(other.get_metadata())
+      _bump_metadata_version()
 
   def update_from_state(self, variable_state: Variable[A]):
     if self.mutable and (
@@ -345,6 +365,7 @@ class Variable(tp.Generic[A], reprlib.Representable):
       object.__setattr__(
         self, '_var_metadata', variable_state._var_metadata.copy()
       )
+      _bump_metadata_version()
 
   @property
   def value(self) -> A:
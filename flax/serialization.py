@@ -18,9 +18,13 @@ All Flax classes that carry state (e.g., Optimizer) can be turned into a
 state dict of numpy arrays for easy serialization.
 """
 import enum
+import mmap
+import os
+import struct
 import threading
 from contextlib import contextmanager
-from typing import Any
+from typing import Any, BinaryIO
+from collections.abc import Iterator
 
 import jax
 import msgpack
@@ -357,7 +361,14 @@ def _unchunk(data: dict[str, Any]):
   """Convert canonical dictionary of chunked arrays back into array."""
   assert '__msgpack_chunked_array__' in data
   shape = _dict_to_tuple(data['shape'])
-  flatarr = np.concatenate(_dict_to_tuple(data['chunks']))
+  chunks = _dict_to_tuple(data['chunks'])
+  # copy the chunks straight into the output, the chunks are usually views
+  # into the checkpoint buffer so this is the only copy of the array.
+  flatarr = np.empty(sum(chunk.size for chunk in chunks), dtype=chunks[0].dtype)
+  offset = 0
+  for chunk in chunks:
+    flatarr[offset : offset + chunk.size] = chunk
+    offset += chunk.size
   return flatarr.reshape(shape)
 
 
@@ -390,6 +401,243 @@ def _unchunk_array_leaves_in_place(d):
   return d
 
 
+# Streaming encoding
+
+# ``msgpack_serialize`` builds the whole encoding as one ``bytes`` object on
+# top of host copies of every array. The encoder below produces the exact
+# same bytes as a sequence of small headers and raw array buffers, so the
+# largest object held in memory is a single array leaf.
+
+
+def _ext_header(code: int, length: int) -> bytes:
+  """Header of a msgpack ext object of the given payload length."""
+  if length in (1, 2, 4, 8, 16):
+    fixext = {1: 0xD4, 2: 0xD5, 4: 0xD6, 8: 0xD7, 16: 0xD8}[length]
+    return struct.pack('>Bb', fixext, code)
+  elif length <= 0xFF:
+    return struct.pack('>BBb', 0xC7, length, code)
+  elif length <= 0xFFFF:
+    return struct.pack('>BHb', 0xC8, length, code)
+  else:
+    return struct.pack('>BIb', 0xC9, length, code)
+
+
+def _bin_header(length: int) -> bytes:
+  if length <= 0xFF:
+    return struct.pack('>BB', 0xC4, length)
+  elif length <= 0xFFFF:
+    return struct.pack('>BH', 0xC5, length)
+  else:
+    return struct.pack('>BI', 0xC6, length)
+
+
+def _ndarray_encode_iter(arr: np.ndarray, packer: msgpack.Packer):
+  """Same encoding as ``_msgpack_ext_pack`` for arrays, without copying."""
+  if arr.dtype.hasobject or arr.dtype.isalignedstruct:
+    raise ValueError(
+      'Object and structured dtypes not supported '
+      'for serialization of ndarrays.'
+    )
+  # viewing the data as bytes also works for dtypes that don't support the
+  # buffer protocol, like bfloat16.
+  data = memoryview(np.ascontiguousarray(arr).reshape(-1).view(np.uint8))
+  payload_header = b''.join((
+    packer.pack_array_header(3),
+    packer.pack(list(arr.shape)),
+    packer.pack(arr.dtype.name),
+    _bin_header(data.nbytes),
+  ))
+  yield _ext_header(
+    _MsgpackExtType.ndarray, len(payload_header) + data.nbytes
+  )
+  yield payload_header
+  yield data
+
+
+def _msgpack_encode_iter(
+  x, packer: msgpack.Packer, chunk_arrays: bool, sort_keys: bool
+) -> Iterator[bytes | memoryview]:
+  # like ``_chunk_array_leaves_in_place``, only arrays reachable from the
+  # root through dicts are chunked.
+  if isinstance(x, (np.ndarray, jax.Array)):
+    x = np.asarray(x)
+    if chunk_arrays and x.size * x.dtype.itemsize > MAX_CHUNK_SIZE:
+      # chunks are created after the tree is copied and keep their order
+      yield from _msgpack_encode_iter(_chunk(x), packer, False, False)
+    else:
+      yield from _ndarray_encode_iter(x, packer)
+  elif type(x) is dict:
+    yield packer.pack_map_header(len(x))
+    for key in sorted(x) if sort_keys else x:
+      yield from _msgpack_encode_iter(key, packer, False, sort_keys)
+      yield from _msgpack_encode_iter(x[key], packer, chunk_arrays, sort_keys)
+  elif type(x) is list:
+    yield packer.pack_array_header(len(x))
+    for value in x:
+      yield from _msgpack_encode_iter(value, packer, False, sort_keys)
+  else:
+    yield packer.pack(x)
+
+
+def msgpack_encode_iter(
+  pytree, sort_keys: bool = True
+) -> Iterator[bytes | memoryview]:
+  """Lazily encodes a data structure in msgpack format.
+
+  Yields pieces whose concatenation is ``msgpack_serialize(pytree)``. Array
+  leaves are fetched to host one at a time and yielded as views of their
+  data, so the pieces must be consumed before moving to the next one.
+
+  Args:
+    pytree: python tree of dict, list, tuple with python primitives
+      and array leaves.
+    sort_keys: if True, dict entries are encoded in sorted key order like the
+      copy of ``pytree`` made by ``msgpack_serialize``. Otherwise they are
+      encoded in insertion order like ``msgpack_serialize(pytree,
+      in_place=True)``.
+
+  Yields:
+    ``bytes`` or ``memoryview`` pieces of the msgpack encoding of ``pytree``.
+  """
+  packer = msgpack.Packer(default=_msgpack_ext_pack, strict_types=True)
+  yield from _msgpack_encode_iter(pytree, packer, True, sort_keys)
+
+
+# Zero-copy decoding
+
+# ``msgpack.unpackb`` copies every bin and ext payload into a new ``bytes``
+# object, so restoring from a memory-mapped file would still read the whole
+# checkpoint into memory. The decoder below walks the msgpack encoding of a
+# buffer directly and returns arrays that are views into that buffer.
+
+_FIXED_SIZE_FORMATS = {
+  0xCA: struct.Struct('>f'),
+  0xCB: struct.Struct('>d'),
+  0xCC: struct.Struct('>B'),
+  0xCD: struct.Struct('>H'),
+  0xCE: struct.Struct('>I'),
+  0xCF: struct.Struct('>Q'),
+  0xD0: struct.Struct('>b'),
+  0xD1: struct.Struct('>h'),
+  0xD2: struct.Struct('>i'),
+  0xD3: struct.Struct('>q'),
+}
+_LENGTH_FORMATS = {1: struct.Struct('>B'), 2: struct.Struct('>H'), 4: struct.Struct('>I')}
+# header byte -> size of the length field
+_STR_LENGTHS = {0xD9: 1, 0xDA: 2, 0xDB: 4}
+_BIN_LENGTHS = {0xC4: 1, 0xC5: 2, 0xC6: 4}
+_EXT_LENGTHS = {0xC7: 1, 0xC8: 2, 0xC9: 4}
+_ARRAY_LENGTHS = {0xDC: 2, 0xDD: 4}
+_MAP_LENGTHS = {0xDE: 2, 0xDF: 4}
+# fixext header byte -> payload size
+_FIXEXT_SIZES = {0xD4: 1, 0xD5: 2, 0xD6: 4, 0xD7: 8, 0xD8: 16}
+
+
+class _ZeroCopyDecoder:
+  """Decodes msgpack-encoded python trees without copying array data."""
+
+  def __init__(self, buffer):
+    self.buffer = memoryview(buffer).cast('B')
+    self.pos = 0
+
+  def _read_length(self, size: int) -> int:
+    (length,) = _LENGTH_FORMATS[size].unpack_from(self.buffer, self.pos)
+    self.pos += size
+    return length
+
+  def _read_view(self, length: int) -> memoryview:
+    view = self.buffer[self.pos : self.pos + length]
+    if len(view) != length:
+      raise ValueError('Unexpected end of msgpack data.')
+    self.pos += length
+    return view
+
+  def decode(self, raw: bool = False):
+    """Decodes the next object, strings are returned as bytes if ``raw``."""
+    header = self.buffer[self.pos]
+    self.pos += 1
+    if header <= 0x7F:
+      return header
+    elif header >= 0xE0:
+      return header - 0x100
+    elif header <= 0x8F:
+      return self._decode_map(header & 0x0F, raw)
+    elif header <= 0x9F:
+      return self._decode_array(header & 0x0F, raw)
+    elif header <= 0xBF:
+      return self._decode_str(header & 0x1F, raw)
+    elif header == 0xC0:
+      return None
+    elif header == 0xC2:
+      return False
+    elif header == 0xC3:
+      return True
+    elif header in _FIXED_SIZE_FORMATS:
+      fmt = _FIXED_SIZE_FORMATS[header]
+      (value,) = fmt.unpack_from(self.buffer, self.pos)
+      self.pos += fmt.size
+      return value
+    elif header in _STR_LENGTHS:
+      return self._decode_str(self._read_length(_STR_LENGTHS[header]), raw)
+    elif header in _BIN_LENGTHS:
+      return bytes(self._read_view(self._read_length(_BIN_LENGTHS[header])))
+    elif header in _ARRAY_LENGTHS:
+      length = self._read_length(_ARRAY_LENGTHS[header])
+      return self._decode_array(length, raw)
+    elif header in _MAP_LENGTHS:
+      return self._decode_map(self._read_length(_MAP_LENGTHS[header]), raw)
+    elif header in _FIXEXT_SIZES:
+      return self._decode_ext(_FIXEXT_SIZES[header])
+    elif header in _EXT_LENGTHS:
+      return self._decode_ext(self._read_length(_EXT_LENGTHS[header]))
+    raise ValueError(f'Invalid msgpack header byte: {header:#x}')
+
+  def _decode_str(self, length: int, raw: bool):
+    data = self._read_view(length)
+    return bytes(data) if raw else str(data, 'utf-8')
+
+  def _decode_array(self, length: int, raw: bool) -> list[Any]:
+    return [self.decode(raw) for _ in range(length)]
+
+  def _decode_map(self, length: int, raw: bool) -> dict[Any, Any]:
+    result = {}
+    for _ in range(length):
+      key = self.decode(raw)
+      result[key] = self.decode(raw)
+    return result
+
+  def _decode_ext(self, length: int):
+    code = struct.unpack_from('>b', self.buffer, self.pos)[0]
+    self.pos += 1
+    data = self._read_view(length)
+    if code == _MsgpackExtType.ndarray:
+      return self._ndarray_view(data)
+    elif code == _MsgpackExtType.npscalar:
+      return self._ndarray_view(data)[()]
+    return _msgpack_ext_unpack(code, bytes(data))
+
+  @staticmethod
+  def _ndarray_view(data: memoryview) -> np.ndarray:
+    """Same as ``_ndarray_from_bytes`` but the array is a view into ``data``."""
+    decoder = _ZeroCopyDecoder(data)
+    header = decoder.buffer[0]
+    if header != 0x93:
+      raise ValueError('Invalid msgpack encoding of an ndarray.')
+    decoder.pos = 1
+    shape = decoder.decode(raw=True)
+    dtype_name = decoder.decode(raw=True)
+    buffer_header = decoder.buffer[decoder.pos]
+    decoder.pos += 1
+    if buffer_header not in _BIN_LENGTHS:
+      raise ValueError('Invalid msgpack encoding of an ndarray.')
+    buffer = decoder._read_view(
+      decoder._read_length(_BIN_LENGTHS[buffer_header])
+    )
+    return np.frombuffer(
+      buffer, dtype=_dtype_from_name(dtype_name), count=-1, offset=0
+    ).reshape(shape, order='C')
+
+
 # User-facing API calls:
 
 
@@ -415,25 +663,83 @@ def msgpack_serialize(pytree, in_place: bool = False) -> bytes:
   return msgpack.packb(pytree, default=_msgpack_ext_pack, strict_types=True)
 
 
-def msgpack_restore(encoded_pytree: bytes):
+def msgpack_serialize_to_stream(
+  pytree, stream: BinaryIO, sort_keys: bool = True
+) -> int:
+  """Save data structure to a file-like object in msgpack format.
+
+  Writes the same bytes as ``msgpack_serialize`` but leaf by leaf, so that
+  besides the host copy of one array leaf no extra memory is used. Any object
+  with a ``write`` method is supported, e.g. ``flax.io.GFile``.
+
+  Args:
+    pytree: python tree of dict, list, tuple with python primitives
+      and array leaves.
+    stream: writable binary file-like object.
+    sort_keys: see ``msgpack_encode_iter``.
+
+  Returns:
+    The number of bytes written.
+  """
+  num_bytes = 0
+  for piece in msgpack_encode_iter(pytree, sort_keys):
+    stream.write(piece)
+    num_bytes += len(piece) if isinstance(piece, bytes) else piece.nbytes
+  return num_bytes
+
+
+def msgpack_restore(encoded_pytree: bytes, zero_copy: bool = False):
   """Restore data structure from bytes in msgpack format.
 
   Low-level function that only supports python trees with array leaves,
   for custom objects use ``from_bytes``.
 
   Args:
-    encoded_pytree: msgpack-encoded bytes of python tree.
+    encoded_pytree: msgpack-encoded bytes of python tree, or any object
+      supporting the buffer protocol (e.g. a ``bytearray`` or an ``mmap``).
+    zero_copy: if True, array leaves are read-only views into
+      ``encoded_pytree`` instead of copies, and keep it alive. Only arrays
+      that were split into chunks on save are copied.
 
   Returns:
     Python tree of dict, list, tuple with python primitive
     and array leaves.
   """
-  state_dict = msgpack.unpackb(
-    encoded_pytree, ext_hook=_msgpack_ext_unpack, raw=False
-  )
+  if zero_copy:
+    decoder = _ZeroCopyDecoder(encoded_pytree)
+    state_dict = decoder.decode()
+    if decoder.pos != len(decoder.buffer):
+      raise ValueError('Extra data found after the msgpack-encoded tree.')
+  else:
+    state_dict = msgpack.unpackb(
+      encoded_pytree, ext_hook=_msgpack_ext_unpack, raw=False
+    )
   return _unchunk_array_leaves_in_place(state_dict)
 
 
+def msgpack_restore_mmap(filename: str | os.PathLike):
+  """Restore data structure from a msgpack file without reading it into memory.
+
+  The file is memory-mapped and array leaves are read-only views into the
+  mapping, so the data is only paged in when the arrays are accessed and
+  the restored tree can be larger than the available host memory. The file
+  must be on a local filesystem and must not be modified while the arrays
+  are in use.
+
+  Args:
+    filename: path of a file written with ``msgpack_serialize``.
+
+  Returns:
+    Python tree of dict, list, tuple with python primitive
+    and array leaves.
+  """
+  with open(filename, 'rb') as f:
+    # the mapping stays valid after the file is closed, it is released
+    # once no array references it anymore.
+    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+  return msgpack_restore(buffer, zero_copy=True)
+
+
 def from_bytes(target, encoded_bytes: bytes):
   """Restore optimizer or other object from msgpack-serialized state-dict.
 
@@ -463,3 +769,21 @@ def to_bytes(target) -> bytes:
   """
   state_dict = to_state_dict(target)
   return msgpack_serialize(state_dict, in_place=True)
+
+
+def to_file(target, stream: BinaryIO) -> int:
+  """Save optimizer or other object as msgpack-serialized state-dict to a file.
+
+  Streaming version of ``to_bytes``, the full serialized bytes are never held
+  in memory.
+
+  Args:
+    target: template object with state-dict registrations to be
+      serialized to msgpack format.  Typically a flax model or optimizer.
+    stream: writable binary file-like object, e.g. ``flax.io.GFile``.
+
+  Returns:
+    The number of bytes written.
+  """
+  state_dict = to_state_dict(target)
+  return msgpack_serialize_to_stream(state_dict, stream, sort_keys=False)
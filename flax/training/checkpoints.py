@@ -20,11 +20,14 @@ checkpoint files.
 """
 
 import functools
+import hashlib
+import heapq
 import os
 import pathlib
 import re
 import time
 import warnings
+import weakref
 from concurrent.futures import thread
 from typing import (
   Any,
@@ -32,6 +35,7 @@ from typing import (
 from collections.abc import Callable, Iterable
 
 import jax
+import numpy as np
 import orbax.checkpoint as ocp
 from absl import logging
 from jax import monitoring, process_index
@@ -75,6 +79,12 @@ MP_ARRAY_PH = '//GDAPlaceholder:'
 # We need this for GCS because GCS's directory move is not atomic.
 COMMIT_SUCCESS_FILE = 'commit_success.txt'
 
+# Sharded checkpoints are directories with an index file holding the
+# non-array part of the pytree, array leaves are stored in the shard files and
+# replaced by this string placeholder followed by their leaf number.
+SHARDED_INDEX_FILENAME = 'index.msgpack'
+SHARDED_LEAF_PH = '//ShardedLeaf:'
+
 # Orbax main checkpoint file name.
 ORBAX_CKPT_FILENAME = 'checkpoint'
 ORBAX_MANIFEST_OCDBT = 'manifest.ocdbt'
@@ -131,6 +141,14 @@ def _is_orbax_checkpoint(path: str) -> bool:
   )
 
 
+def _is_sharded_checkpoint(path: str) -> bool:
+  return io.exists(os.path.join(path, SHARDED_INDEX_FILENAME))
+
+
+def _shard_filename(shard: int, num_shards: int) -> str:
+  return f'shard_{shard:05d}_of_{num_shards:05d}.msgpack'
+
+
 class AsyncManager:
   """A simple object to track async checkpointing.
 
@@ -419,6 +437,7 @@ def _remove_invalid_ckpts(
   last_kept = -float('inf')
   if len(checkpoint_files) > keep:
     old_ckpts = checkpoint_files[:-keep]
+    removed_ckpts = []
     # Note: old_ckpts is sorted from oldest to newest.
     for path in old_ckpts:
       if keep_every_n_steps:
@@ -433,6 +452,19 @@ def _remove_invalid_ckpts(
           )
           last_kept = step_number
           continue
+      removed_ckpts.append(path)
+    # Checkpoints holding leaves of kept delta checkpoints are kept as well.
+    referenced = _referenced_checkpoints(
+      [path for path in checkpoint_files if path not in removed_ckpts]
+    )
+    while retained := [
+      path for path in removed_ckpts if os.path.basename(path) in referenced
+    ]:
+      for path in retained:
+        logging.info('Not deleting %s, referenced by delta checkpoints.', path)
+      removed_ckpts = [path for path in removed_ckpts if path not in retained]
+      referenced |= _referenced_checkpoints(retained)
+    for path in removed_ckpts:
       logging.info('Removing checkpoint at %s', path)
       if has_mpa:
         # MPA might be removed already but the main ckpt is still there.
@@ -529,7 +561,8 @@ def _check_overwrite_error(
 
 
 def _save_main_ckpt_file(
-  target: bytes,
+  target: PyTree,
+  sort_keys: bool,
   has_mpa: bool,
   paths: tuple[str, str],
   base_path: str,
@@ -544,7 +577,7 @@ def _save_main_ckpt_file(
   io.makedirs(os.path.dirname(ckpt_path))
 
   with io.GFile(ckpt_tmp_path, 'wb') as fp:
-    fp.write(target)
+    serialization.msgpack_serialize_to_stream(target, fp, sort_keys=sort_keys)
 
   # Postpone the commitment of checkpoint to after MPA writes are done.
   if not has_mpa:
@@ -561,6 +594,308 @@ def _save_main_ckpt_file(
     )
 
 
+def _copy_to_host(target: PyTree) -> PyTree:
+  """Copies the array leaves of a state dict to host memory.
+
+  Used to snapshot a state dict that is serialized in the background, the
+  original arrays might be donated or modified in place in the meantime.
+  """
+  if isinstance(target, dict):
+    return {key: _copy_to_host(value) for key, value in target.items()}
+  elif isinstance(target, list):
+    return [_copy_to_host(value) for value in target]
+  elif isinstance(target, (np.ndarray, jax.Array)):
+    return np.array(target)
+  return target
+
+
+def _extract_sharded_leaves(
+  target: PyTree,
+) -> tuple[PyTree, list[Any], list[tuple[str, ...]]]:
+  """Replaces the array leaves of a state dict by placeholders.
+
+  Returns the new state dict, the array leaves and their paths.
+  """
+  leaves: list[Any] = []
+  leaf_paths: list[tuple[str, ...]] = []
+
+  def replace_leaves(x, path):
+    if isinstance(x, dict):
+      return {
+        key: replace_leaves(value, (*path, key)) for key, value in x.items()
+      }
+    elif isinstance(x, (list, tuple)):
+      # paths use the keys of ``serialization.to_state_dict``, tuples are
+      # stored as lists since msgpack can't pack them.
+      return [
+        replace_leaves(value, (*path, str(i))) for i, value in enumerate(x)
+      ]
+    elif isinstance(x, (np.ndarray, jax.Array)):
+      leaves.append(x)
+      leaf_paths.append(path)
+      return f'{SHARDED_LEAF_PH}{len(leaves) - 1}'
+    return x
+
+  target = replace_leaves(target, ())
+  return target, leaves, leaf_paths
+
+
+def _balance_shards(sizes: dict[int, int], num_shards: int) -> list[list[int]]:
+  """Greedily assigns the largest remaining leaf to the smallest shard."""
+  num_shards = max(1, min(num_shards, len(sizes)))
+  shard_sizes = [(0, shard) for shard in range(num_shards)]
+  shard_leaves: list[list[int]] = [[] for _ in range(num_shards)]
+  for i in sorted(sizes, key=lambda i: -sizes[i]):
+    size, shard = heapq.heappop(shard_sizes)
+    shard_leaves[shard].append(i)
+    heapq.heappush(shard_sizes, (size + sizes[i], shard))
+  return [sorted(leaf_ids) for leaf_ids in shard_leaves]
+
+
+# Digests of immutable jax.Array leaves by object id, so that arrays that are
+# saved again unchanged, e.g. frozen parameters, are not hashed again.
+_LEAF_DIGESTS: dict[int, tuple[weakref.ref, str]] = {}
+
+
+def _cached_leaf_digest(x) -> str | None:
+  if isinstance(x, jax.Array):
+    ref_digest = _LEAF_DIGESTS.get(id(x))
+    if ref_digest is not None and ref_digest[0]() is x:
+      return ref_digest[1]
+  return None
+
+
+def _cache_leaf_digest(x, digest: str):
+  if isinstance(x, jax.Array):
+    key = id(x)
+    _LEAF_DIGESTS[key] = (
+      weakref.ref(x, lambda _: _LEAF_DIGESTS.pop(key, None)),
+      digest,
+    )
+
+
+def _leaf_digest(x) -> str:
+  x = np.ascontiguousarray(x)
+  h = hashlib.blake2b(digest_size=16)
+  h.update(f'{x.dtype.name}{x.shape}'.encode())
+  h.update(memoryview(x.reshape(-1).view(np.uint8)))
+  return h.hexdigest()
+
+
+def _read_sharded_index(ckpt_path: str) -> dict[str, Any]:
+  with io.GFile(os.path.join(ckpt_path, SHARDED_INDEX_FILENAME), 'rb') as fp:
+    return serialization.msgpack_restore(fp.read())
+
+
+def _sharded_leaf_entries(index: dict[str, Any]) -> dict[tuple[str, ...], Any]:
+  """Maps the paths of the leaves in a sharded checkpoint to their entries."""
+  entries = {}
+
+  def visit(x, path):
+    if isinstance(x, dict):
+      for key, value in x.items():
+        visit(value, (*path, key))
+    elif isinstance(x, list):
+      for i, value in enumerate(x):
+        visit(value, (*path, str(i)))
+    elif isinstance(x, str) and x.startswith(SHARDED_LEAF_PH):
+      entries[path] = index['leaves'][x[len(SHARDED_LEAF_PH) :]]
+
+  visit(index['target'], ())
+  return entries
+
+
+def _referenced_checkpoints(ckpt_paths: Iterable[str]) -> set[str]:
+  """Names of the checkpoints holding leaves of delta checkpoints."""
+  referenced = set()
+  for ckpt_path in ckpt_paths:
+    if _is_sharded_checkpoint(ckpt_path):
+      for entry in _read_sharded_index(ckpt_path)['leaves'].values():
+        if entry['checkpoint']:
+          referenced.add(entry['checkpoint'])
+  return referenced
+
+
+def _previous_sharded_checkpoint(ckpt_path: str, base_path: str) -> str | None:
+  """Latest sharded checkpoint ordered before ``ckpt_path``, if any."""
+  dir_path, prefix = os.path.split(base_path)
+  checkpoint_files = [
+    c for c in _all_checkpoints(dir_path, prefix) if c != ckpt_path
+  ]
+  checkpoint_files = natural_sort(checkpoint_files + [ckpt_path])
+  ind = checkpoint_files.index(ckpt_path)
+  if ind > 0 and _is_sharded_checkpoint(checkpoint_files[ind - 1]):
+    return checkpoint_files[ind - 1]
+  return None
+
+
+def _unchanged_leaf_entries(
+  leaf_paths: list[tuple[str, ...]],
+  digests: list[str | None],
+  ckpt_path: str,
+  base_path: str,
+) -> dict[str, dict[str, Any]]:
+  """Index entries of the leaves whose digest matches the previous checkpoint.
+
+  The entries reference the checkpoint that holds the data of the leaf.
+  """
+  entries: dict[str, dict[str, Any]] = {}
+  previous_path = _previous_sharded_checkpoint(ckpt_path, base_path)
+  if previous_path is None:
+    return entries
+  previous_name = os.path.basename(previous_path)
+  previous_entries = _sharded_leaf_entries(_read_sharded_index(previous_path))
+  for i, path in enumerate(leaf_paths):
+    entry = previous_entries.get(path)
+    if (
+      entry is not None
+      and digests[i] is not None
+      and entry.get('digest') == digests[i]
+    ):
+      entries[str(i)] = {
+        **entry,
+        'checkpoint': entry['checkpoint'] or previous_name,
+      }
+  return entries
+
+
+def _save_sharded_ckpt_dir(
+  target: PyTree,
+  leaves: list[Any],
+  leaf_paths: list[tuple[str, ...]],
+  digests: list[str | None] | None,
+  num_shards: int,
+  num_threads: int | None,
+  paths: tuple[str, str],
+  base_path: str,
+  keep: int,
+  overwrite: bool,
+  keep_every_n_steps: int | None,
+  ckpt_start_time: float,
+):
+  """Save a sharded checkpoint directory, writing the shards in parallel.
+
+  If ``digests`` is given, this is a delta checkpoint: leaves whose digest is
+  unchanged since the previous sharded checkpoint are not written again but
+  reference the checkpoint that holds their data.
+  """
+  ckpt_tmp_path, ckpt_path = paths
+  # Clean up the leftovers of a previously interrupted save.
+  if io.exists(ckpt_tmp_path):
+    _safe_remove(ckpt_tmp_path)
+  io.makedirs(ckpt_tmp_path)
+
+  pool = thread.ThreadPoolExecutor(num_threads or num_shards)
+  entries: dict[str, dict[str, Any]] = {}
+  if digests is not None:
+    missing = [i for i, digest in enumerate(digests) if digest is None]
+    missing_digests = pool.map(_leaf_digest, [leaves[i] for i in missing])
+    for i, digest in zip(missing, missing_digests):
+      digests[i] = digest
+    entries.update(
+      _unchanged_leaf_entries(leaf_paths, digests, ckpt_path, base_path)
+    )
+
+  sizes = {
+    i: leaves[i].nbytes for i in range(len(leaves)) if str(i) not in entries
+  }
+  shards = _balance_shards(sizes, num_shards)
+  for shard, leaf_ids in enumerate(shards):
+    for i in leaf_ids:
+      entries[str(i)] = {
+        'checkpoint': '',
+        'shard': shard,
+        'num_shards': len(shards),
+        'key': str(i),
+      }
+      if digests is not None:
+        entries[str(i)]['digest'] = digests[i]
+
+  def write_shard(shard: int):
+    # Fetching to host, encoding and writing all release the GIL for the
+    # array data, so the shards are processed concurrently.
+    path = os.path.join(ckpt_tmp_path, _shard_filename(shard, len(shards)))
+    with io.GFile(path, 'wb') as fp:
+      serialization.msgpack_serialize_to_stream(
+        {str(i): leaves[i] for i in shards[shard]}, fp, sort_keys=False
+      )
+
+  with pool:
+    # Consume the results to surface the errors of the workers.
+    list(pool.map(write_shard, range(len(shards))))
+
+  index = {
+    'target': target,
+    'leaves': {str(i): entries[str(i)] for i in range(len(leaves))},
+  }
+  index_path = os.path.join(ckpt_tmp_path, SHARDED_INDEX_FILENAME)
+  with io.GFile(index_path, 'wb') as fp:
+    serialization.msgpack_serialize_to_stream(index, fp, sort_keys=False)
+
+  # Directories can't be renamed over an existing one.
+  if io.exists(ckpt_path):
+    _safe_remove(ckpt_path)
+  _save_commit(
+    ckpt_tmp_path,
+    ckpt_path,
+    base_path,
+    keep,
+    overwrite,
+    keep_every_n_steps,
+    ckpt_start_time,
+    has_mpa=False,
+    write_commit_success=False,
+  )
+
+
+def _read_sharded_checkpoint(
+  ckpt_path: str, parallel: bool, use_mmap: bool
+) -> PyTree:
+  """Reads a sharded checkpoint directory and restores its state dict.
+
+  Leaves of delta checkpoints are read from the checkpoints they reference,
+  which are expected in the same directory.
+  """
+  index = _read_sharded_index(ckpt_path)
+  dir_path = os.path.dirname(ckpt_path)
+  use_mmap = use_mmap and not SCHEME_RE.match(ckpt_path).group('scheme')  # type: ignore
+
+  shard_files = sorted({
+    (entry['checkpoint'], entry['shard'], entry['num_shards'])
+    for entry in index['leaves'].values()
+  })
+
+  def read_shard(shard_file: tuple[str, int, int]) -> dict[str, Any]:
+    checkpoint, shard, num_shards = shard_file
+    path = os.path.join(
+      os.path.join(dir_path, checkpoint) if checkpoint else ckpt_path,
+      _shard_filename(shard, num_shards),
+    )
+    if use_mmap:
+      return serialization.msgpack_restore_mmap(path)
+    with io.GFile(path, 'rb') as fp:
+      return serialization.msgpack_restore(fp.read())
+
+  if parallel and len(shard_files) > 1:
+    with thread.ThreadPoolExecutor(min(len(shard_files), 32)) as pool:
+      shards = dict(zip(shard_files, pool.map(read_shard, shard_files)))
+  else:
+    shards = {shard_file: read_shard(shard_file) for shard_file in shard_files}
+
+  def restore_leaves(x):
+    if isinstance(x, dict):
+      return {key: restore_leaves(value) for key, value in x.items()}
+    elif isinstance(x, list):
+      return [restore_leaves(value) for value in x]
+    elif isinstance(x, str) and x.startswith(SHARDED_LEAF_PH):
+      entry = index['leaves'][x[len(SHARDED_LEAF_PH) :]]
+      shard_file = (entry['checkpoint'], entry['shard'], entry['num_shards'])
+      return shards[shard_file][entry['key']]
+    return x
+
+  return restore_leaves(index['target'])
+
+
 def _get_checkpoint_paths(
   ckpt_dir: str | os.PathLike,
   step: int | float,
@@ -587,6 +922,9 @@ def save_checkpoint(
   keep_every_n_steps: int | None = None,
   async_manager: AsyncManager | None = None,
   orbax_checkpointer: ocp.Checkpointer | None = None,
+  num_shards: int | None = None,
+  num_threads: int | None = None,
+  delta: bool = False,
 ) -> str:
   """Save a checkpoint of the model. Suitable for single-host.
 
@@ -640,6 +978,22 @@ def save_checkpoint(
       checkpointing guide
       (https://flax.readthedocs.io/en/latest/guides/training_techniques/use_checkpointing.html#save-checkpoints)
       for how to use Orbax checkpointers.
+    num_shards: if defined, the checkpoint is saved as a directory containing
+      an index file and ``num_shards`` files of array leaves with balanced
+      sizes. The shards are fetched to host, encoded and written in parallel,
+      and read in parallel by ``restore_checkpoint``. Not supported by the
+      Orbax backend.
+    num_threads: number of threads used to write the shards, defaults to
+      ``num_shards``.
+    delta: if True, save a sharded checkpoint that only contains the array
+      leaves that changed since the previous sharded checkpoint in
+      ``ckpt_dir``, and references the checkpoints holding the others.
+      Changes are detected by hashing the leaves, the hashes of ``jax.Array``
+      leaves are cached so that arrays that are saved again, e.g. frozen
+      parameters, are not hashed again. Referenced checkpoints are kept until
+      no kept checkpoint references them anymore, even if that exceeds
+      ``keep``. Implies ``num_shards=1`` if ``num_shards`` is not defined.
+      Not supported by the Orbax backend.
 
   Returns:
     Filename of saved checkpoint.
@@ -656,6 +1010,12 @@ def save_checkpoint(
   )
 
   if config.flax_use_orbax_checkpointing or orbax_checkpointer:
+    if num_shards or delta:
+      raise ValueError(
+        f'`{"num_shards" if num_shards else "delta"}` is not supported by the'
+        ' Orbax backend, set `flax_use_orbax_checkpointing` to False to save'
+        ' sharded or delta checkpoints.'
+      )
     logging.info(
       'Using Orbax as backend to save Flax checkpoints. For potential'
       ' troubleshooting see:'
@@ -717,14 +1077,63 @@ def save_checkpoint(
   if not overwrite:
     _check_overwrite_error(ckpt_tmp_path, ckpt_path, base_path, step)  # type: ignore
 
-  target = serialization.to_bytes(target)
+  # The state dict is serialized while it is written, same as ``to_bytes``.
+  target = serialization.to_state_dict(target)
+  if delta and not num_shards:
+    num_shards = 1
+  if num_shards:
+    target, leaves, leaf_paths = _extract_sharded_leaves(target)
+    digests = None
+    if delta:
+      digests = [_cached_leaf_digest(x) for x in leaves]
+      # the digests of these arrays are cached once they are computed
+      uncached = [
+        (i, weakref.ref(x))
+        for i, x in enumerate(leaves)
+        if isinstance(x, jax.Array) and digests[i] is None
+      ]
+    if async_manager:
+      # leaves with a cached digest that is unchanged since the previous
+      # checkpoint are only referenced, they are not written or copied.
+      unchanged = (
+        _unchanged_leaf_entries(leaf_paths, digests, ckpt_path, base_path)
+        if digests is not None
+        else {}
+      )
+      leaves = [
+        x if str(i) in unchanged else _copy_to_host(x)
+        for i, x in enumerate(leaves)
+      ]
+  elif async_manager:
+    target = _copy_to_host(target)
 
   # Save the files via I/O sync or async.
   def save_main_ckpt_task():
     jax.monitoring.record_event('/jax/flax/checkpoint/save_main_ckpt_task')
+    if num_shards:
+      _save_sharded_ckpt_dir(
+        target,
+        leaves,
+        leaf_paths,
+        digests,
+        num_shards,
+        num_threads,
+        (ckpt_tmp_path, ckpt_path),
+        base_path,
+        keep,
+        overwrite,
+        keep_every_n_steps,
+        start_time,
+      )
+      if digests is not None:
+        for i, ref in uncached:
+          if (x := ref()) is not None:
+            _cache_leaf_digest(x, digests[i])  # type: ignore
+      return
     return _save_main_ckpt_file(
       target,
       False,
+      False,
       (ckpt_tmp_path, ckpt_path),
       base_path,
       step,
@@ -864,7 +1273,10 @@ def save_checkpoint_multiprocess(
 
   target = serialization.to_state_dict(target)
   target, mpa_targets = _split_mp_arrays(target)
-  target = serialization.msgpack_serialize(target)
+  # The state dict is serialized while it is written, same as
+  # ``msgpack_serialize``.
+  if async_manager:
+    target = _copy_to_host(target)
   has_mpa = bool(mpa_targets)
 
   if not overwrite:
@@ -876,6 +1288,7 @@ def save_checkpoint_multiprocess(
     jax.monitoring.record_event('/jax/flax/checkpoint/save_main_ckpt_task')
     return _save_main_ckpt_file(
       target,
+      True,
       has_mpa,
       (ckpt_tmp_path, ckpt_path),
       base_path,
@@ -998,6 +1411,38 @@ def available_steps(
   return checkpoint_steps
 
 
+def _read_msgpack_checkpoint(ckpt_path: str, parallel: bool) -> PyTree:
+  """Reads and deserializes a legacy Flax checkpoint file."""
+  ckpt_size = io.getsize(ckpt_path)
+  with io.GFile(ckpt_path, 'rb') as fp:
+    if parallel and fp.seekable():
+      buf_size = 128 << 20  # 128M buffer.
+      num_bufs = ckpt_size / buf_size
+      logging.debug('num_bufs: %d', num_bufs)
+      checkpoint_contents = bytearray(ckpt_size)
+
+      def read_chunk(i):
+        # NOTE: We have to re-open the file to read each chunk, otherwise the
+        # parallelism has no effect. But we could reuse the file pointers
+        # within each thread.
+        with io.GFile(ckpt_path, 'rb') as f:
+          f.seek(i * buf_size)
+          buf = f.read(buf_size)
+          if buf:
+            checkpoint_contents[i * buf_size : i * buf_size + len(buf)] = buf
+          return len(buf) / buf_size
+
+      pool_size = 32
+      pool = thread.ThreadPoolExecutor(pool_size)
+      results = pool.map(read_chunk, range(int(num_bufs) + 1))
+      pool.shutdown(wait=False)
+      logging.debug(f'results: {list(results)}')
+    else:
+      checkpoint_contents = fp.read()
+
+  return serialization.msgpack_restore(checkpoint_contents)
+
+
 def restore_checkpoint(
   ckpt_dir: str | os.PathLike,
   target: Any | None,
@@ -1008,6 +1453,7 @@ def restore_checkpoint(
   allow_partial_mpa_restoration: bool = False,
   orbax_checkpointer: ocp.Checkpointer | None = None,
   orbax_transforms: dict | None = None,
+  use_mmap: bool = False,
 ) -> PyTree:
   """Restore last/best checkpoint from checkpoints in path.
 
@@ -1047,7 +1493,8 @@ def restore_checkpoint(
     step: int or float: step number to load or None to load latest. If
       specified, ckpt_dir must be a directory.
     prefix: str: name prefix of checkpoint files.
-    parallel: bool: whether to load seekable checkpoints in parallel, for speed.
+    parallel: bool: whether to load seekable checkpoints, or the shards of
+      sharded checkpoints, in parallel, for speed.
     gda_manager: required if checkpoint contains a multiprocess array
       (GlobalDeviceArray or jax Array from pjit). Will read the arrays from the
       separate subdirectory with postfix "_gda".
@@ -1060,6 +1507,12 @@ def restore_checkpoint(
       restore, if the given checkpoint is saved with ocp.
     orbax_transforms: the Orbax transformations that will be passed into
       ``orbax_checkpointer.restore()`` call.
+    use_mmap: bool: whether to memory-map legacy Flax checkpoint files on a
+      local filesystem instead of reading them into memory. The restored
+      arrays are read-only numpy views into the file that are paged in on
+      access, which allows restoring checkpoints larger than the host memory.
+      The checkpoint file must not be modified while they are in use. Remote
+      files are read as usual.
 
   Returns:
     Restored ``target`` updated from checkpoint file, or if no step specified
@@ -1089,8 +1542,8 @@ def restore_checkpoint(
       logging.info('Found no checkpoint directory at %s', ckpt_dir)
       return target
     if io.isdir(ckpt_dir):
-      # This means the given dir is an orbax checkpoint.
-      if _is_orbax_checkpoint(ckpt_dir):
+      # This means the given dir is an orbax or sharded checkpoint.
+      if _is_orbax_checkpoint(ckpt_dir) or _is_sharded_checkpoint(ckpt_dir):
         ckpt_path = ckpt_dir
       else:
         ckpt_path = latest_checkpoint(ckpt_dir, prefix)  # type: ignore
@@ -1136,34 +1589,12 @@ def restore_checkpoint(
     return restored
 
   # Legacy Flax checkpoint restoration.
-  ckpt_size = io.getsize(ckpt_path)
-  with io.GFile(ckpt_path, 'rb') as fp:
-    if parallel and fp.seekable():
-      buf_size = 128 << 20  # 128M buffer.
-      num_bufs = ckpt_size / buf_size
-      logging.debug('num_bufs: %d', num_bufs)
-      checkpoint_contents = bytearray(ckpt_size)
-
-      def read_chunk(i):
-        # NOTE: We have to re-open the file to read each chunk, otherwise the
-        # parallelism has no effect. But we could reuse the file pointers
-        # within each thread.
-        with io.GFile(ckpt_path, 'rb') as f:
-          f.seek(i * buf_size)
-          buf = f.read(buf_size)
-          if buf:
-            checkpoint_contents[i * buf_size : i * buf_size + len(buf)] = buf
-          return len(buf) / buf_size
-
-      pool_size = 32
-      pool = thread.ThreadPoolExecutor(pool_size)
-      results = pool.map(read_chunk, range(int(num_bufs) + 1))
-      pool.shutdown(wait=False)
-      logging.debug(f'results: {list(results)}')
-    else:
-      checkpoint_contents = fp.read()
-
-  state_dict = serialization.msgpack_restore(checkpoint_contents)
+  if _is_sharded_checkpoint(ckpt_path):
+    state_dict = _read_sharded_checkpoint(ckpt_path, parallel, use_mmap)
+  elif use_mmap and not SCHEME_RE.match(ckpt_path).group('scheme'):  # type: ignore
+    state_dict = serialization.msgpack_restore_mmap(ckpt_path)
+  else:
+    state_dict = _read_msgpack_checkpoint(ckpt_path, parallel)
   state_dict = _restore_mpas(
     state_dict,
     target,
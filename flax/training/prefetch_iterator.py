@@ -14,6 +14,7 @@
 
 """Utility for constructing an iterator which prefetches data asynchronously."""
 
+import collections
 import threading
 import warnings
 
@@ -44,14 +45,14 @@ class PrefetchIterator:
     """
     warnings.warn(
       'PrefetchIterator is deprecated. Use the standard `tf.data`'
-      ' prefetch method instead',
+      ' prefetch method or `flax.jax_utils.DevicePrefetchIterator` instead',
       DeprecationWarning,
     )
 
     self._data_iter = data_iter
     self.buffer_size = buffer_size
     self._cond = threading.Condition()
-    self._buffer = []
+    self._buffer = collections.deque()
     self._active = True
     self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
     self._thread.start()
@@ -64,7 +65,7 @@ class PrefetchIterator:
     with self._cond:
       self._cond.wait_for(lambda: self._buffer or not self._active)
       if self._buffer:
-        item = self._buffer.pop(0)
+        item = self._buffer.popleft()
         self._cond.notify_all()
         return item
       if self._error:
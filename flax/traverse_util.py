@@ -115,29 +115,37 @@ def flatten_dict(xs, keep_empty_nodes=False, is_leaf=None, sep=None):
     xs, (flax.core.FrozenDict, dict)
   ), f'expected (frozen)dict; got {type(xs)}'
 
-  def _key(path):
-    if sep is None:
-      return path
-    return sep.join(path)
-
-  def _flatten(xs, prefix):
-    if not isinstance(xs, (flax.core.FrozenDict, dict)) or (
-      is_leaf and is_leaf(prefix, xs)
-    ):
-      return {_key(prefix): xs}
-    result = {}
-    is_empty = True
-    for key, value in xs.items():
-      is_empty = False
-      path = prefix + (key,)
-      result.update(_flatten(value, path))
-    if keep_empty_nodes and is_empty:
-      if prefix == ():  # when the whole input is empty
-        return {}
-      return {_key(prefix): empty_node}
-    return result
+  if is_leaf and is_leaf((), xs):
+    return {() if sep is None else '': xs}
 
-  return _flatten(xs, ())
+  dict_types = (flax.core.FrozenDict, dict)
+  result = {}
+  # iterative depth-first traversal, each stack entry holds the path of a
+  # nested dict, its sep-joined name and an iterator over its items
+  stack = [((), '', iter(xs.items()))]
+  while stack:
+    prefix, prefix_name, items = stack[-1]
+    for key, value in items:
+      path = prefix + (key,)
+      if sep is None:
+        name = path
+      elif prefix:
+        name = prefix_name + sep + key
+      else:
+        name = sep.join(path)
+      if isinstance(value, dict_types) and not (
+        is_leaf and is_leaf(path, value)
+      ):
+        if value:
+          stack.append((path, name, iter(value.items())))
+          break
+        if keep_empty_nodes:
+          result[name] = empty_node
+      else:
+        result[name] = value
+    else:
+      stack.pop()
+  return result
 
 
 def unflatten_dict(xs, sep=None):
@@ -163,17 +171,24 @@ def unflatten_dict(xs, sep=None):
   """
   assert isinstance(xs, dict), f'input is not a dict; it is a {type(xs)}'
   result = {}
+  # consecutive paths usually share their parent, e.g. the output of
+  # flatten_dict, so the last parent dict is reused when the keys match
+  parent_keys = None
+  parent = result
   for path, value in xs.items():
     if sep is not None:
       path = path.split(sep)
     if value is empty_node:
       value = {}
-    cursor = result
-    for key in path[:-1]:
-      if key not in cursor:
-        cursor[key] = {}
-      cursor = cursor[key]
-    cursor[path[-1]] = value
+    keys = path[:-1]
+    if keys != parent_keys:
+      parent = result
+      for key in keys:
+        if key not in parent:
+          parent[key] = {}
+        parent = parent[key]
+      parent_keys = keys
+    parent[path[-1]] = value
   return result
 
 
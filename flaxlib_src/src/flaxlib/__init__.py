@@ -17,3 +17,7 @@ from .flaxlib_cpp import IndexMap as IndexMap
 from .flaxlib_cpp import NodeDef as NodeDef
 from .flaxlib_cpp import VariableDef as VariableDef
 from .flaxlib_cpp import NodeRef as NodeRef
+from .flaxlib_cpp import _graph_flatten as _graph_flatten
+from .flaxlib_cpp import _graph_unflatten as _graph_unflatten
+from .flaxlib_cpp import _graph_fingerprint as _graph_fingerprint
+from .flaxlib_cpp import _check_graph_fingerprint as _check_graph_fingerprint
@@ -63,3 +63,41 @@ class NodeRef:
   @staticmethod
   def __setstate__(noderef: NodeRef, state: tuple[int]) -> None: ...
 
+
+def _graph_flatten(
+  node: tp.Any,
+  node_impl: tp.Any,
+  path: list[tp.Any] | None,
+  ref_index: RefMap,
+  ref_outer_index: RefMap | None,
+  nodes: list[tp.Any],
+  attributes: list[tuple[tp.Any, tp.Any]],
+  leaves: list[tp.Any],
+  paths: list[tuple[tp.Any, ...]] | None,
+) -> None: ...
+def _graph_unflatten(
+  nodedef: tp.Any,
+  node_impl: tp.Any,
+  node_iter: tp.Iterator[tp.Any],
+  attribute_iter: tp.Iterator[tuple[tp.Any, tp.Any]],
+  leaves_iter: tp.Iterator[tp.Any],
+  index_ref: IndexMap,
+  outer_index_outer_ref: IndexMap | None,
+  copy_variables: bool,
+) -> tp.Any: ...
+def _graph_fingerprint(
+  ctx: tp.Any,
+  append_fn: tp.Callable[[tp.Any], None],
+  node: tp.Any,
+  node_impl: tp.Any,
+  ref_index: RefMap,
+  new_ref_index: RefMap,
+) -> None: ...
+def _check_graph_fingerprint(
+  ctx: tp.Any,
+  fp_iterator: tp.Iterator[tp.Any],
+  node: tp.Any,
+  node_impl: tp.Any,
+  ref_index: RefMap,
+  new_ref_index: RefMap,
+) -> bool: ...
@@ -78,42 +78,130 @@ namespace flaxlib
   {
     nb::object nnx;
     nb::object graph;
+    nb::object variablelib;
     nb::object jax;
     nb::object np;
     nb::object jax_Array;
     nb::object np_ndarray;
+    nb::object ArrayImpl;
+    nb::object AbstractRef;
+    nb::object MutableArray;
     nb::type_object GraphNodeImpl;
     nb::type_object PytreeNodeImpl;
     nb::type_object Object;
     nb::type_object Variable;
     nb::object get_node_impl;
+    nb::object get_node_impl_for_type;
+    nb::object is_mutable_array;
+    nb::object mutable_array;
+    nb::dict GRAPH_REGISTRY;
+    nb::dict PYTREE_REGISTRY;
+    nb::dict JAX_PYTREE_REGISTRY;
+    nb::object PYTREE_NODE_IMPL;
+    nb::type_object NodeDef;
+    nb::type_object VariableDef;
+    nb::type_object NodeRef;
+    nb::type_object MutableArrayDef;
+    nb::type_object MutableArrayOutput;
+    nb::type_object HashableMapping;
+    nb::type_object Static;
+    nb::type_object NoUpdate;
+    nb::type_object Repeated;
+    nb::type_object NodeAttr;
+    nb::type_object ArrayAttr;
+    nb::type_object MutableArrayAttr;
+    nb::object NO_UPDATE;
+    nb::object REPEATED;
+    nb::object NODE_ATTR;
+    nb::object ARRAY_ATTR;
+    nb::object MUTABLE_ARRAY_ATTR;
 
     PythonContext()
     {
       nnx = nb::module_::import_("flax.nnx");
       graph = nb::module_::import_("flax.nnx.graph");
+      variablelib = nb::module_::import_("flax.nnx.variablelib");
       jax = nb::module_::import_("jax");
       np = nb::module_::import_("numpy");
       jax_Array = jax.attr("Array");
       np_ndarray = np.attr("ndarray");
+      ArrayImpl = nb::module_::import_("jax._src.array").attr("ArrayImpl");
+      AbstractRef = variablelib.attr("AbstractRef");
+      MutableArray = variablelib.attr("MutableArray");
       GraphNodeImpl = graph.attr("GraphNodeImpl");
       PytreeNodeImpl = graph.attr("PytreeNodeImpl");
       Object = nnx.attr("Object");
       Variable = graph.attr("Variable");
       get_node_impl = graph.attr("get_node_impl");
+      get_node_impl_for_type = graph.attr("get_node_impl_for_type");
+      is_mutable_array = variablelib.attr("is_mutable_array");
+      mutable_array = nb::module_::import_("jax.experimental").attr("mutable_array");
+      GRAPH_REGISTRY = nb::cast<nb::dict>(graph.attr("GRAPH_REGISTRY"));
+      PYTREE_REGISTRY = nb::cast<nb::dict>(graph.attr("PYTREE_REGISTRY"));
+      JAX_PYTREE_REGISTRY = nb::cast<nb::dict>(graph.attr("JAX_PYTREE_REGISTRY"));
+      PYTREE_NODE_IMPL = graph.attr("PYTREE_NODE_IMPL");
+      NodeDef = graph.attr("NodeDef");
+      VariableDef = graph.attr("VariableDef");
+      NodeRef = graph.attr("NodeRef");
+      MutableArrayDef = graph.attr("MutableArrayDef");
+      MutableArrayOutput = graph.attr("MutableArrayOutput");
+      HashableMapping = graph.attr("HashableMapping");
+      Static = graph.attr("Static");
+      NoUpdate = graph.attr("NoUpdate");
+      Repeated = graph.attr("Repeated");
+      NodeAttr = graph.attr("NodeAttr");
+      ArrayAttr = graph.attr("ArrayAttr");
+      MutableArrayAttr = graph.attr("MutableArrayAttr");
+      NO_UPDATE = graph.attr("NO_UPDATE");
+      REPEATED = graph.attr("REPEATED");
+      NODE_ATTR = graph.attr("NODE_ATTR");
+      ARRAY_ATTR = graph.attr("ARRAY_ATTR");
+      MUTABLE_ARRAY_ATTR = graph.attr("MUTABLE_ARRAY_ATTR");
     }
 
     ~PythonContext()
     {
+      // the interpreter may already be finalized when the context is
+      // destroyed, release all references without decrementing them
+      nnx.release();
       graph.release();
+      variablelib.release();
       jax.release();
       np.release();
       jax_Array.release();
       np_ndarray.release();
+      ArrayImpl.release();
+      AbstractRef.release();
+      MutableArray.release();
       GraphNodeImpl.release();
       PytreeNodeImpl.release();
+      Object.release();
       Variable.release();
       get_node_impl.release();
+      get_node_impl_for_type.release();
+      is_mutable_array.release();
+      mutable_array.release();
+      GRAPH_REGISTRY.release();
+      PYTREE_REGISTRY.release();
+      JAX_PYTREE_REGISTRY.release();
+      PYTREE_NODE_IMPL.release();
+      NodeDef.release();
+      VariableDef.release();
+      NodeRef.release();
+      MutableArrayDef.release();
+      MutableArrayOutput.release();
+      HashableMapping.release();
+      Static.release();
+      NoUpdate.release();
+      Repeated.release();
+      NodeAttr.release();
+      ArrayAttr.release();
+      MutableArrayAttr.release();
+      NO_UPDATE.release();
+      REPEATED.release();
+      NODE_ATTR.release();
+      ARRAY_ATTR.release();
+      MUTABLE_ARRAY_ATTR.release();
     }
   };
 
@@ -412,6 +500,843 @@ namespace flaxlib
     }
   };
 
+  //---------------------------------------------------------------
+  // graph helpers
+  //---------------------------------------------------------------
+
+  static inline nb::handle type_of(const nb::handle &obj)
+  {
+    return nb::handle((PyObject *)Py_TYPE(obj.ptr()));
+  }
+
+  static inline bool is_type(const nb::handle &obj, const nb::handle &type)
+  {
+    return type_of(obj).is(type);
+  }
+
+  static inline bool is_instance(const nb::handle &obj, const nb::handle &type)
+  {
+    int result = PyObject_IsInstance(obj.ptr(), type.ptr());
+    if (result < 0)
+    {
+      nb::raise_python_error();
+    }
+    return result == 1;
+  }
+
+  static inline nb::object py_id(const nb::handle &obj)
+  {
+    return nb::steal(PyLong_FromVoidPtr(obj.ptr()));
+  }
+
+  static inline nb::object optional_index(std::optional<int> index)
+  {
+    return index ? nb::cast(*index) : nb::none();
+  }
+
+  static inline nb::object next_item(const nb::handle &iterator)
+  {
+    PyObject *item = PyIter_Next(iterator.ptr());
+    if (item == nullptr)
+    {
+      if (PyErr_Occurred())
+      {
+        nb::raise_python_error();
+      }
+      throw nb::stop_iteration();
+    }
+    return nb::steal(item);
+  }
+
+  static inline bool is_mutable_array(PythonContext &ctx, const nb::handle &x)
+  {
+    // concrete arrays are never mutable, this avoids calling jax.typeof
+    // on every array leaf which is the common case outside of transforms
+    if (is_type(x, ctx.ArrayImpl))
+    {
+      return false;
+    }
+    if (!is_instance(x, ctx.jax_Array) && !is_instance(x, ctx.AbstractRef) && !is_instance(x, ctx.MutableArray))
+    {
+      return false;
+    }
+    return nb::cast<bool>(ctx.is_mutable_array(x));
+  }
+
+  static inline bool is_array(PythonContext &ctx, const nb::handle &x)
+  {
+    return is_instance(x, ctx.jax_Array) || is_instance(x, ctx.np_ndarray);
+  }
+
+  // mirrors graph.get_node_impl
+  static nb::object get_node_impl(PythonContext &ctx, const nb::handle &x)
+  {
+    if (is_instance(x, ctx.Variable))
+    {
+      return nb::none();
+    }
+    nb::handle node_type = type_of(x);
+    PyObject *node_impl = PyDict_GetItem(ctx.GRAPH_REGISTRY.ptr(), node_type.ptr());
+    if (node_impl != nullptr)
+    {
+      return nb::borrow(node_impl);
+    }
+    node_impl = PyDict_GetItem(ctx.PYTREE_REGISTRY.ptr(), node_type.ptr());
+    if (node_impl != nullptr)
+    {
+      return nb::borrow(node_impl);
+    }
+    if (PyDict_Contains(ctx.JAX_PYTREE_REGISTRY.ptr(), node_type.ptr()) == 1 || PyTuple_Check(x.ptr()))
+    {
+      return ctx.PYTREE_NODE_IMPL;
+    }
+    return nb::none();
+  }
+
+  static std::optional<int> refmap_get(const RefMap *refmap, const nb::handle &key)
+  {
+    if (refmap == nullptr)
+    {
+      return std::nullopt;
+    }
+    auto it = refmap->mapping.find(reinterpret_cast<intptr_t>(key.ptr()));
+    if (it == refmap->mapping.end())
+    {
+      return std::nullopt;
+    }
+    return std::get<1>(it->second);
+  }
+
+  static void refmap_set(RefMap &refmap, const nb::handle &key, int value)
+  {
+    refmap.mapping[reinterpret_cast<intptr_t>(key.ptr())] = std::make_tuple(nb::borrow(key), value);
+  }
+
+  //---------------------------------------------------------------
+  // graph_flatten
+  //---------------------------------------------------------------
+
+  struct GraphFlattenContext
+  {
+    PythonContext &ctx;
+    RefMap &ref_index;
+    RefMap *ref_outer_index;
+    nb::list &nodes;
+    nb::list &attributes;
+    nb::list &leaves;
+    nb::list *paths;
+    std::vector<nb::object> path;
+
+    void append_leaf(const nb::handle &leaf)
+    {
+      leaves.append(leaf);
+      if (paths != nullptr)
+      {
+        paths->append(vector_to_tuple(path));
+      }
+    }
+
+    std::tuple<nb::object, nb::object> make_mutable_arraydef(const nb::handle &value)
+    {
+      if (auto index = refmap_get(&ref_index, value))
+      {
+        return {ctx.NodeRef(*index), ctx.REPEATED};
+      }
+      int index = ref_index.mapping.size();
+      refmap_set(ref_index, value, index);
+      nb::object output_value;
+      nb::object mutable_arraydef;
+      if (ref_outer_index != nullptr)
+      {
+        if (auto outer_index = refmap_get(ref_outer_index, value))
+        {
+          output_value = ctx.NO_UPDATE;
+          mutable_arraydef = ctx.MutableArrayDef(index, *outer_index);
+        }
+        else
+        {
+          output_value = ctx.MutableArrayOutput(nb::object(value[nb::ellipsis()]));
+          mutable_arraydef = ctx.MutableArrayDef(index, nb::none());
+        }
+      }
+      else
+      {
+        output_value = nb::borrow(value);
+        mutable_arraydef = ctx.MutableArrayDef(index, nb::none());
+      }
+      return {mutable_arraydef, output_value};
+    }
+
+    void flatten(const nb::handle &node, const nb::handle &node_impl)
+    {
+      bool is_pytree_node = is_type(node_impl, ctx.PytreeNodeImpl);
+
+      if (!is_pytree_node)
+      {
+        if (auto index = refmap_get(&ref_index, node))
+        {
+          nodes.append(ctx.NodeRef(*index));
+          return;
+        }
+      }
+
+      bool is_graph_node = is_type(node_impl, ctx.GraphNodeImpl);
+      bool is_variable = is_instance(node, ctx.Variable);
+
+      // only cache graph nodes, we don't add mutable arrays here
+      // as they are added in make_mutable_arraydef
+      std::optional<int> index;
+      if (is_graph_node || is_variable)
+      {
+        index = ref_index.mapping.size();
+        refmap_set(ref_index, node, *index);
+      }
+
+      if (is_variable)
+      {
+        nb::object prev_inner_value = node.attr("raw_value");
+        nb::object mutable_arraydef = nb::none();
+        nb::object inner_value = prev_inner_value;
+        if (is_mutable_array(ctx, prev_inner_value))
+        {
+          std::tie(mutable_arraydef, inner_value) = make_mutable_arraydef(prev_inner_value);
+        }
+        nb::object leaf;
+        if (paths == nullptr)
+        {
+          leaf = inner_value;
+        }
+        else
+        {
+          leaf = nb::borrow(node);
+          if (!inner_value.is(prev_inner_value))
+          {
+            nb::setattr(leaf, "raw_value", inner_value);
+          }
+        }
+        nb::object variabledef = ctx.VariableDef(
+            type_of(node),
+            *index,
+            optional_index(refmap_get(ref_outer_index, node)),
+            ctx.HashableMapping(node.attr("_var_metadata")),
+            mutable_arraydef);
+        if (!is_type(inner_value, ctx.Repeated))
+        {
+          append_leaf(leaf);
+        }
+        nodes.append(variabledef);
+        return;
+      }
+      else if (!is_pytree_node && !is_graph_node)
+      {
+        if (is_mutable_array(ctx, node))
+        {
+          auto [mutable_arraydef, leaf] = make_mutable_arraydef(node);
+          if (!is_type(leaf, ctx.Repeated))
+          {
+            append_leaf(leaf);
+          }
+          nodes.append(mutable_arraydef);
+          return;
+        }
+        // unkown leaf
+        append_leaf(node);
+        return;
+      }
+
+      nb::tuple values_metadata = nb::cast<nb::tuple>(node_impl.attr("flatten")(node));
+      nb::object values = values_metadata[0];
+      nb::object metadata = values_metadata[1];
+      size_t num_attributes = nb::len(values);
+      nb::object outer_index = is_graph_node ? optional_index(refmap_get(ref_outer_index, node)) : nb::none();
+      nodes.append(ctx.NodeDef(node_impl.attr("type"), optional_index(index), outer_index, num_attributes, metadata));
+
+      for (nb::handle key_value : values)
+      {
+        nb::object key = key_value[0];
+        nb::object value = key_value[1];
+        nb::object value_node_impl = get_node_impl(ctx, value);
+        if (paths != nullptr)
+        {
+          path.push_back(key);
+        }
+        if (!value_node_impl.is_none() || is_instance(value, ctx.Variable))
+        {
+          attributes.append(nb::make_tuple(key, ctx.NODE_ATTR));
+          flatten(value, value_node_impl);
+        }
+        else if (is_mutable_array(ctx, value))
+        {
+          attributes.append(nb::make_tuple(key, ctx.MUTABLE_ARRAY_ATTR));
+          auto [mutable_arraydef, leaf] = make_mutable_arraydef(value);
+          if (!is_type(leaf, ctx.Repeated))
+          {
+            append_leaf(leaf);
+          }
+          nodes.append(mutable_arraydef);
+        }
+        else if (is_array(ctx, value))
+        {
+          attributes.append(nb::make_tuple(key, ctx.ARRAY_ATTR));
+          append_leaf(value);
+        }
+        else
+        {
+          attributes.append(nb::make_tuple(key, ctx.Static(value)));
+        }
+        if (paths != nullptr)
+        {
+          path.pop_back();
+        }
+      }
+    }
+  };
+
+  static void graph_flatten(
+      const nb::object &node,
+      const nb::object &node_impl,
+      const nb::object &path,
+      RefMap &ref_index,
+      RefMap *ref_outer_index,
+      nb::list &nodes,
+      nb::list &attributes,
+      nb::list &leaves,
+      std::optional<nb::list> paths)
+  {
+    GraphFlattenContext flatten_ctx{
+        get_python_context(),
+        ref_index,
+        ref_outer_index,
+        nodes,
+        attributes,
+        leaves,
+        paths ? &*paths : nullptr,
+        {}};
+    if (!path.is_none())
+    {
+      for (nb::handle key : path)
+      {
+        flatten_ctx.path.push_back(nb::borrow(key));
+      }
+    }
+    flatten_ctx.flatten(node, node_impl);
+  }
+
+  //---------------------------------------------------------------
+  // graph_fingerprint
+  //---------------------------------------------------------------
+
+  struct GraphFingerprintContext
+  {
+    PythonContext &ctx;
+    int next_index;
+    RefMap &ref_index;
+    RefMap &new_ref_index;
+
+    std::optional<int> get_index(const nb::handle &node)
+    {
+      if (auto index = refmap_get(&ref_index, node))
+      {
+        return index;
+      }
+      return refmap_get(&new_ref_index, node);
+    }
+
+    void fingerprint(const nb::object &append_fn, const nb::handle &node, const nb::handle &node_impl)
+    {
+      bool is_graph_node = is_type(node_impl, ctx.GraphNodeImpl);
+
+      append_fn(type_of(node));
+
+      int index;
+      if (is_graph_node)
+      {
+        append_fn(py_id(node));
+        if (auto prev_index = get_index(node))
+        {
+          append_fn(*prev_index);
+          return;
+        }
+        index = next_index++;
+        refmap_set(new_ref_index, node, index);
+      }
+      else
+      {
+        index = -1;
+      }
+
+      nb::tuple values_metadata = nb::cast<nb::tuple>(node_impl.attr("flatten")(node));
+      nb::object values = values_metadata[0];
+      append_fn(index);
+      append_fn(values_metadata[1]);
+
+      for (nb::handle key_value : values)
+      {
+        nb::object key = key_value[0];
+        nb::object value = key_value[1];
+        nb::object value_node_impl = get_node_impl(ctx, value);
+        append_fn(key);
+        if (!value_node_impl.is_none())
+        {
+          fingerprint(append_fn, value, value_node_impl);
+        }
+        else if (is_instance(value, ctx.Variable))
+        {
+          append_fn(py_id(value));
+          append_fn(type_of(value));
+          if (auto prev_index = get_index(value))
+          {
+            append_fn(*prev_index);
+          }
+          else
+          {
+            int variable_index = next_index++;
+            refmap_set(new_ref_index, value, variable_index);
+            append_fn(variable_index);
+            for (nb::handle metadata_item : value.attr("_var_metadata").attr("items")())
+            {
+              append_fn(metadata_item);
+            }
+          }
+        }
+        else if (!is_array(ctx, value))
+        {
+          append_fn(value);
+        }
+      }
+    }
+
+    bool check(const nb::handle &fp_iterator, const nb::handle &node, const nb::handle &node_impl)
+    {
+      bool is_graph_node = is_type(node_impl, ctx.GraphNodeImpl);
+
+      if (type_of(node).not_equal(next_item(fp_iterator)))
+      {
+        return false;
+      }
+
+      int index;
+      if (is_graph_node)
+      {
+        if (py_id(node).not_equal(next_item(fp_iterator)))
+        {
+          return false;
+        }
+        if (auto prev_index = get_index(node))
+        {
+          return nb::cast(*prev_index).equal(next_item(fp_iterator));
+        }
+        index = next_index++;
+        refmap_set(new_ref_index, node, index);
+      }
+      else
+      {
+        index = -1;
+      }
+
+      nb::tuple values_metadata = nb::cast<nb::tuple>(node_impl.attr("flatten")(node));
+
+      if (nb::cast(index).not_equal(next_item(fp_iterator)))
+      {
+        return false;
+      }
+      nb::object values = values_metadata[0];
+      nb::object metadata = values_metadata[1];
+      if (metadata.not_equal(next_item(fp_iterator)))
+      {
+        return false;
+      }
+
+      for (nb::handle key_value : values)
+      {
+        nb::object key = key_value[0];
+        nb::object value = key_value[1];
+        nb::object value_node_impl = get_node_impl(ctx, value);
+        if (key.not_equal(next_item(fp_iterator)))
+        {
+          return false;
+        }
+        if (!value_node_impl.is_none())
+        {
+          if (!check(fp_iterator, value, value_node_impl))
+          {
+            return false;
+          }
+        }
+        else if (is_instance(value, ctx.Variable))
+        {
+          if (py_id(value).not_equal(next_item(fp_iterator)))
+          {
+            return false;
+          }
+          if (type_of(value).not_equal(next_item(fp_iterator)))
+          {
+            return false;
+          }
+          if (auto prev_index = get_index(value))
+          {
+            if (nb::cast(*prev_index).not_equal(next_item(fp_iterator)))
+            {
+              return false;
+            }
+          }
+          else
+          {
+            int variable_index = next_index++;
+            refmap_set(new_ref_index, value, variable_index);
+            if (nb::cast(variable_index).not_equal(next_item(fp_iterator)))
+            {
+              return false;
+            }
+            for (nb::handle metadata_item : value.attr("_var_metadata").attr("items")())
+            {
+              if (metadata_item.not_equal(next_item(fp_iterator)))
+              {
+                return false;
+              }
+            }
+          }
+        }
+        else
+        {
+          if (is_array(ctx, value))
+          {
+            throw nb::value_error(
+                nb::str("Arrays leaves are not supported: {}").format(value).c_str());
+          }
+          if (value.not_equal(next_item(fp_iterator)))
+          {
+            return false;
+          }
+        }
+      }
+
+      return true;
+    }
+  };
+
+  static void graph_fingerprint(
+      const nb::object &fp_ctx,
+      const nb::object &append_fn,
+      const nb::object &node,
+      const nb::object &node_impl,
+      RefMap &ref_index,
+      RefMap &new_ref_index)
+  {
+    GraphFingerprintContext fingerprint_ctx{
+        get_python_context(),
+        nb::cast<int>(fp_ctx.attr("next_index")),
+        ref_index,
+        new_ref_index};
+    fingerprint_ctx.fingerprint(append_fn, node, node_impl);
+    nb::setattr(fp_ctx, "next_index", nb::cast(fingerprint_ctx.next_index));
+  }
+
+  static bool check_graph_fingerprint(
+      const nb::object &fp_ctx,
+      const nb::object &fp_iterator,
+      const nb::object &node,
+      const nb::object &node_impl,
+      RefMap &ref_index,
+      RefMap &new_ref_index)
+  {
+    GraphFingerprintContext fingerprint_ctx{
+        get_python_context(),
+        nb::cast<int>(fp_ctx.attr("next_index")),
+        ref_index,
+        new_ref_index};
+    bool fp_matches = fingerprint_ctx.check(fp_iterator, node, node_impl);
+    nb::setattr(fp_ctx, "next_index", nb::cast(fingerprint_ctx.next_index));
+    return fp_matches;
+  }
+
+  //---------------------------------------------------------------
+  // graph_unflatten
+  //---------------------------------------------------------------
+
+  struct GraphUnflattenContext
+  {
+    PythonContext &ctx;
+    nb::handle node_iter;
+    nb::handle attribute_iter;
+    nb::handle leaves_iter;
+    IndexMap &index_ref;
+    IndexMap *outer_index_outer_ref;
+    bool copy_variables;
+
+    nb::object lookup_outer(const nb::handle &outer_index)
+    {
+      if (outer_index_outer_ref == nullptr || outer_index.is_none())
+      {
+        return nb::object();
+      }
+      auto it = outer_index_outer_ref->find(nb::cast<int>(outer_index));
+      if (it == outer_index_outer_ref->end())
+      {
+        return nb::object();
+      }
+      return it->second;
+    }
+
+    nb::object get_index_ref(const nb::handle &index)
+    {
+      auto it = index_ref.find(nb::cast<int>(index));
+      if (it == index_ref.end())
+      {
+        throw nb::key_error(nb::str(index).c_str());
+      }
+      return it->second;
+    }
+
+    nb::object get_mutable_array(const nb::handle &mutable_arraydef, const nb::object &leaf)
+    {
+      nb::object mutable_array;
+      nb::object outer_mutable_array = lookup_outer(mutable_arraydef.attr("outer_index"));
+      if (outer_mutable_array.is_valid())
+      {
+        // if mutable array exists, update it
+        mutable_array = outer_mutable_array;
+        if (!is_mutable_array(ctx, mutable_array))
+        {
+          throw std::runtime_error(
+              nb::str("Expected a MutableArray type but got {}.").format(mutable_array).c_str());
+        }
+        if (!is_type(leaf, ctx.NoUpdate))
+        {
+          throw std::runtime_error(
+              nb::str("Expected a no update for MutableArray but got {}.").format(leaf).c_str());
+        }
+      }
+      else if (is_type(leaf, ctx.NoUpdate) || is_type(leaf, ctx.Repeated))
+      {
+        throw nb::value_error(
+            nb::str("Expected a MutableArrayOutput type but got '{}.'").format(leaf).c_str());
+      }
+      else if (is_type(leaf, ctx.MutableArrayOutput))
+      {
+        mutable_array = ctx.mutable_array(leaf.attr("value"));
+      }
+      else
+      {
+        // leaf is either a mutable array or a frozen array, we allow
+        // merging frozen arrays and will not create a new mutable array
+        mutable_array = leaf;
+      }
+      index_ref[nb::cast<int>(mutable_arraydef.attr("index"))] = mutable_array;
+      return mutable_array;
+    }
+
+    nb::object unflatten_variable(const nb::handle &variabledef)
+    {
+      nb::object mutable_arraydef = variabledef.attr("mutable_arraydef");
+      nb::object value;
+      if (!mutable_arraydef.is_none())
+      {
+        if (is_type(mutable_arraydef, ctx.NodeRef))
+        {
+          value = get_index_ref(mutable_arraydef.attr("index"));
+        }
+        else
+        {
+          value = next_item(leaves_iter);
+          if (is_instance(value, ctx.Variable))
+          {
+            if (copy_variables)
+            {
+              value = value.attr("copy")();
+            }
+            nb::object inner_value = value.attr("raw_value");
+            nb::object mutable_array = get_mutable_array(mutable_arraydef, inner_value);
+            if (!mutable_array.is(inner_value))
+            {
+              nb::setattr(value, "raw_value", mutable_array);
+            }
+          }
+          else
+          {
+            // if value is an array or mutable array, we need call get_mutable_array
+            // to register it in the index_ref
+            value = get_mutable_array(mutable_arraydef, value);
+          }
+        }
+      }
+      else
+      {
+        value = next_item(leaves_iter);
+        if (copy_variables && is_instance(value, ctx.Variable))
+        {
+          value = value.attr("copy")();
+        }
+      }
+
+      // when idxmap is present, check if the Varable exists there
+      // and update existing variables if it does
+      nb::object variable = lookup_outer(variabledef.attr("outer_index"));
+      if (variable.is_valid())
+      {
+        if (!is_instance(variable, ctx.Variable))
+        {
+          throw nb::value_error(
+              nb::str("Expected a Variable type but got {}.").format(type_of(variable)).c_str());
+        }
+        else if (is_instance(value, ctx.Variable))
+        {
+          variable.attr("update_from_state")(value);
+        }
+        else
+        {
+          nb::setattr(variable, "raw_value", value);
+        }
+      }
+      else if (is_instance(value, ctx.Variable))
+      {
+        variable = value;
+      }
+      else
+      {
+        variable = variabledef.attr("type").attr("from_metadata")(
+            value, type_of(nb::dict())(variabledef.attr("metadata")));
+      }
+      index_ref[nb::cast<int>(variabledef.attr("index"))] = variable;
+      return variable;
+    }
+
+    nb::list get_children(const nb::handle &nodedef)
+    {
+      nb::list children;
+      int num_attributes = nb::cast<int>(nodedef.attr("num_attributes"));
+      for (int i = 0; i < num_attributes; ++i)
+      {
+        nb::object key_value = next_item(attribute_iter);
+        nb::object key = key_value[0];
+        nb::object value = key_value[1];
+        if (is_type(value, ctx.Static))
+        {
+          children.append(nb::make_tuple(key, value.attr("value")));
+        }
+        else if (is_type(value, ctx.MutableArrayAttr))
+        {
+          nb::object mutable_arraydef = next_item(node_iter);
+          nb::object mutable_array;
+          if (is_type(mutable_arraydef, ctx.NodeRef))
+          {
+            mutable_array = get_index_ref(mutable_arraydef.attr("index"));
+          }
+          else
+          {
+            mutable_array = get_mutable_array(mutable_arraydef, next_item(leaves_iter));
+          }
+          children.append(nb::make_tuple(key, mutable_array));
+        }
+        else if (is_type(value, ctx.ArrayAttr))
+        {
+          children.append(nb::make_tuple(key, next_item(leaves_iter)));
+        }
+        else if (is_type(value, ctx.NodeRef))
+        {
+          children.append(nb::make_tuple(key, get_index_ref(value.attr("index"))));
+        }
+        else if (is_type(value, ctx.NodeAttr))
+        {
+          // if the key is a subgraph we create an empty node
+          nb::object subgraphdef = next_item(node_iter);
+          nb::object value_node_impl = is_type(subgraphdef, ctx.NodeDef)
+                                           ? ctx.get_node_impl_for_type(subgraphdef.attr("type"))
+                                           : nb::none();
+          children.append(nb::make_tuple(key, unflatten(subgraphdef, value_node_impl)));
+        }
+        else
+        {
+          throw std::runtime_error(
+              nb::str("Unknown static field: {!r}").format(key).c_str());
+        }
+      }
+      return children;
+    }
+
+    nb::object unflatten(const nb::handle &nodedef, const nb::handle &node_impl)
+    {
+      if (is_type(nodedef, ctx.NodeRef))
+      {
+        return get_index_ref(nodedef.attr("index"));
+      }
+      if (is_type(nodedef, ctx.VariableDef))
+      {
+        return unflatten_variable(nodedef);
+      }
+      if (is_type(nodedef, ctx.MutableArrayDef))
+      {
+        return get_mutable_array(nodedef, next_item(leaves_iter));
+      }
+
+      if (node_impl.is_none())
+      {
+        throw std::runtime_error(
+            nb::str("Unsupported type: {}, this is a bug.").format(nodedef.attr("type")).c_str());
+      }
+      nb::object index = nodedef.attr("index");
+      if (!index.is_none() && index_ref.count(nb::cast<int>(index)) > 0)
+      {
+        throw std::runtime_error(
+            nb::str("GraphDef index {} already used.").format(index).c_str());
+      }
+
+      nb::object node;
+      if (is_instance(node_impl, ctx.GraphNodeImpl))
+      {
+        // we create an empty node first and add it to the index
+        // this avoids infinite recursion when there is a reference cycle
+        nb::object outer_node = lookup_outer(nodedef.attr("outer_index"));
+        if (outer_node.is_valid())
+        {
+          node = outer_node;
+          if (type_of(node).not_equal(nodedef.attr("type")))
+          {
+            throw nb::value_error(
+                nb::str("Expected a node of type {} for index {}, but got a node of type {}.")
+                    .format(nodedef.attr("type"), index, type_of(node))
+                    .c_str());
+          }
+          node_impl.attr("clear")(node);
+        }
+        else
+        {
+          node = node_impl.attr("create_empty")(nodedef.attr("metadata"));
+        }
+        index_ref[nb::cast<int>(index)] = node;
+        node_impl.attr("init")(node, get_children(nodedef));
+      }
+      else
+      {
+        // if the node type does not support the creation of an empty object it means
+        // that it cannot reference itself, so we can create its children first
+        node = node_impl.attr("unflatten")(get_children(nodedef), nodedef.attr("metadata"));
+      }
+      return node;
+    }
+  };
+
+  static nb::object graph_unflatten(
+      const nb::object &nodedef,
+      const nb::object &node_impl,
+      const nb::object &node_iter,
+      const nb::object &attribute_iter,
+      const nb::object &leaves_iter,
+      IndexMap &index_ref,
+      IndexMap *outer_index_outer_ref,
+      bool copy_variables)
+  {
+    GraphUnflattenContext unflatten_ctx{
+        get_python_context(),
+        node_iter,
+        attribute_iter,
+        leaves_iter,
+        index_ref,
+        outer_index_outer_ref,
+        copy_variables};
+    return unflatten_ctx.unflatten(nodedef, node_impl);
+  }
+
   NB_MODULE(flaxlib_cpp, m)
   {
     nb::bind_map<IndexMap>(m, "IndexMap")
@@ -483,5 +1408,20 @@ namespace flaxlib
         .def("__hash__", &flaxlib::NodeRef::__hash__)
         .def("__getstate__", &flaxlib::NodeRef::__getstate__)
         .def("__setstate__", &flaxlib::NodeRef::__setstate__);
+
+    m.def("_graph_flatten", &flaxlib::graph_flatten,
+          nb::arg("node").none(), nb::arg("node_impl").none(), nb::arg("path").none(),
+          nb::arg("ref_index"), nb::arg("ref_outer_index").none(), nb::arg("nodes"),
+          nb::arg("attributes"), nb::arg("leaves"), nb::arg("paths").none());
+    m.def("_graph_fingerprint", &flaxlib::graph_fingerprint,
+          nb::arg("ctx"), nb::arg("append_fn"), nb::arg("node").none(), nb::arg("node_impl"),
+          nb::arg("ref_index"), nb::arg("new_ref_index"));
+    m.def("_check_graph_fingerprint", &flaxlib::check_graph_fingerprint,
+          nb::arg("ctx"), nb::arg("fp_iterator"), nb::arg("node").none(), nb::arg("node_impl"),
+          nb::arg("ref_index"), nb::arg("new_ref_index"));
+    m.def("_graph_unflatten", &flaxlib::graph_unflatten,
+          nb::arg("nodedef"), nb::arg("node_impl").none(), nb::arg("node_iter"),
+          nb::arg("attribute_iter"), nb::arg("leaves_iter"), nb::arg("index_ref"),
+          nb::arg("outer_index_outer_ref").none(), nb::arg("copy_variables"));
   }
 } // namespace flaxlib
\ No newline at end of file
@@ -18,6 +18,7 @@ import copy
 import os
 import pathlib
 from typing import Any
+from unittest import mock
 
 import jax
 import numpy as np
@@ -25,7 +26,7 @@ import orbax.checkpoint as orbax
 from absl.testing import absltest, parameterized
 from jax import numpy as jnp
 
-from flax import config, core, errors, io, struct
+from flax import config, core, errors, io, serialization, struct
 from flax import linen as nn
 from flax.training import checkpoints
 
@@ -321,6 +322,166 @@ class CheckpointsTest(parameterized.TestCase):
       new_object = checkpoints.restore_checkpoint(tmp_dir, target=test_object1)
       check_eq(new_object, test_object1)
 
+  def test_save_restore_checkpoints_mmap(self):
+    config.update('flax_use_orbax_checkpointing', False)
+    tmp_dir = self.create_tempdir().full_path
+    test_object0 = {
+      'a': np.array([0, 0, 0], np.int32),
+      'b': {'c': np.arange(12, dtype=np.float32).reshape(3, 4), 'd': 1.5},
+    }
+    test_object1 = {
+      'a': np.array([1, 1, 1], np.int32),
+      'b': {'c': np.ones((3, 4), np.float32), 'd': 2.5},
+    }
+    checkpoints.save_checkpoint(tmp_dir, test_object1, 0)
+    new_object = checkpoints.restore_checkpoint(
+      tmp_dir, target=test_object0, use_mmap=True
+    )
+    check_eq(new_object, test_object1)
+    # arrays are read-only views into the checkpoint file
+    self.assertFalse(new_object['b']['c'].flags.writeable)
+    self.assertIsNotNone(new_object['b']['c'].base)
+
+  @parameterized.parameters({'use_mmap': True}, {'use_mmap': False})
+  def test_save_restore_checkpoints_sharded(self, use_mmap):
+    config.update('flax_use_orbax_checkpointing', False)
+    tmp_dir = self.create_tempdir().full_path
+    test_object0 = {
+      'a': np.zeros((8, 8), np.float32),
+      'b': {'c': np.zeros((2,), np.int32), 'd': 0, 'e': np.zeros((4, 4))},
+    }
+    test_object1 = {
+      'a': np.ones((8, 8), np.float32),
+      'b': {'c': np.array([1, 2], np.int32), 'd': 3, 'e': np.ones((4, 4))},
+    }
+    checkpoints.save_checkpoint(tmp_dir, test_object0, 0, keep=1, num_shards=2)
+    ckpt_path = checkpoints.save_checkpoint(
+      tmp_dir, test_object1, 1, keep=1, num_shards=2, num_threads=4
+    )
+    self.assertEqual(os.listdir(tmp_dir), ['checkpoint_1'])
+    self.assertCountEqual(
+      os.listdir(ckpt_path),
+      [
+        checkpoints.SHARDED_INDEX_FILENAME,
+        'shard_00000_of_00002.msgpack',
+        'shard_00001_of_00002.msgpack',
+      ],
+    )
+    # the largest leaf gets its own shard
+    shard = serialization.msgpack_restore(
+      pathlib.Path(ckpt_path, 'shard_00000_of_00002.msgpack').read_bytes()
+    )
+    self.assertLen(shard, 1)
+
+    new_object = checkpoints.restore_checkpoint(
+      tmp_dir, target=test_object0, use_mmap=use_mmap
+    )
+    check_eq(new_object, test_object1)
+    new_object = checkpoints.restore_checkpoint(
+      ckpt_path, target=None, parallel=False
+    )
+    check_eq(new_object, test_object1)
+
+  def test_save_restore_checkpoints_sharded_sequences(self):
+    config.update('flax_use_orbax_checkpointing', False)
+    tmp_dir = self.create_tempdir().full_path
+
+    class Stack:
+
+      def __init__(self, layers):
+        self.layers = layers
+
+    # a custom state dict keeps sequences of arrays as is
+    serialization.register_serialization_state(
+      Stack,
+      lambda stack: {'layers': stack.layers},
+      lambda stack, state: Stack(state['layers']),
+    )
+    layers = [np.full((4,), i, np.float32) for i in range(3)]
+    test_object = {'stack': Stack(layers), 'pair': Stack((layers[0], 1))}
+    checkpoints.save_checkpoint(tmp_dir, test_object, 0, num_shards=2)
+
+    new_object = checkpoints.restore_checkpoint(tmp_dir, target=None)
+    check_eq(new_object['stack']['layers'], layers)
+    check_eq(new_object['pair']['layers'], [layers[0], 1])
+  def test_sharded_checkpoints_orbax(self):
+    config.update('flax_use_orbax_checkpointing', True)
+    tmp_dir = self.create_tempdir().full_path
+    with self.assertRaisesRegex(ValueError, '`num_shards` is not supported'):
+      checkpoints.save_checkpoint(
+        tmp_dir, {'a': np.zeros((2,))}, 0, num_shards=2
+      )
+    self.assertEmpty(os.listdir(tmp_dir))
+
+  def test_save_restore_delta_checkpoints(self):
+    config.update('flax_use_orbax_checkpointing', False)
+    tmp_dir = self.create_tempdir().full_path
+    frozen = jnp.ones((16, 16))
+    for step in range(4):
+      test_object = {
+        'frozen': frozen,
+        'trained': jnp.full((4,), step, jnp.float32),
+        'count': step,
+      }
+      ckpt_path = checkpoints.save_checkpoint(
+        tmp_dir, test_object, step, keep=2, delta=True
+      )
+      new_object = checkpoints.restore_checkpoint(tmp_dir, target=None)
+      check_eq(new_object, test_object)
+
+    # only the changed leaf is written, the frozen one is read from the first
+    # checkpoint which is kept while it is referenced.
+    index = checkpoints._read_sharded_index(ckpt_path)
+    self.assertEqual(
+      [entry['checkpoint'] for entry in index['leaves'].values()],
+      ['checkpoint_0', ''],
+    )
+    self.assertEqual(
+      sorted(os.listdir(tmp_dir)),
+      ['checkpoint_0', 'checkpoint_2', 'checkpoint_3'],
+    )
+
+    # once no kept checkpoint references it anymore, it is removed.
+    frozen = jnp.zeros((16, 16))
+    for step in range(4, 6):
+      test_object = {'frozen': frozen, 'trained': jnp.zeros((4,)), 'count': 0}
+      checkpoints.save_checkpoint(
+        tmp_dir, test_object, step, keep=2, delta=True
+      )
+    self.assertEqual(
+      sorted(os.listdir(tmp_dir)), ['checkpoint_4', 'checkpoint_5']
+    )
+    new_object = checkpoints.restore_checkpoint(tmp_dir, target=None)
+    check_eq(new_object, test_object)
+
+  def test_async_delta_checkpoints_copy_changed_leaves(self):
+    config.update('flax_use_orbax_checkpointing', False)
+    tmp_dir = self.create_tempdir().full_path
+    frozen = jnp.ones((16, 16))
+    am = checkpoints.AsyncManager()
+    with mock.patch.object(
+      checkpoints, '_copy_to_host', wraps=checkpoints._copy_to_host
+    ) as copy_to_host:
+      for step in range(2):
+        test_object = {'frozen': frozen, 'trained': jnp.full((4,), step)}
+        checkpoints.save_checkpoint(
+          tmp_dir, test_object, step, delta=True, async_manager=am
+        )
+        am.wait_previous_save()
+    # the unchanged leaf is only copied for the first checkpoint
+    copied = [call.args[0] for call in copy_to_host.call_args_list]
+    self.assertLen(copied, 3)
+    self.assertEqual([x.shape for x in copied], [(16, 16), (4,), (4,)])
+    new_object = checkpoints.restore_checkpoint(tmp_dir, target=None)
+    check_eq(new_object, test_object)
+
+  def test_delta_checkpoints_orbax(self):
+    config.update('flax_use_orbax_checkpointing', True)
+    tmp_dir = self.create_tempdir().full_path
+    with self.assertRaisesRegex(ValueError, '`delta` is not supported'):
+      checkpoints.save_checkpoint(tmp_dir, {'a': np.zeros((2,))}, 0, delta=True)
+    self.assertEmpty(os.listdir(tmp_dir))
+
   def test_async_save_checkpoints(self):
     tmp_dir = pathlib.Path(self.create_tempdir().full_path)
     test_object0 = {
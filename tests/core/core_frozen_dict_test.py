@@ -38,6 +38,29 @@ class FrozenDictTest(parameterized.TestCase):
     self.assertEqual(a, 1)
     self.assertEqual(unfreeze(b), {'b': {'c': 2}})
 
+  def test_frozen_dict_structural_sharing(self):
+    xs = {'params': {'dense': {'kernel': 1}}, 'batch_stats': {'mean': 2}}
+    frozen = freeze(xs)
+    params = frozen['params']
+    self.assertIs(frozen['params'], params)
+    hash(frozen)
+
+    updated = frozen.copy({'batch_stats': {'mean': 3}})
+    self.assertIs(updated['params'], params)
+    self.assertIsNotNone(params._hash)
+    self.assertEqual(unfreeze(updated['batch_stats']), {'mean': 3})
+    self.assertEqual(unfreeze(frozen['batch_stats']), {'mean': 2})
+
+    rest, popped = frozen.pop('batch_stats')
+    self.assertIs(rest['params'], params)
+    self.assertEqual(unfreeze(popped), {'mean': 2})
+    self.assertEqual(unfreeze(rest), {'params': {'dense': {'kernel': 1}}})
+
+    # unfreezing returns a copy that doesn't alias the frozen dict
+    ys = unfreeze(frozen)
+    ys['params']['dense']['kernel'] = 4
+    self.assertEqual(frozen['params']['dense']['kernel'], 1)
+
   def test_frozen_dict_partially_maps(self):
     x = jax.tree_util.tree_map(
       lambda a, b: (a, b), freeze({'a': 2}), freeze({'a': {'b': 1}})
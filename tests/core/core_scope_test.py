@@ -20,7 +20,16 @@ from jax import random
 
 from flax import errors
 from flax.configurations import temp_flip_flag
-from flax.core import Scope, apply, freeze, init, lazy_init, nn, scope
+from flax.core import (
+  Scope,
+  apply,
+  deferred_init,
+  freeze,
+  init,
+  lazy_init,
+  nn,
+  scope,
+)
 from flax.core.scope import LazyRng
 
 
@@ -282,6 +291,33 @@ class ScopeTest(absltest.TestCase):
     with self.assertRaises(errors.LazyInitError):
       init_fn(random.key(0), jax.ShapeDtypeStruct((8, 4), jnp.float32))
 
+  def test_deferred_init(self):
+    def f(scope, x):
+      return scope.param(
+        'kernel', nn.initializers.lecun_normal(), (x.shape[-1], x.shape[-1])
+      )
+
+    x = jax.ShapeDtypeStruct((1024 * 1024 * 1024, 128), jnp.float32)
+    deferred = deferred_init(f)(random.key(0), x)
+    self.assertEqual(deferred.abstract['params']['kernel'].shape, (128, 128))
+    variables = deferred.materialize()
+    _, expected = init(f)(random.key(0), jnp.ones((1, 128)))
+    np.testing.assert_allclose(
+      variables['params']['kernel'], expected['params']['kernel']
+    )
+
+  def test_deferred_init_fails_on_data_dependence(self):
+    def f(scope, x):
+      k = scope.param('kernel', lambda _: x)
+      return x * k
+
+    deferred = deferred_init(f)(
+      random.key(0), jax.ShapeDtypeStruct((8, 4), jnp.float32)
+    )
+    self.assertEqual(deferred.abstract['params']['kernel'].shape, (8, 4))
+    with self.assertRaises(errors.LazyInitError):
+      deferred.materialize()
+
   @temp_flip_flag('fix_rng_separator', True)
   def test_fold_in_static_seperator(self):
     x = LazyRng(random.key(0), ('ab', 'c'))
@@ -15,8 +15,11 @@
 """Tests for flax.jax_utils."""
 
 from functools import partial
+import itertools
 import os
 import re
+import threading
+import time
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -122,5 +125,99 @@ class PadShardUnpadTest(chex.TestCase):
     np.testing.assert_allclose(np.float64(y), np.float64(5 * x + 10))
 
 
+class DevicePrefetchIteratorTest(parameterized.TestCase):
+
+  @parameterized.parameters(1, 3)
+  def test_order_and_values(self, num_workers):
+    items = [{'x': np.full((8, 2), i)} for i in range(10)]
+    it = jax_utils.DevicePrefetchIterator(
+      items, size=3, num_workers=num_workers
+    )
+    outputs = list(it)
+    self.assertLen(outputs, 10)
+    for i, output in enumerate(outputs):
+      self.assertIsInstance(output['x'], jax.Array)
+      np.testing.assert_array_equal(output['x'], items[i]['x'])
+    stats = it.stats
+    self.assertEqual(stats.items, 10)
+    self.assertEqual(stats.queue_depth, 0)
+
+  def test_shard_to_devices(self):
+    devices = jax.local_devices()
+    items = [np.arange(len(devices) * 6).reshape(-1, 3) for _ in range(3)]
+    it = jax_utils.DevicePrefetchIterator(
+      items, devices=devices, shard=True, transform=lambda x: x * 2
+    )
+    for item, output in zip(items, it):
+      self.assertEqual(output.shape, (len(devices), 2, 3))
+      self.assertLen(output.sharding.device_set, len(devices))
+      np.testing.assert_array_equal(output.reshape(-1, 3), item * 2)
+
+  def test_named_sharding(self):
+    mesh = jax.sharding.Mesh(jax.devices(), ('data',))
+    sharding = jax.sharding.NamedSharding(
+      mesh, jax.sharding.PartitionSpec('data')
+    )
+    items = [np.ones((len(jax.devices()) * 2, 3)) for _ in range(2)]
+    for output in jax_utils.DevicePrefetchIterator(items, sharding=sharding):
+      self.assertEqual(output.sharding, sharding)
+
+  def test_stall_metrics(self):
+    def slow_items():
+      for i in range(3):
+        time.sleep(0.05)
+        yield np.array(i)
+
+    it = jax_utils.DevicePrefetchIterator(slow_items(), size=2)
+    self.assertEqual(list(map(int, it)), [0, 1, 2])
+    self.assertGreater(it.stats.stalls, 0)
+    self.assertGreater(it.stats.stall_time, 0.0)
+
+  def test_errors(self):
+    def items():
+      yield np.array(0)
+      raise ValueError('bad item')
+
+    it = jax_utils.DevicePrefetchIterator(items(), size=2)
+    self.assertEqual(int(next(it)), 0)
+    with self.assertRaisesRegex(ValueError, 'bad item'):
+      next(it)
+    with self.assertRaises(StopIteration):
+      next(it)
+
+  def test_close(self):
+    it = jax_utils.DevicePrefetchIterator(
+      itertools.count(), size=2, num_workers=2
+    )
+    self.assertEqual(int(next(it)), 0)
+    it.close()
+    self.assertFalse(any(worker.is_alive() for worker in it._workers))
+    with self.assertRaises(StopIteration):
+      next(it)
+
+  def test_close_timeout(self):
+    release = threading.Event()
+
+    def blocked_items():
+      yield np.array(0)
+      release.wait()
+      yield np.array(1)
+
+    it = jax_utils.DevicePrefetchIterator(blocked_items(), size=2)
+    self.assertEqual(int(next(it)), 0)
+    start = time.perf_counter()
+    it.close(timeout=0.1)
+    self.assertLess(time.perf_counter() - start, 5.0)
+    self.assertTrue(it._workers[0].is_alive())
+    release.set()
+    it._workers[0].join()
+
+  def test_invalid_arguments(self):
+    with self.assertRaisesRegex(ValueError, 'size must be at least 1'):
+      jax_utils.DevicePrefetchIterator([], size=0)
+    with self.assertRaisesRegex(ValueError, 'num_workers must be at least 1'):
+      jax_utils.DevicePrefetchIterator([], num_workers=0)
+
+
 if __name__ == '__main__':
   absltest.main()
@@ -14,6 +14,8 @@
 
 """Tests for flax.linen.attention."""
 
+import functools
+
 from absl.testing import absltest, parameterized
 from flax import errors, jax_utils
 from flax import linen as nn
@@ -450,6 +452,36 @@ class AttentionTest(parameterized.TestCase):
       assert y1.shape == (1, 1, 4)
       assert y2.shape == (1, 1, 4)
 
+  def test_multi_token_decode_and_rollback(self):
+    x = random.normal(random.key(0), (2, 8, 4))
+    module = nn.MultiHeadDotProductAttention(
+      num_heads=2, precision=lax.Precision.HIGHEST
+    )
+    decode_module = module.clone(decode=True)
+    variables = decode_module.init(random.key(1), x)
+    params, cache = variables['params'], variables['cache']
+    y_ref = module.apply(
+      {'params': params}, x, mask=nn.make_causal_mask(jnp.ones((2, 8)))
+    )
+
+    def step(cache, x):
+      y, updates = decode_module.apply(
+        {'params': params, 'cache': cache}, x, mutable=['cache']
+      )
+      return y, updates['cache']
+
+    # decode 5 positions where the last 3 are rejected drafts
+    y, cache = step(cache, x[:, :5])
+    np.testing.assert_allclose(y[:, :2], y_ref[:, :2], atol=1e-5)
+    cache = nn.rollback_cache(cache, 3)
+    self.assertEqual(cache['cache_index'], 2)
+    y, cache = step(cache, x[:, 2:8])
+    np.testing.assert_allclose(y, y_ref[:, 2:], atol=1e-5)
+    self.assertEqual(cache['cache_index'], 8)
+
+    with self.assertRaisesRegex(ValueError, 'between 1 and 8 positions, got 9'):
+      step(cache, jnp.ones((2, 9, 4)))
+
   def test_attention_alias_equivalence(self):
     key1, key2 = random.split(random.key(0), 2)
     query = random.uniform(key1, (3, 5))
@@ -616,6 +648,97 @@ class AttentionTest(parameterized.TestCase):
         attn_weights_value_einsum=attn_weights_value_einsum,
     )
 
+  @parameterized.parameters('jax', 'blockwise')
+  def test_dot_product_attention_backend(self, backend):
+    q_key, k_key, v_key, b_key, m_key = random.split(random.key(0), 5)
+    query = random.normal(q_key, (2, 3, 37, 4, 8))
+    key = random.normal(k_key, (2, 3, 53, 4, 8))
+    value = random.normal(v_key, (2, 3, 53, 4, 8))
+    bias = random.normal(b_key, (4, 37, 53))
+    mask = random.bernoulli(m_key, 0.7, (2, 3, 1, 1, 53))
+    expected = nn.dot_product_attention(query, key, value, bias, mask)
+    out = nn.dot_product_attention(
+        query, key, value, bias, mask, backend=backend
+    )
+    np.testing.assert_allclose(out, expected, atol=1e-5, rtol=1e-5)
+
+  @parameterized.parameters((37, 53, 16, 8), (64, 64, 512, 512))
+  def test_blockwise_dot_product_attention(
+      self, q_length, kv_length, q_chunk_size, kv_chunk_size
+  ):
+    q_key, k_key, v_key = random.split(random.key(0), 3)
+    query = random.normal(q_key, (q_length, 2, 8))
+    key = random.normal(k_key, (kv_length, 2, 8))
+    value = random.normal(v_key, (kv_length, 2, 6))
+    mask = nn.make_causal_mask(jnp.ones((kv_length,)))[..., :q_length, :]
+    # the first row is fully masked out
+    mask = mask.at[..., 0, :].set(False)
+
+    def attention(fn, query, **kwargs):
+      return fn(query, key, value, mask=mask, **kwargs)
+
+    expected = attention(nn.dot_product_attention, query)
+    out = attention(
+        nn.blockwise_dot_product_attention,
+        query,
+        q_chunk_size=q_chunk_size,
+        kv_chunk_size=kv_chunk_size,
+    )
+    np.testing.assert_allclose(out, expected, atol=1e-5, rtol=1e-5)
+
+    expected_grad = jax.grad(
+        lambda q: attention(nn.dot_product_attention, q).sum()
+    )(query)
+    grad = jax.grad(
+        lambda q: attention(
+            nn.blockwise_dot_product_attention,
+            q,
+            q_chunk_size=q_chunk_size,
+            kv_chunk_size=kv_chunk_size,
+        ).sum()
+    )(query)
+    np.testing.assert_allclose(grad, expected_grad, atol=1e-5, rtol=1e-5)
+
+  def test_blockwise_dot_product_attention_memory(self):
+    length = 4096
+    query = jax.ShapeDtypeStruct((1, length, 1, 16), jnp.float32)
+
+    def temp_bytes(backend):
+      fn = jax.jit(functools.partial(nn.dot_product_attention, backend=backend))
+      compiled = fn.lower(query, query, query).compile()
+      return compiled.memory_analysis().temp_size_in_bytes
+
+    # the einsum backend materializes the [length, length] attention weights
+    self.assertGreater(temp_bytes('einsum'), length * length * 4)
+    self.assertLess(temp_bytes('blockwise'), length * length * 4 // 16)
+
+  def test_attention_backend_field(self):
+    x = random.normal(random.key(0), (2, 5, 4))
+    module = nn.MultiHeadDotProductAttention(num_heads=2, qkv_features=4)
+    variables = module.init(random.key(1), x)
+    expected = module.apply(variables, x)
+    out = module.clone(attention_backend='blockwise').apply(variables, x)
+    np.testing.assert_allclose(out, expected, atol=1e-5, rtol=1e-5)
+
+    dropout_module = module.clone(
+        attention_backend='blockwise', dropout_rate=0.1, deterministic=False
+    )
+    with self.assertRaisesRegex(ValueError, 'does not support dropout'):
+      dropout_module.apply(variables, x, rngs={'dropout': random.key(2)})
+    with self.assertRaisesRegex(ValueError, 'backend must be one of'):
+      module.clone(attention_backend='flash').apply(variables, x)
+
+  def test_attention_backend_custom_fn(self):
+    x = random.normal(random.key(0), (2, 5, 4))
+    module = nn.MultiHeadDotProductAttention(
+        num_heads=2,
+        qkv_features=4,
+        attention_fn=lambda q, k, v, mask=None: q,
+        attention_backend='jax',
+    )
+    with self.assertRaisesRegex(ValueError, 'does not accept a `backend`'):
+      module.init(random.key(1), x)
+
 
 if __name__ == '__main__':
   absltest.main()
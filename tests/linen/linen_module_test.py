@@ -15,6 +15,7 @@
 """Tests for flax.linen."""
 
 import contextlib
+from concurrent.futures import ThreadPoolExecutor
 import copy
 import dataclasses
 import enum
@@ -23,6 +24,7 @@ import gc
 import inspect
 import operator
 import sys
+import weakref
 from tempfile import TemporaryDirectory
 from typing import (
   Any,
@@ -41,7 +43,7 @@ from absl.testing import absltest
 from jax import random
 from jax.nn import initializers
 
-from flax import config, errors, struct
+from flax import config, core, errors, struct
 from flax import linen as nn
 from flax.core import FrozenDict, Scope, freeze
 from flax.linen import compact
@@ -131,6 +133,50 @@ class ModuleTest(absltest.TestCase):
     with self.assertRaises(errors.LazyInitError):
       Foo().lazy_init(random.key(0), jax.ShapeDtypeStruct((8, 4), jnp.float32))
 
+  def test_deferred_init(self):
+    class Foo(nn.Module):
+      @compact
+      def __call__(self, x):
+        x = nn.Dense(
+          4,
+          kernel_init=nn.with_partitioning(
+            nn.initializers.lecun_normal(), (None, 'model')
+          ),
+        )(x)
+        return nn.BatchNorm(use_running_average=False)(x)
+
+    x = jnp.ones((2, 3))
+    variables = Foo().init(random.key(0), x)
+    deferred = Foo().deferred_init(
+      random.key(0), jax.ShapeDtypeStruct(x.shape, x.dtype)
+    )
+    self.assertEqual(
+      deferred.abstract['params']['Dense_0']['kernel'].value.shape, (3, 4)
+    )
+
+    # leaves are materialized layer by layer
+    groups = [group for group, _ in deferred.materialize_iter()]
+    self.assertEqual(
+      groups,
+      [
+        ('batch_stats', 'BatchNorm_0'),
+        ('params', 'BatchNorm_0'),
+        ('params', 'Dense_0'),
+      ],
+    )
+
+    mesh = jax.sharding.Mesh(jax.devices()[:1], ('model',))
+    materialized = deferred.materialize(nn.get_sharding(deferred.abstract, mesh))
+    kernel = materialized['params']['Dense_0']['kernel']
+    self.assertIsInstance(kernel, nn.Partitioned)
+    self.assertEqual(
+      kernel.value.sharding,
+      jax.sharding.NamedSharding(
+        mesh, jax.sharding.PartitionSpec(None, 'model')
+      ),
+    )
+    jax.tree.map(np.testing.assert_allclose, materialized, variables)
+
   def test_arg_module(self):
     rngkey = jax.random.key(0)
     x = jnp.ones((10,))
@@ -967,6 +1013,82 @@ class ModuleTest(absltest.TestCase):
 
     foo.apply(variables, jnp.zeros(3), method='bar')
 
+  def test_module_apply_cache(self):
+    setup_calls = []
+
+    class Foo(nn.Module):
+      features: int = 3
+
+      def setup(self):
+        setup_calls.append(1)
+        self.dense = nn.Dense(self.features)
+        self.bn = nn.BatchNorm()
+
+      def __call__(self, x, train: bool = False, scale: float = 1.0):
+        return self.bn(self.dense(x), use_running_average=not train) * scale
+
+    x = jnp.ones((2, 4))
+    foo = Foo()
+    variables = foo.init(random.key(0), x)
+    y, state = foo.apply(variables, x, train=True, mutable=['batch_stats'])
+
+    old_cache_size = config.flax_linen_apply_cache_size
+    config.update('flax_linen_apply_cache_size', 8)
+    self.addCleanup(
+      config.update, 'flax_linen_apply_cache_size', old_cache_size
+    )
+    self.addCleanup(core.scope._apply_cache.clear)
+    setup_calls.clear()
+    for _ in range(3):
+      y_cached, state_cached = foo.apply(
+        variables, x, train=True, mutable=['batch_stats']
+      )
+    self.assertLen(setup_calls, 1)
+    np.testing.assert_allclose(y_cached, y)
+    jax.tree.map(np.testing.assert_allclose, state_cached, state)
+
+    # static arguments, input shapes and module fields are part of the key
+    foo.apply(variables, x)
+    foo.apply(variables, jnp.ones((5, 4)))
+    Foo().apply(variables, x)
+    self.assertLen(setup_calls, 3)
+    with self.assertRaises(Exception):
+      Foo(features=2).apply(variables, x)
+
+    # python numbers are traced instead of being part of the key
+    setup_calls.clear()
+    y2 = foo.apply(variables, x, scale=2.0)
+    foo.apply(variables, x, scale=3.0)
+    self.assertLen(setup_calls, 1)
+    np.testing.assert_allclose(y2, 2 * foo.apply(variables, x), rtol=1e-6)
+
+    # entries don't keep the module alive
+    foo_ref = weakref.ref(foo)
+    del foo
+    gc.collect()
+    self.assertIsNone(foo_ref())
+    self.assertEmpty(core.scope._apply_cache)
+
+  def test_module_apply_cache_threads(self):
+    old_cache_size = config.flax_linen_apply_cache_size
+    config.update('flax_linen_apply_cache_size', 2)
+    self.addCleanup(
+      config.update, 'flax_linen_apply_cache_size', old_cache_size
+    )
+    self.addCleanup(core.scope._apply_cache.clear)
+    dense = nn.Dense(3)
+    variables = dense.init(random.key(0), jnp.ones((1, 4)))
+
+    def apply(i):
+      # different shapes and static arguments add and evict entries
+      x = jnp.ones((i % 3 + 1, 4))
+      return dense.apply(variables, x, mutable=bool(i % 2))
+
+    with ThreadPoolExecutor(8) as pool:
+      outputs = list(pool.map(apply, range(64)))
+    self.assertLen(outputs, 64)
+    self.assertLen(core.scope._apply_cache, 2)
+
   def test_call_unbound_compact_module_methods(self):
     dense = Dense(3)
     msg = r'Can\'t call compact methods on unbound modules'
@@ -2585,6 +2707,51 @@ class ModuleTest(absltest.TestCase):
     self.assertIs(called[0], bar)
     self.assertIs(called[1], foo)
 
+  def test_fast_method_dispatch(self):
+    class Foo(nn.Module):
+      def setup(self):
+        self.dense = nn.Dense(3)
+
+      def __call__(self, x):
+        self.sow('intermediates', 'x', x)
+        return self.dense(x)
+
+    class Bar(nn.Module):
+      @nn.compact
+      def __call__(self, x):
+        x = Foo()(x)
+        return nn.Dense(2)(x) + nn.Dense(2)(x)
+
+    x = jnp.ones((1, 4))
+    variables = Bar().init(random.key(0), x)
+    fast_calls = []
+    call_fast = nn.Module._call_wrapped_method_fast
+
+    def spy(self, *args):
+      fast_calls.append(type(self).__name__)
+      return call_fast(self, *args)
+
+    with patch.object(nn.Module, '_call_wrapped_method_fast', spy):
+      y, state = Bar().apply(variables, x, mutable=['intermediates'])
+      self.assertNotEmpty(fast_calls)
+
+      # capture filters need the full method wrapper
+      fast_calls.clear()
+      _, state_captured = Bar().apply(
+        variables, x, capture_intermediates=True, mutable=['intermediates']
+      )
+      self.assertEmpty(fast_calls)
+
+    with patch.object(nn.module, '_use_fast_dispatch', False):
+      y_slow, state_slow = Bar().apply(
+        variables, x, mutable=['intermediates']
+      )
+    np.testing.assert_allclose(y, y_slow)
+    self.assertEqual(
+      jax.tree.structure(state), jax.tree.structure(state_slow)
+    )
+    self.assertIn('__call__', state_captured['intermediates'])
+
   def test_cloudpickle_class(self):
     import cloudpickle
 
@@ -24,6 +24,11 @@ import jax
 import jax.numpy as jnp
 from flax import config
 
+try:
+  import flaxlib  # type: ignore[import]
+except ImportError:
+  flaxlib = None
+
 
 class List(nnx.Module):
   def __init__(self, items):
@@ -1085,6 +1090,141 @@ class TestGraphUtils(absltest.TestCase):
     self.assertIn('ls', m._object__nodes)
     self.assertLen(jax.tree.leaves(m), 1)
 
+@absltest.skipIf(
+  flaxlib is None or config.flax_use_flaxlib,
+  'flaxlib is not installed or is already used by the graph module',
+)
+class TestFlaxlibGraph(absltest.TestCase):
+  def make_model(self, array_attributes=True):
+    class Block(nnx.Module):
+      def __init__(self, rngs):
+        self.linear = nnx.Linear(2, 2, rngs=rngs)
+        self.bn = nnx.BatchNorm(2, rngs=rngs)
+        if array_attributes:
+          self.scale = jnp.ones((2,))
+
+    class Model(nnx.Module):
+      def __init__(self, rngs):
+        self.blocks = List([Block(rngs) for _ in range(3)])
+        self.shared = self.blocks[0].linear
+        self.count = nnx.Variable(jnp.array(0))
+        self.pair = (1, 'a')
+
+    return Model(nnx.Rngs(0))
+
+  def native_flatten(self, node, with_paths=True):
+    nodes, attributes, leaves = [], [], []
+    paths = [] if with_paths else None
+    flaxlib._graph_flatten(
+      node,
+      nnx.graph.get_node_impl(node),
+      [] if with_paths else None,
+      flaxlib.RefMap(),
+      None,
+      nodes,
+      attributes,
+      leaves,
+      paths,
+    )
+    graphdef = nnx.graph.GraphDef(
+      nodes=nodes, attributes=attributes, num_leaves=len(leaves)
+    )
+    return graphdef, paths, leaves
+
+  def test_flatten(self):
+    model = self.make_model()
+    graphdef, flat_state = nnx.graph.flatten(model)
+    native_graphdef, paths, leaves = self.native_flatten(model)
+
+    self.assertEqual(graphdef, native_graphdef)
+    self.assertEqual(flat_state.paths, tuple(paths))
+    self.assertLen(leaves, len(flat_state.leaves))
+    for leaf, native_leaf in zip(flat_state.leaves, leaves):
+      self.assertIs(leaf, native_leaf)
+
+  def test_flatten_no_paths(self):
+    model = self.make_model()
+    graphdef, flat_leaves = nnx.graph.flatten(model, with_paths=False)
+    native_graphdef, paths, leaves = self.native_flatten(
+      model, with_paths=False
+    )
+
+    self.assertEqual(graphdef, native_graphdef)
+    self.assertIsNone(paths)
+    self.assertLen(leaves, len(flat_leaves))
+    for leaf, native_leaf in zip(flat_leaves, leaves):
+      self.assertIs(leaf, native_leaf)
+
+  def test_unflatten(self):
+    model = self.make_model()
+    graphdef, flat_state = nnx.graph.flatten(model)
+    node_iter = iter(graphdef.nodes)
+    nodedef = next(node_iter)
+    new_model = flaxlib._graph_unflatten(
+      nodedef,
+      nnx.graph.get_node_impl_for_type(nodedef.type),
+      node_iter,
+      iter(graphdef.attributes),
+      iter(flat_state.leaves),
+      flaxlib.IndexMap(),
+      None,
+      True,
+    )
+
+    self.assertIsNot(new_model, model)
+    self.assertIs(new_model.shared, new_model.blocks[0].linear)
+    self.assertEqual(new_model.pair, (1, 'a'))
+    self.assertEqual(nnx.graph.graphdef(new_model), graphdef)
+    np.testing.assert_allclose(
+      new_model.shared.kernel.value, model.shared.kernel.value
+    )
+    self.assertIsNot(new_model.shared.kernel, model.shared.kernel)
+
+  def test_fingerprint(self):
+    model = self.make_model()
+    fp = []
+    ctx = nnx.graph.FingerprintContext(0)
+    nnx.graph._graph_fingerprint(
+      ctx,
+      fp.append,
+      model,
+      nnx.graph.get_node_impl(model),
+      nnx.graph.RefMap(),
+      nnx.graph.RefMap(),
+    )
+    native_fp = []
+    native_ctx = nnx.graph.FingerprintContext(0)
+    flaxlib._graph_fingerprint(
+      native_ctx,
+      native_fp.append,
+      model,
+      nnx.graph.get_node_impl(model),
+      flaxlib.RefMap(),
+      flaxlib.RefMap(),
+    )
+
+    self.assertEqual(fp, native_fp)
+    self.assertEqual(ctx.next_index, native_ctx.next_index)
+
+  def test_check_fingerprint(self):
+    model = self.make_model(array_attributes=False)
+    fp = nnx.graph.fingerprint(model)
+
+    def check(node):
+      return flaxlib._check_graph_fingerprint(
+        nnx.graph.FingerprintContext(0),
+        iter(fp),
+        node,
+        nnx.graph.get_node_impl(node),
+        flaxlib.RefMap(),
+        flaxlib.RefMap(),
+      )
+
+    self.assertTrue(check(model))
+    model.blocks[1].linear = nnx.Linear(2, 2, rngs=nnx.Rngs(1))
+    self.assertFalse(check(model))
+
+
 class SimpleModule(nnx.Module):
   pass
 
@@ -156,5 +156,66 @@ class TestMetrics(parameterized.TestCase):
       accuracy.update(logits=logits, labels=labels)
 
 
+  def test_metric_logger(self):
+    metrics = nnx.MultiMetric(
+        loss=nnx.metrics.Average('loss'), stats=nnx.metrics.Welford('loss')
+    )
+
+    @nnx.jit
+    def train_step(metrics, x):
+      metrics.update(loss=x)
+      return metrics.compute()
+
+    logs = []
+    with nnx.metrics.MetricLogger(
+        lambda step, scalars: logs.append((step, scalars)), buffer_size=2
+    ) as logger:
+      for step in range(5):
+        logger.log(step, train_step(metrics, jnp.arange(4.0) + step))
+    self.assertEqual([step for step, _ in logs], [0, 1, 2, 3, 4])
+
+    step, scalars = logs[-1]
+    self.assertEqual(
+        set(scalars),
+        {
+            'loss',
+            'stats/mean',
+            'stats/standard_error_of_mean',
+            'stats/standard_deviation',
+        },
+    )
+    self.assertIsInstance(scalars['loss'], float)
+    np.testing.assert_allclose(scalars['loss'], metrics.loss.compute())
+    np.testing.assert_allclose(scalars['stats/mean'], 3.5)
+
+  def test_metric_logger_error(self):
+    def write_fn(step, scalars):
+      raise RuntimeError('write failed')
+
+    logger = nnx.metrics.MetricLogger(write_fn)
+    logger.log(0, {'loss': jnp.array(1.0)})
+    with self.assertRaisesRegex(RuntimeError, 'write failed'):
+      logger.close()
+
+  def test_metric_logger_recovers_after_error(self):
+    logs = []
+
+    def write_fn(step, scalars):
+      if step == 0:
+        raise RuntimeError('write failed')
+      logs.append((step, scalars))
+
+    logger = nnx.metrics.MetricLogger(write_fn)
+    logger.log(0, {'loss': jnp.array(0.0)})
+    with self.assertRaisesRegex(RuntimeError, 'write failed'):
+      logger.flush(wait=True)
+    # the error is only raised once
+    logger.log(1, {'loss': jnp.array(1.0)})
+    logger.flush(wait=True)
+    logger.log(2, {'loss': jnp.array(2.0)})
+    logger.close()
+    self.assertEqual(logs, [(1, {'loss': 1.0}), (2, {'loss': 2.0})])
+
+
 if __name__ == '__main__':
   absltest.main()
@@ -570,6 +570,53 @@ class TestModule(absltest.TestCase):
       raise_if_not_found=False,
     )
 
+  def test_structure_version(self):
+    class Block(nnx.Module):
+      def __init__(self, *, rngs: nnx.Rngs):
+        self.linear = nnx.Linear(2, 3, rngs=rngs)
+
+    class Model(nnx.Module):
+      def __init__(self, *, rngs: nnx.Rngs):
+        self.block = Block(rngs=rngs)
+        self.blocks = [Block(rngs=rngs)]
+
+    model = Model(rngs=nnx.Rngs(0))
+    version = lambda m: m._object__state.structure_version
+
+    # value updates don't change the version
+    v0 = version(model)
+    model.block.linear.kernel.value = jnp.zeros((2, 3))
+    model.blocks[0].linear.bias.value += 1
+    self.assertEqual(version(model), v0)
+
+    # changes in descendants are propagated to the parents
+    block_v0 = version(model.block)
+    model.block.linear.use_bias = False
+    self.assertGreater(version(model.block), block_v0)
+    self.assertGreater(version(model), v0)
+
+    v1 = version(model)
+    model.blocks[0].linear.kernel = nnx.Param(jnp.ones((2, 3)))
+    self.assertGreater(version(model), v1)
+
+    v2 = version(model)
+    del model.block.linear.bias
+    self.assertGreater(version(model), v2)
+
+    # siblings are not affected
+    other_v = version(model.blocks[0])
+    model.block.new_attr = 1
+    self.assertEqual(version(model.blocks[0]), other_v)
+
+  def test_structure_version_merge(self):
+    model = nnx.Sequential(
+      nnx.Linear(2, 3, rngs=nnx.Rngs(0)), nnx.Linear(3, 1, rngs=nnx.Rngs(0))
+    )
+    model = nnx.merge(*nnx.split(model))
+    version = model._object__state.structure_version
+    model.layers[1].bias = None
+    self.assertGreater(model._object__state.structure_version, version)
+
   def test_cloud_pickle(self):
     class Model(nnx.Module):
       def __init__(self, din, dmid, dout, rngs: nnx.Rngs):
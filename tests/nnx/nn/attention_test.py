@@ -199,6 +199,199 @@ class TestLinenConsistency(parameterized.TestCase):
     np.testing.assert_array_equal(out, out_nnx)
 
 
+class TestAttentionBackend(parameterized.TestCase):
+  @parameterized.parameters('einsum', 'jax', 'blockwise')
+  def test_dot_product_attention_backend(self, backend):
+    q_key, k_key, v_key, m_key = jax.random.split(jax.random.key(0), 4)
+    query = jax.random.normal(q_key, (2, 3, 37, 4, 8))
+    key = jax.random.normal(k_key, (2, 3, 53, 4, 8))
+    value = jax.random.normal(v_key, (2, 3, 53, 4, 8))
+    mask = jax.random.bernoulli(m_key, 0.7, (2, 3, 1, 1, 53))
+    expected = linen.dot_product_attention(query, key, value, mask=mask)
+    out = nnx.dot_product_attention(
+      query, key, value, mask=mask, backend=backend
+    )
+    np.testing.assert_allclose(out, expected, atol=1e-5, rtol=1e-5)
+
+  def test_blockwise_dot_product_attention(self):
+    q_key, k_key, v_key = jax.random.split(jax.random.key(0), 3)
+    query = jax.random.normal(q_key, (37, 2, 8))
+    key = jax.random.normal(k_key, (53, 2, 8))
+    value = jax.random.normal(v_key, (53, 2, 6))
+    mask = nnx.make_causal_mask(jnp.ones((53,)))[..., :37, :]
+    expected = linen.dot_product_attention(query, key, value, mask=mask)
+    out = nnx.blockwise_dot_product_attention(
+      query, key, value, mask=mask, q_chunk_size=16, kv_chunk_size=8
+    )
+    np.testing.assert_allclose(out, expected, atol=1e-5, rtol=1e-5)
+
+  def test_attention_backend_field(self):
+    x = jax.random.normal(jax.random.key(0), (2, 5, 4))
+    module = nnx.MultiHeadAttention(
+      num_heads=2, in_features=4, decode=False, rngs=nnx.Rngs(0)
+    )
+    expected = module(x)
+    module.attention_backend = 'blockwise'
+    np.testing.assert_allclose(module(x), expected, atol=1e-5, rtol=1e-5)
+
+    with self.assertRaisesRegex(ValueError, 'does not support dropout'):
+      module(x, sow_weights=True)
+
+  def test_attention_backend_custom_fn(self):
+    def attention_fn(query, key, value, **kwargs):
+      return nnx.dot_product_attention(query, key, value)
+
+    with self.assertRaisesRegex(ValueError, 'does not accept a `backend`'):
+      nnx.MultiHeadAttention(
+        num_heads=2,
+        in_features=4,
+        decode=False,
+        attention_fn=lambda q, k, v, mask=None, module=None: q,
+        attention_backend='jax',
+        rngs=nnx.Rngs(0),
+      )
+    module = nnx.MultiHeadAttention(
+      num_heads=2,
+      in_features=4,
+      decode=False,
+      attention_fn=attention_fn,
+      attention_backend='jax',
+      rngs=nnx.Rngs(0),
+    )
+    self.assertEqual(module(jnp.ones((2, 5, 4))).shape, (2, 5, 4))
+
+
+class TestCacheLayout(parameterized.TestCase):
+  def _module(self, decode=True):
+    return nnx.MultiHeadAttention(
+      num_heads=2, in_features=4, decode=decode, rngs=nnx.Rngs(0)
+    )
+
+  def test_ring_matches_sliding_window(self):
+    length, window = 10, 4
+    x = jax.random.normal(jax.random.key(0), (2, length, 4))
+    module = self._module()
+    module.init_cache(x.shape, layout='ring', window_size=window)
+    self.assertEqual(module.cached_key.shape, (2, window, 2, 2))
+    step = nnx.jit(lambda module, x: module(x))
+    outputs = [step(module, x[:, i : i + 1]) for i in range(length)]
+
+    positions = jnp.arange(length)
+    mask = (positions[:, None] >= positions[None, :]) & (
+      positions[:, None] - positions[None, :] < window
+    )
+    expected = self._module(decode=False)(x, mask=mask[None, None])
+    np.testing.assert_allclose(
+      jnp.concatenate(outputs, axis=1), expected, atol=1e-5, rtol=1e-5
+    )
+
+  def test_paged_matches_dense(self):
+    length = 10
+    x = jax.random.normal(jax.random.key(0), (3, length, 4))
+    dense, paged = self._module(), self._module()
+    dense.init_cache(x.shape)
+    paged.init_cache(x.shape, layout='paged', page_size=4)
+    self.assertEqual(paged.cached_key.shape, (9, 4, 2, 2))
+    self.assertEqual(paged.block_table.shape, (3, 3))
+    step = nnx.jit(lambda module, x: module(x))
+    for i in range(length):
+      np.testing.assert_allclose(
+        step(paged, x[:, i : i + 1]),
+        step(dense, x[:, i : i + 1]),
+        atol=1e-5,
+        rtol=1e-5,
+      )
+    np.testing.assert_array_equal(paged.cache_index[...], [length] * 3)
+
+  def test_paged_mixed_lengths(self):
+    x = jax.random.normal(jax.random.key(0), (2, 8, 4))
+    paged = self._module()
+    # two pages shared by the sequences
+    paged.init_cache((2, 8, 4), layout='paged', page_size=4, num_pages=3)
+    paged.block_table[...] = jnp.array([[0, 1], [2, 0]])
+    step = nnx.jit(lambda module, x: module(x))
+    for i in range(6):
+      out = step(paged, x[:, i : i + 1])
+      if i == 1:
+        # the second sequence starts over, its first page is recycled
+        paged.cache_index[...] = paged.cache_index[...].at[1].set(0)
+    np.testing.assert_array_equal(paged.cache_index[...], [6, 4])
+
+    dense = self._module()
+    dense.init_cache((1, 8, 4))
+    for i in range(2, 6):
+      expected = dense(x[1:, i : i + 1])
+    np.testing.assert_allclose(out[1:], expected, atol=1e-5, rtol=1e-5)
+
+  def test_multi_token_decode_and_rollback(self):
+    x = jax.random.normal(jax.random.key(0), (2, 8, 4))
+    module = self._module()
+    module.init_cache(x.shape)
+    causal_mask = nnx.make_causal_mask(jnp.ones((2, 8)))
+    expected = self._module(decode=False)(x, mask=causal_mask)
+    step = nnx.jit(lambda module, x: module(x))
+
+    # decode 5 positions where the last 3 are rejected drafts
+    y = step(module, x[:, :5])
+    np.testing.assert_allclose(y[:, :2], expected[:, :2], atol=1e-5)
+    module.rollback_cache(3)
+    self.assertEqual(module.cache_index[...], 2)
+    y = step(module, x[:, 2:8])
+    np.testing.assert_allclose(y, expected[:, 2:], atol=1e-5)
+
+    with self.assertRaisesRegex(
+      ValueError, r'expected query shape \(2, 3, 2, 2\) instead got \(3, 3'
+    ):
+      module(jnp.ones((3, 3, 4)))
+    with self.assertRaisesRegex(ValueError, 'between 1 and 8 positions, got 9'):
+      module(jnp.ones((2, 9, 4)))
+
+  def test_paged_multi_token_decode_and_rollback(self):
+    x = jax.random.normal(jax.random.key(0), (2, 8, 4))
+    dense, paged = self._module(), self._module()
+    dense.init_cache(x.shape)
+    paged.init_cache(x.shape, layout='paged', page_size=2)
+    step = nnx.jit(lambda module, x: module(x))
+
+    np.testing.assert_allclose(
+      step(paged, x[:, :5]), step(dense, x[:, :5]), atol=1e-5
+    )
+    # accept a different number of drafts per sequence
+    paged.rollback_cache(jnp.array([3, 1]))
+    np.testing.assert_array_equal(paged.cache_index[...], [2, 4])
+    y = step(paged, x[:, 5:6])
+
+    for i in range(2):
+      reference = self._module()
+      reference.init_cache((1, 8, 4))
+      length = int(paged.cache_index[i]) - 1
+      reference(x[i : i + 1, :length])
+      np.testing.assert_allclose(
+        y[i : i + 1], reference(x[i : i + 1, 5:6]), atol=1e-5
+      )
+
+    with self.assertRaisesRegex(
+      ValueError, r'expected query shape \(2, 3, 2, 2\) instead got \(3, 3'
+    ):
+      paged(jnp.ones((3, 3, 4)))
+    with self.assertRaisesRegex(ValueError, 'between 1 and 8 positions, got 9'):
+      paged(jnp.ones((2, 9, 4)))
+
+  def test_invalid_layout(self):
+    module = self._module()
+    with self.assertRaisesRegex(ValueError, 'Unknown cache layout'):
+      module.init_cache((2, 8, 4), layout='blocked')
+    with self.assertRaisesRegex(ValueError, 'window_size'):
+      module.init_cache((2, 8, 4), layout='ring')
+    module.init_cache((2, 8, 4), layout='ring', window_size=4)
+    with self.assertRaisesRegex(ValueError, 'mask is not supported'):
+      module(jnp.ones((2, 1, 4)), mask=jnp.ones((2, 1, 1, 4)))
+    with self.assertRaisesRegex(ValueError, 'one position per step'):
+      module(jnp.ones((2, 2, 4)))
+    with self.assertRaisesRegex(ValueError, "can't be rolled back"):
+      module.rollback_cache(1)
+
+
 class TestKVFeatures(parameterized.TestCase):
 
   def test_varying_num_features(self):
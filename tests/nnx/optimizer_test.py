@@ -69,6 +69,91 @@ class TestOptimizer(parameterized.TestCase):
     grads = nnx.grad(loss_fn)(model)
     optimizer.update(model, grads)
 
+  def test_update_donate(self):
+    model = Model(2, 4, rngs=nnx.Rngs(0))
+    tx = optax.adam(1e-3)
+    optimizer = nnx.Optimizer(model, tx, wrt=nnx.Param)
+    x, y = jnp.ones((1, 2)), jnp.ones((1, 4))
+    loss_fn = lambda model: ((model(x) - y) ** 2).mean()
+
+    params = nnx.pure(nnx.clone(nnx.state(model, nnx.Param)))
+    opt_state = tx.init(params)
+    for _ in range(2):
+      grads = jax.grad(
+        lambda params: loss_fn(nnx.merge(nnx.graphdef(model), params))
+      )(params)
+      updates, opt_state = tx.update(grads, opt_state, params)
+      params = optax.apply_updates(params, updates)
+
+    @nnx.jit(donate_argnums=(0, 1))
+    def train_step(model, optimizer):
+      optimizer.update(model, nnx.grad(loss_fn)(model))
+
+    kernel = model.linear1.kernel.raw_value
+    for _ in range(2):
+      train_step(model, optimizer)
+    self.assertTrue(kernel.is_deleted())
+    jax.tree.map_with_path(
+      lambda path, x, y: np.testing.assert_allclose(
+        x, y, rtol=1e-6, err_msg=str(path)
+      ),
+      nnx.pure(nnx.state(model, nnx.Param)),
+      params,
+    )
+    self.assertEqual(optimizer.step[...], 2)
+
+  def test_update_grads_mismatch(self):
+    model = Model(2, 4, rngs=nnx.Rngs(0))
+    optimizer = nnx.Optimizer(model, optax.sgd(0.1), wrt=nnx.Param)
+    grads = nnx.state(model.linear1, nnx.Param)
+    with self.assertRaisesRegex(ValueError, 'structure of `grads`'):
+      optimizer.update(model, grads)
+
+  @parameterized.product(
+      num_micro_batches=[1, 4], accumulate_dtype=[None, jnp.float32]
+  )
+  def test_micro_batched(self, num_micro_batches, accumulate_dtype):
+    model = Model(2, 4, rngs=nnx.Rngs(0))
+    x = jax.random.normal(jax.random.key(0), (8, 2))
+    y = jax.random.normal(jax.random.key(1), (8, 4))
+    loss_fn = lambda model, x, y: ((model(x) - y) ** 2).mean()
+
+    expected_loss, expected_grads = nnx.value_and_grad(loss_fn)(model, x, y)
+    grad_fn = nnx.MicroBatched(
+        loss_fn, num_micro_batches, accumulate_dtype=accumulate_dtype
+    )
+    loss, grads = nnx.jit(grad_fn)(model, x, y)
+
+    np.testing.assert_allclose(loss, expected_loss, rtol=1e-5)
+    jax.tree.map(
+        lambda g, e: np.testing.assert_allclose(g, e, rtol=1e-5, atol=1e-6),
+        grads,
+        expected_grads,
+    )
+    optimizer = nnx.Optimizer(model, optax.sgd(0.1), wrt=nnx.Param)
+    optimizer.update(model, grads)
+
+  def test_micro_batched_aux_and_state(self):
+    model = nnx.Sequential(
+        nnx.Linear(2, 3, rngs=nnx.Rngs(0)),
+        nnx.BatchNorm(3, use_running_average=False, rngs=nnx.Rngs(0)),
+    )
+    x = jax.random.normal(jax.random.key(0), (6, 2))
+
+    def loss_fn(model, x):
+      y = model(x)
+      return (y**2).mean(), y.shape[0]
+
+    grad_fn = nnx.MicroBatched(loss_fn, 3, has_aux=True)
+    (loss, aux), grads = grad_fn(model, x)
+    self.assertEqual(loss.shape, ())
+    np.testing.assert_array_equal(aux, [2, 2, 2])
+    # the batch statistics are updated once per micro-batch
+    self.assertFalse(np.allclose(model.layers[1].mean[...], 0.0))
+
+    with self.assertRaisesRegex(ValueError, 'not divisible'):
+      grad_fn(model, jnp.ones((4, 2)))
+
   def test_sharding_propagation(self):
     model = nnx.Linear(
         2,
@@ -91,6 +176,103 @@ class TestOptimizer(parameterized.TestCase):
       jax.sharding.PartitionSpec('a', 'b'),
     )
 
+  def test_shard_axis(self):
+    model = nnx.Linear(
+        16,
+        4,
+        rngs=nnx.Rngs(0),
+        kernel_init=nnx.with_partitioning(
+            nnx.initializers.lecun_normal(), sharding=(None, 'model')
+        ),
+    )
+    optimizer = nnx.Optimizer(
+        model, optax.adam(0.1), wrt=nnx.Param, shard_axis='data'
+    )
+    mu = optimizer.opt_state[0].mu
+    self.assertEqual(mu['kernel'].sharding, ('data', 'model'))
+    self.assertEqual(mu['bias'].sharding, ('data',))
+    self.assertIsNone(optimizer.opt_state[0].count.get_metadata().get('sharding'))
+    self.assertEqual(model.kernel.sharding, (None, 'model'))
+    partition_spec = nnx.get_partition_spec(nnx.state(optimizer))
+    self.assertEqual(
+        partition_spec['opt_state'][0]['nu']['kernel'].value,
+        jax.sharding.PartitionSpec('data', 'model'),
+    )
+
+  def test_shard_axis_update(self):
+    mesh = jax.sharding.Mesh(np.array(jax.devices()[:1]), ('data',))
+    x = jax.random.normal(jax.random.key(0), (8, 2))
+    y = jnp.ones((8, 4))
+    loss_fn = lambda model: ((model(x) - y) ** 2).mean()
+
+    @nnx.jit
+    def train_step(model, optimizer):
+      optimizer.update(model, nnx.grad(loss_fn)(model))
+
+    params = {}
+    for shard_axis in (None, 'data'):
+      with mesh:
+        model = Model(2, 4, rngs=nnx.Rngs(0))
+        optimizer = nnx.Optimizer(
+            model, optax.adam(0.1), wrt=nnx.Param, shard_axis=shard_axis
+        )
+        for _ in range(2):
+          train_step(model, optimizer)
+      params[shard_axis] = nnx.state(model, nnx.Param)
+
+    mu = optimizer.opt_state[0].mu['linear1']['kernel']
+    self.assertEqual(mu.sharding, (None, 'data'))
+    jax.tree.map(
+        lambda a, b: np.testing.assert_allclose(a, b, rtol=1e-6),
+        params[None],
+        params['data'],
+    )
+    with self.assertRaisesRegex(ValueError, 'not an axis of the mesh'):
+      with mesh:
+        nnx.Optimizer(model, optax.adam(0.1), wrt=nnx.Param, shard_axis='x')
+
+  @parameterized.parameters(
+    {'jit_decorator': lambda f: f},
+    {'jit_decorator': nnx.jit},
+  )
+  def test_offload(self, jit_decorator):
+    x = jax.random.normal(jax.random.key(0), (8, 2))
+    y = jnp.ones((8, 4))
+    loss_fn = lambda model: ((model(x) - y) ** 2).mean()
+
+    @jit_decorator
+    def train_step(model, optimizer):
+      optimizer.update(model, nnx.grad(loss_fn)(model))
+
+    params = {}
+    for offload in (False, True):
+      model = Model(2, 4, rngs=nnx.Rngs(0))
+      optimizer = nnx.Optimizer(
+          model, optax.adam(0.1), wrt=nnx.Param, offload=offload
+      )
+      for _ in range(2):
+        train_step(model, optimizer)
+      params[offload] = nnx.state(model, nnx.Param)
+
+    # one optimizer state per layer
+    self.assertLen(optimizer.opt_state, 2)
+    self.assertEqual(list(optimizer.opt_state[1][0].mu), ['linear2'])
+    device = jax.devices()[0]
+    memory_kinds = {m.kind for m in device.addressable_memories()}
+    host_kind = (
+        'pinned_host'
+        if 'pinned_host' in memory_kinds
+        else device.default_memory().kind
+    )
+    for leaf in jax.tree.leaves(optimizer.opt_state):
+      self.assertEqual(leaf.sharding.memory_kind, host_kind)
+    self.assertEqual(optimizer.step[...], 2)
+    jax.tree.map(
+        lambda a, b: np.testing.assert_allclose(a, b, rtol=1e-6),
+        params[False],
+        params[True],
+    )
+
   @parameterized.product(
     module_cls=[nnx.Linear, Model],
     jit_decorator=[lambda f: f, nnx.jit, jax.jit],
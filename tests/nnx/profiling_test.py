@@ -0,0 +1,126 @@
+# Copyright 2024 The Flax Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+
+import jax.numpy as jnp
+from absl.testing import absltest
+
+from flax import nnx
+from flax.nnx import profiling
+
+
+class OverheadTest(absltest.TestCase):
+  def test_transform_spans(self):
+    model = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    x = jnp.ones((1, 2))
+
+    @nnx.jit
+    def forward(model, x):
+      return model(x)
+
+    @nnx.grad
+    def grad_fn(model, x):
+      return model(x).sum()
+
+    vmapped = nnx.vmap(lambda model, x: model(x), in_axes=(None, 0))
+    remat = nnx.remat(lambda model, x: model(x))
+
+    @nnx.scan(in_axes=(None, nnx.Carry, 0), out_axes=nnx.Carry)
+    def scanned(model, carry, x):
+      return carry + model(x)
+
+    with nnx.profiling.overhead() as profiler:
+      for _ in range(2):
+        forward(model, x)
+        grad_fn(model, x)
+        vmapped(model, jnp.ones((4, 1, 2)))
+        remat(model, x)
+        scanned(model, jnp.zeros((1, 3)), jnp.ones((4, 1, 2)))
+
+    summary = profiler.summary()
+    for name in ('jit', 'grad', 'vmap', 'remat', 'scan'):
+      self.assertEqual(summary[name].count, 2)
+      self.assertEqual(summary[f'{name}/to_tree'].count, 2)
+      self.assertEqual(summary[f'{name}/dispatch'].count, 2)
+      self.assertEqual(summary[f'{name}/from_tree'].count, 2)
+      self.assertGreaterEqual(
+        summary[name].total_us, summary[f'{name}/dispatch'].total_us
+      )
+    # the inner function is only traced on the first call
+    self.assertEqual(summary['jit/dispatch/to_tree'].count, 1)
+    self.assertEqual(summary['jit/graph_cache'].count, 2)
+    stats = summary['jit']
+    self.assertLessEqual(stats.p50_us, stats.p90_us)
+    self.assertLessEqual(stats.p99_us, stats.max_us)
+    self.assertIn('jit/dispatch', profiler.report())
+
+  def test_disabled(self):
+    model = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    forward = nnx.jit(lambda model, x: model(x))
+
+    with nnx.profiling.overhead() as profiler:
+      pass
+    forward(model, jnp.ones((1, 2)))
+
+    self.assertIsNone(profiling._PROFILER)
+    self.assertEmpty(profiler.events)
+
+  def test_nested_spans_and_max_events(self):
+    with nnx.profiling.overhead(max_events=2) as profiler:
+      with profiling.span('outer'):
+        with profiling.span('inner'):
+          pass
+        with profiling.span('inner'):
+          pass
+
+    self.assertEqual(
+      [event.path for event in profiler.events],
+      [('outer', 'inner'), ('outer', 'inner')],
+    )
+    self.assertEqual(profiler.dropped, 1)
+    profiler.clear()
+    self.assertEmpty(profiler.summary())
+
+  def test_export_chrome_trace(self):
+    model = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    forward = nnx.jit(lambda model, x: model(x))
+
+    with nnx.profiling.overhead() as profiler:
+      forward(model, jnp.ones((1, 2)))
+
+    tmpdir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, tmpdir)
+    path = os.path.join(tmpdir, 'trace.json')
+    profiler.export_chrome_trace(path)
+    with open(path) as f:
+      trace = json.load(f)
+
+    events = trace['traceEvents']
+    self.assertLen(events, len(profiler.events))
+    jit_event = next(e for e in events if e['args']['path'] == 'jit')
+    self.assertEqual(jit_event['ph'], 'X')
+    self.assertEqual(jit_event['cat'], 'jit')
+    for event in events:
+      self.assertGreaterEqual(event['ts'], jit_event['ts'])
+      self.assertLessEqual(
+        event['ts'] + event['dur'], jit_event['ts'] + jit_event['dur'] + 1e-3
+      )
+
+
+if __name__ == '__main__':
+  absltest.main()
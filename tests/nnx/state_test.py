@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from unittest import mock
+
 from absl.testing import absltest
 
 from flax import nnx
+from flax.nnx import filterlib, statelib
 import jax
 from jax import numpy as jnp
 
@@ -92,6 +95,39 @@ class StateTest(absltest.TestCase):
     nnx.update(module, state)
     assert jnp.array_equal(module(jnp.ones((3, 4))), jnp.zeros((3, 5)))
 
+  def test_split_state_vectorized(self):
+    class Model(nnx.Module):
+      def __init__(self, n):
+        self.layers = [nnx.Linear(2, 2, rngs=nnx.Rngs(0)) for _ in range(n)]
+        self.norms = [nnx.BatchNorm(2, rngs=nnx.Rngs(0)) for _ in range(n)]
+        self.count = nnx.Variable(jnp.array(0))
+
+    flat_state = nnx.to_flat_state(nnx.state(Model(60)))
+    assert len(flat_state) >= statelib._VECTORIZED_FILTER_MIN_SIZE
+
+    all_filters = [
+      (nnx.Param, nnx.BatchStat, ...),
+      (nnx.All(nnx.Param, nnx.PathContains('kernel')), nnx.Not(nnx.BatchStat)),
+      (filterlib.PathIn(('count',), ('missing',)), nnx.Any(nnx.Param, 'tag')),
+      (lambda path, x: path[-1] == 'mean', nnx.Nothing, True),
+    ]
+    for filters in all_filters:
+      vectorized = statelib._split_state(flat_state, *filters)
+      with mock.patch.object(statelib, '_VECTORIZED_FILTER_MIN_SIZE', 1 << 30):
+        expected = statelib._split_state(flat_state, *filters)
+
+      self.assertLen(vectorized, len(expected))
+      for a, b in zip(vectorized, expected):
+        self.assertEqual(a._keys, b._keys)
+        self.assertTrue(all(x is y for x, y in zip(a._values, b._values)))
+
+    params, batch_stats, rest = statelib._split_state(
+      flat_state, nnx.Param, nnx.BatchStat
+    )
+    self.assertLen(params, 60 * 4)
+    self.assertLen(batch_stats, 60 * 2)
+    self.assertLen(rest, 1)
+
 
 if __name__ == '__main__':
   absltest.main()
\ No newline at end of file
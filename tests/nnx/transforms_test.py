@@ -13,8 +13,14 @@
 # limitations under the License.
 
 import dataclasses
+import gc
+import os
 from functools import partial
+import shutil
+import tempfile
 import typing as tp
+from unittest import mock
+import weakref
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -24,6 +30,7 @@ from flax.nnx.transforms import general
 import jax
 from jax.experimental import checkify, mesh_utils
 import jax.numpy as jnp
+import msgpack
 import numpy as np
 from flax import errors, config
 
@@ -421,6 +428,224 @@ class TestJIT(absltest.TestCase):
     cached_m2 = cached_f(m)
     self.assertIs(cached_m, cached_m2)
 
+  @pytest.mark.skipif(
+    config.flax_mutable_array,
+    reason='Mutable arrays are not supported with the graph cache',
+  )
+  def test_graph_cache(self):
+    m = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    m.count = nnx.BatchStat(jnp.array(0))
+
+    @nnx.jit
+    def f(m: nnx.Linear):
+      m.count.value += 1
+      return m(jnp.ones((1, 2)))
+
+    f(m)
+    self.assertLen(f.graph_cache.entries, 1)
+    entry = next(iter(f.graph_cache.entries.values()))
+
+    y = f(m)
+    self.assertEqual(m.count.value, 2)
+    self.assertIs(next(iter(f.graph_cache.entries.values())), entry)
+    np.testing.assert_allclose(y, m(jnp.ones((1, 2))))
+
+    # structural changes outside invalidate the entry
+    m.kernel = nnx.Param(jnp.zeros((2, 3)))
+    y = f(m)
+    self.assertIsNot(next(iter(f.graph_cache.entries.values())), entry)
+    np.testing.assert_allclose(y, m.bias.value[None])
+
+  @pytest.mark.skipif(
+    config.flax_mutable_array,
+    reason='Mutable arrays are not supported with the graph cache',
+  )
+  def test_graph_cache_structure_change(self):
+    class Foo(nnx.Module):
+      def __init__(self):
+        self.count = nnx.BatchStat(jnp.array(0))
+
+    m = Foo()
+
+    @nnx.jit
+    def f(m: Foo):
+      m.count.value += 1
+      m.last = m.count.value > 1
+
+    f(m)
+    f(m)
+    f(m)
+    self.assertEqual(m.count.value, 3)
+    self.assertIsInstance(m.last, jax.Array)
+
+  @pytest.mark.skipif(
+    config.flax_mutable_array,
+    reason='Mutable arrays are not supported with the graph cache',
+  )
+  def test_graph_cache_nested_changes(self):
+    class Model(nnx.Module):
+      def __init__(self, rngs):
+        self.layers = [nnx.Linear(2, 2, rngs=rngs)]
+
+    model = Model(nnx.Rngs(0))
+
+    @nnx.jit
+    def f(model: Model):
+      x = jnp.ones((1, 2))
+      for layer in model.layers:
+        x = layer(x)
+      return x
+
+    f(model)
+    entry = next(iter(f.graph_cache.entries.values()))
+    self.assertIsNotNone(entry.versions)
+    f(model)
+    self.assertIs(next(iter(f.graph_cache.entries.values())), entry)
+
+    # in-place list mutation
+    model.layers.append(nnx.Linear(2, 2, rngs=nnx.Rngs(1)))
+    y = f(model)
+    np.testing.assert_allclose(
+      y, model.layers[1](model.layers[0](jnp.ones((1, 2)))), rtol=1e-5
+    )
+    entry = next(iter(f.graph_cache.entries.values()))
+
+    # nested attribute change
+    model.layers[1].bias = nnx.Param(jnp.ones((2,)))
+    y = f(model)
+    self.assertIsNot(next(iter(f.graph_cache.entries.values())), entry)
+    np.testing.assert_allclose(
+      y, model.layers[1](model.layers[0](jnp.ones((1, 2)))), rtol=1e-5
+    )
+    entry = next(iter(f.graph_cache.entries.values()))
+
+    # Variable metadata change
+    model.layers[1].bias.foo = 'bar'
+    f(model)
+    self.assertIsNot(next(iter(f.graph_cache.entries.values())), entry)
+
+  @pytest.mark.skipif(
+    config.flax_mutable_array,
+    reason='Mutable arrays are not supported with the graph cache',
+  )
+  def test_graph_cache_weakref(self):
+    m = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    f = nnx.jit(lambda m: m(jnp.ones((1, 2))))
+    f(m)
+    self.assertLen(f.graph_cache.entries, 1)
+
+    model_ref = weakref.ref(m)
+    kernel_ref = weakref.ref(m.kernel)
+    del m
+    gc.collect()
+    self.assertIsNone(model_ref())
+    self.assertIsNone(kernel_ref())
+    self.assertEmpty(f.graph_cache.entries)
+
+  def test_graph_cache_uncacheable(self):
+    m = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    m.scale = nnx.data(jnp.ones((3,)))
+    f = nnx.jit(lambda m: m(jnp.ones((1, 2))) * m.scale)
+
+    with mock.patch.object(
+      nnx.graph, 'flatten', wraps=nnx.graph.flatten
+    ) as flatten:
+      self.assertIsNone(f.graph_cache.get(((m,), {})))
+    flatten.assert_not_called()
+    f(m)
+    self.assertEmpty(f.graph_cache.entries)
+
+  def test_graph_cache_disabled(self):
+    m = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    f = nnx.jit(lambda m: m(jnp.ones((1, 2))))
+    f.graph_cache.maxsize = 0
+    f(m)
+    self.assertEmpty(f.graph_cache.entries)
+
+  def test_executable_cache_dir(self):
+    cache_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, cache_dir)
+    old_cache_dir = config.flax_jit_executable_cache_dir
+    config.update('flax_jit_executable_cache_dir', cache_dir)
+    self.addCleanup(
+      config.update, 'flax_jit_executable_cache_dir', old_cache_dir
+    )
+
+    def f(m: nnx.Linear, x):
+      m.count.value += 1
+      return m(x)
+
+    m = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    m.count = nnx.BatchStat(jnp.array(0))
+    x = jnp.ones((1, 2))
+    y = nnx.jit(f)(m, x)
+    self.assertLen(os.listdir(cache_dir), 1)
+    self.assertEqual(m.count.value, 1)
+
+    # a fresh jit, e.g. in a new process, loads the executable from disk
+    g = nnx.jit(f)
+    with mock.patch.object(
+      jax.stages.Lowered, 'compile', side_effect=AssertionError
+    ):
+      np.testing.assert_allclose(g(m, x), y)
+      np.testing.assert_allclose(g(m, x), y)
+    self.assertEqual(m.count.value, 3)
+    self.assertLen(g._executables, 1)
+
+    # new input shapes compile a new executable
+    g(m, jnp.ones((4, 2)))
+    self.assertLen(os.listdir(cache_dir), 2)
+
+    # the executables kept in memory are bounded
+    old_cache_size = config.flax_jit_executable_cache_size
+    config.update('flax_jit_executable_cache_size', 2)
+    self.addCleanup(
+      config.update, 'flax_jit_executable_cache_size', old_cache_size
+    )
+    g(m, jnp.ones((5, 2)))
+    self.assertLen(g._executables, 2)
+
+  def test_executable_cache_errors(self):
+    cache_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, cache_dir)
+    old_cache_dir = config.flax_jit_executable_cache_dir
+    config.update('flax_jit_executable_cache_dir', cache_dir)
+    self.addCleanup(
+      config.update, 'flax_jit_executable_cache_dir', old_cache_dir
+    )
+
+    def f(m: nnx.Linear, x):
+      return m(x)
+
+    m = nnx.Linear(2, 3, rngs=nnx.Rngs(0))
+    x = jnp.ones((1, 2))
+    expected = m(x)
+
+    # executables that can't be serialized are still run
+    with mock.patch.object(
+      nnx.transforms.compilation.serialize_executable,
+      'serialize',
+      side_effect=ValueError('host callback'),
+    ):
+      np.testing.assert_allclose(nnx.jit(f)(m, x), expected)
+    self.assertEmpty(os.listdir(cache_dir))
+
+    # corrupt files and unknown devices are compiled again
+    nnx.jit(f)(m, x)
+    (filename,) = os.listdir(cache_dir)
+    path = os.path.join(cache_dir, filename)
+    with open(path, 'wb') as fp:
+      fp.write(b'corrupt')
+    np.testing.assert_allclose(nnx.jit(f)(m, x), expected)
+    with open(path, 'rb') as fp:
+      entry = msgpack.unpackb(fp.read())
+    entry['devices'] = [d.id + 1000 for d in jax.devices()]
+    with open(path, 'wb') as fp:
+      fp.write(msgpack.packb(entry))
+    with self.assertLogs(level='WARNING') as logs:
+      np.testing.assert_allclose(nnx.jit(f)(m, x), expected)
+    self.assertIn('KeyError', logs.output[0])
+
   def test_jit_wrapped(self):
     class Foo(nnx.Module):
       def __init__(self, *, rngs: nnx.Rngs):
@@ -464,6 +689,29 @@ class TestEvalShape(absltest.TestCase):
     self.assertIsInstance(abs_model.kernel.value, jax.ShapeDtypeStruct)
     self.assertEqual(abs_model.kernel.shape, (1, 2))
 
+  def test_deferred_init(self):
+    class Model(nnx.Module):
+      def __init__(self, rngs):
+        self.linear1 = nnx.Linear(2, 3, rngs=rngs)
+        self.linear2 = nnx.Linear(3, 4, rngs=rngs)
+
+    deferred = nnx.deferred_init(lambda: Model(nnx.Rngs(0)))
+    self.assertIsInstance(deferred.abstract, Model)
+    self.assertIsInstance(
+      deferred.abstract.linear2.kernel.value, jax.ShapeDtypeStruct
+    )
+
+    groups = [group[-1] for group, _ in deferred.materialize_iter()]
+    self.assertEqual(groups, ['linear1', 'linear2'])
+
+    sharding = jax.sharding.SingleDeviceSharding(jax.devices()[0])
+    model = deferred.materialize(lambda path, x: sharding)
+    expected = Model(nnx.Rngs(0))
+    self.assertEqual(model.linear2.kernel.value.sharding, sharding)
+    np.testing.assert_allclose(
+      model.linear2.kernel.value, expected.linear2.kernel.value
+    )
+
 class TestShardMap(absltest.TestCase):
   def test_basic_shardmap(self):
     n_devices = jax.local_device_count()
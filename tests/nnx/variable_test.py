@@ -118,5 +118,16 @@ class TestVariable(absltest.TestCase):
     self.assertFalse(nnx.using_mutable_arrays())
     self.assertFalse(nnx.is_mutable_array(v.raw_value))
 
+  def test_copy_from_metadata_version(self):
+    v = nnx.Param(jnp.array(1.0), sharding=('a',))
+    version = nnx.variablelib.metadata_version()
+    v.copy_from(nnx.Param(jnp.array(2.0), sharding=('a',)))
+    self.assertEqual(v.value, 2.0)
+    self.assertEqual(nnx.variablelib.metadata_version(), version)
+
+    v.copy_from(nnx.Param(jnp.array(3.0), sharding=('b',)))
+    self.assertEqual(v.sharding, ('b',))
+    self.assertGreater(nnx.variablelib.metadata_version(), version)
+
 if __name__ == '__main__':
   absltest.main()
@@ -15,6 +15,7 @@
 """Tests for flax.struct and flax.serialization."""
 
 import collections
+import io
 import platform
 from typing import Any, NamedTuple
 
@@ -29,6 +30,7 @@ from jax import random
 from jax.tree_util import Partial
 
 from flax import linen as nn
+from flax import io as flax_io
 from flax import serialization, struct
 from flax.core import freeze
 from flax.training import train_state
@@ -360,6 +362,78 @@ class SerializationTest(parameterized.TestCase):
 
     np.testing.assert_array_equal(restored, tmp)
 
+  def test_restore_zero_copy(self):
+    tmp = {
+      'a': np.random.uniform(-100, 100, size=(21, 37)),
+      'b': [1, -3, 2**40, 0.5, 'foo', b'bar', None, True, 1 + 2j],
+      'c': {'d': jnp.ones((2, 3), jnp.bfloat16), 'e': np.int32(7)},
+    }
+    serialized = serialization.msgpack_serialize(tmp)
+    expected = serialization.msgpack_restore(serialized)
+    restored = serialization.msgpack_restore(serialized, zero_copy=True)
+
+    self.assertEqual(
+      jax.tree_util.tree_structure(restored),
+      jax.tree_util.tree_structure(expected),
+    )
+    for x, y in zip(jax.tree.leaves(restored), jax.tree.leaves(expected)):
+      self.assertEqual(type(x), type(y))
+      np.testing.assert_array_equal(x, y)
+    self.assertEqual(restored['c']['d'].dtype, jnp.bfloat16)
+    # the array data is not copied out of the serialized bytes
+    self.assertFalse(restored['a'].flags.owndata)
+
+  def test_restore_mmap_chunked(self):
+    old_chunksize = serialization.MAX_CHUNK_SIZE
+    serialization.MAX_CHUNK_SIZE = 91 * 8
+    try:
+      tmp = {'a': np.random.uniform(-100, 100, size=(21, 37)), 'b': np.ones(3)}
+      path = self.create_tempfile(
+        content=serialization.msgpack_serialize(tmp)
+      ).full_path
+      restored = serialization.msgpack_restore_mmap(path)
+    finally:
+      serialization.MAX_CHUNK_SIZE = old_chunksize
+
+    jax.tree_util.tree_map(np.testing.assert_array_equal, restored, tmp)
+
+  def test_serialize_to_stream(self):
+    tmp = {
+      'b': np.random.uniform(-100, 100, size=(21, 37)),
+      'a': [1, -3, 2**40, 0.5, 'foo', b'bar', None, True, np.ones(3)],
+      'c': {'e': jnp.ones((2, 3), jnp.bfloat16), 'd': np.int32(7)},
+      'f': np.ones((4, 4))[:, ::2],
+    }
+    stream = io.BytesIO()
+    num_bytes = serialization.msgpack_serialize_to_stream(tmp, stream)
+    self.assertEqual(stream.getvalue(), serialization.msgpack_serialize(tmp))
+    self.assertEqual(num_bytes, len(stream.getvalue()))
+
+    stream = io.BytesIO()
+    serialization.to_file(tmp, stream)
+    self.assertEqual(stream.getvalue(), serialization.to_bytes(tmp))
+
+  def test_serialize_to_stream_chunked(self):
+    old_chunksize = serialization.MAX_CHUNK_SIZE
+    serialization.MAX_CHUNK_SIZE = 91 * 8
+    try:
+      tmp = {
+        'a': {'b': np.random.uniform(-100, 100, size=(21, 37))},
+        'c': jnp.ones((10, 10)),
+        'd': [np.ones((10, 10))],
+      }
+      path = self.create_tempfile().full_path
+      with flax_io.GFile(path, 'wb') as f:
+        serialization.to_file(tmp, f)
+      with flax_io.GFile(path, 'rb') as f:
+        serialized = f.read()
+      self.assertEqual(serialized, serialization.to_bytes(tmp))
+      restored = serialization.from_bytes(tmp, serialized)
+    finally:
+      serialization.MAX_CHUNK_SIZE = old_chunksize
+
+    jax.tree_util.tree_map(np.testing.assert_array_equal, restored, tmp)
+
   def test_namedtuple_serialization(self):
     foo_class = collections.namedtuple('Foo', 'a b c')
     x1 = foo_class(a=1, b=2, c=3)
@@ -88,6 +88,29 @@ class TensorboardTest(absltest.TestCase):
       )
     )
 
+  def test_summarywriter_write_scalars(self):
+    log_dir = tempfile.mkdtemp()
+    summary_writer = SummaryWriter(log_dir=log_dir)
+    scalars = {'loss': 0.25, 'accuracy': np.float32(0.75)}
+    summary_writer.write_scalars(step=1, scalars=scalars)
+
+    event_file_generator = directory_watcher.DirectoryWatcher(
+      log_dir, event_file_loader.EventFileLoader
+    ).Load()
+    event_values = list(
+      itertools.chain.from_iterable(map(_process_event, event_file_generator))
+    )
+    self.assertLen(event_values, 2)
+    for event_value in event_values:
+      self.assertEqual(event_value['step'], 1)
+      summary_value = event_value['value']
+      self.assertTrue(
+        np.allclose(
+          tensor_util.make_ndarray(summary_value.tensor).item(),
+          scalars[summary_value.tag],
+        )
+      )
+
   def test_summarywriter_text(self):
     log_dir = tempfile.mkdtemp()
     summary_writer = SummaryWriter(log_dir=log_dir)
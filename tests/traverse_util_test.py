@@ -16,6 +16,7 @@
 
 
 import collections
+import sys
 
 import jax
 import jax.numpy as jnp
@@ -222,6 +223,34 @@ class TraversalTest(absltest.TestCase):
     xs_restore = traverse_util.unflatten_dict(flat_xs)
     self.assertEqual(xs, xs_restore)
 
+  def test_flatten_dict_order_and_sep(self):
+    xs = {'b': {'y': 1, 'x': {'q': 2}}, 'a': 3, 'c': {}}
+    flat_xs = traverse_util.flatten_dict(xs, sep='/', keep_empty_nodes=True)
+    self.assertEqual(
+      list(flat_xs.items()),
+      [
+        ('b/y', 1),
+        ('b/x/q', 2),
+        ('a', 3),
+        ('c', traverse_util.empty_node),
+      ],
+    )
+    xs_restore = traverse_util.unflatten_dict(flat_xs, sep='/')
+    self.assertEqual(xs, xs_restore)
+    self.assertEqual(list(xs_restore['b']), ['y', 'x'])
+
+  def test_flatten_dict_deep(self):
+    xs = leaf = {'leaf': 1}
+    for _ in range(2 * sys.getrecursionlimit()):
+      xs = {'x': xs}
+    flat_xs = traverse_util.flatten_dict(xs)
+    (path,) = flat_xs
+    self.assertLen(path, 2 * sys.getrecursionlimit() + 1)
+    xs_restore = traverse_util.unflatten_dict(flat_xs)
+    for _ in range(2 * sys.getrecursionlimit()):
+      xs_restore = xs_restore['x']
+    self.assertEqual(xs_restore, leaf)
+
 
 class ModelParamTraversalTest(absltest.TestCase):
   def test_only_works_on_model_params(self):